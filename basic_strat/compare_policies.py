@@ -1,14 +1,29 @@
+import os
+import sys
+
+# basic_strat is the hit/stay game played by the engine in with_split_double
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "with_split_double"))
+
 import pandas as pd
+from policy_export import read_strategy
+from rules import HIT_STAY_RULES
+from state_encoding import PAIR_ROWS
+from strategy_solver import StrategySolver
 
-df_learner = pd.read_csv("optimal_policy.csv")
-# Select 1nd, 2rd, and 5th columns
-df_learner = df_learner.iloc[:, [0, 1, 4]]
+# the strategy learned by main.py, in state_encoding order
+df_learner = read_strategy("optimal_policy.csv")[['player', 'dealer', 'optimal']]
 print(df_learner)
 
-df_basic = pd.read_csv("basic_strat.csv")
-print(df_basic)
+# solved reference for the hit/stay rules, whose pairs are played as totals
+df_solved = StrategySolver(HIT_STAY_RULES).solve()[['player', 'dealer', 'optimal']]
+df_solved = df_solved[~df_solved['player'].isin(PAIR_ROWS)]
+df_solved['player'] = df_solved['player'].astype(str)
+print(df_solved)
 
-diff = pd.concat([df_basic, df_learner]).drop_duplicates(keep=False)
+merge_df = pd.merge(df_learner.astype({'player': str}), df_solved,
+                    on=['player', 'dealer'], suffixes=('_learner', '_solved'))
+diff = merge_df[merge_df['optimal_learner'] != merge_df['optimal_solved']]
 print(diff)
 
 diff.to_csv("diff.csv", index=False)
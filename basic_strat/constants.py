@@ -1,5 +0,0 @@
-class Constants:
-    hit = 'hit'
-    stay = 'stay'
-    player1 = 'you'
-    player2 = 'dealer'
@@ -1,5 +1,14 @@
+import os
+import sys
+
+# basic_strat is the hit/stay game played by the engine in with_split_double
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "with_split_double"))
+
 from game import Game
+from progress import ProgressReporter
 from q_learner import QLearner
+from rules import HIT_STAY_RULES
 
 
 def main():
@@ -9,19 +18,23 @@ def main():
     learned by the Q-learner to a csv file. 
     """
     num_learning_rounds = 9000
-    game = Game(num_learning_rounds, QLearner())  # Q learner
     number_of_test_rounds = 200
+    progress = ProgressReporter(total=num_learning_rounds * number_of_test_rounds)
+    learner = QLearner(learning_rate=0.7, discount_factor=0.9, epsilon=0.9)
+    game = Game(num_learning_rounds, learner, progress,
+                rules=HIT_STAY_RULES)  # Q learner
     for k in range(0, number_of_test_rounds):
         game.run()
+    game.report()
 
     # plot win rate for each round
     game.plot_win_rate()
     game.plot_profit_loss()
 
-    df = game.learner.get_optimal_strategy()
+    df = game.learner.get_optimal_strategy(game.rules)
+    df = df[['player', 'dealer', 'hit', 'stay', 'optimal']]
     print(df)
     df.to_csv('optimal_policy.csv', index=False)
-    # print(f"Win Loss: {game.reward_history}")
     print(f"profit/loss: {(game.reward)}")
 
 
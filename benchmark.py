@@ -0,0 +1,336 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+"""
+Benchmarks the components of both variants of the game: drawing from the
+deck, dealing to and valuing a hand, the Q-learner's decisions and updates,
+building a game state, whole learning runs, batched lookups in a frozen
+policy table and extracting the learned strategy.
+
+Both variants are played by the engine in with_split_double, each under its
+own rules, so every speedup of the engine shows up in both. Every (variant,
+benchmark) pair runs in its own Python process started in the engine's
+directory, which makes the peak resident set size reported for a benchmark
+its own. For each one the harness reports the operations per second, the
+peak RSS, the number of garbage collections and the time spent in them, and
+from a second run traced by tracemalloc, the peak traced memory and the
+memory still held afterwards per operation (which is what grows without
+bound when something is kept for every round).
+
+Results are written as JSON, and a previous results file can be given to
+compare against, e.g.
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+
+Attributes:
+    VARIANTS (list): The variants that can be benchmarked.
+    RULES (dict): Variant -> the name of its Rules in rules.
+    BENCHMARKS (dict): Benchmark name -> (variants it applies to, setup
+        function, number of operations at scale 1).
+"""
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ENGINE = os.path.join(ROOT, "with_split_double")
+VARIANTS = ["basic_strat", "with_split_double"]
+RULES = {"basic_strat": "HIT_STAY_RULES", "with_split_double": "DEFAULT_RULES"}
+
+
+def _rules(variant):
+    import rules
+    return getattr(rules, RULES[variant])
+
+
+def _deck_draw(variant, n):
+    deck = _rules(variant).new_deck()
+
+    def run():
+        for _ in range(n):
+            deck.draw()
+    return run
+
+
+def _player_hit(variant, n):
+    from player import Player
+    deck = _rules(variant).new_deck()
+    player = Player()
+
+    def run():
+        for i in range(n):
+            if i % 4 == 0:
+                player.reset_hand()
+            player.hit(deck)
+            player.get_hand_value()
+    return run
+
+
+def _reachable_states(variant):
+    """
+    Returns: The state codes the variant's game can reach, which have no
+    pair states when its rules do not split.
+    """
+    from state_encoding import DEALER_COLUMNS, N_STATES, PAIR_ROW
+    rules = _rules(variant)
+    return list(range(N_STATES if rules.split
+                      else PAIR_ROW * len(DEALER_COLUMNS)))
+
+
+def _learner_states(variant, n):
+    """
+    Returns: A QLearner offered the actions of the variant's rules, and n
+    states it could be asked about
+    """
+    import random
+    from q_learner import QLearner
+    rng = random.Random(0)
+    reachable = _reachable_states(variant)
+    states = [rng.choice(reachable) for _ in range(n)]
+    learner = QLearner()
+    learner._can_double = _rules(variant).double
+    return learner, states
+
+
+def _get_action(variant, n):
+    learner, states = _learner_states(variant, n)
+
+    def run():
+        for state in states:
+            learner.get_action(state)
+    return run
+
+
+def _update(variant, n):
+    learner, states = _learner_states(variant, n + 1)
+    for state in states:
+        learner.get_action(state)
+
+    def run():
+        for state in states[1:]:
+            learner._last_state = states[0]
+            learner.update(state, 1)
+    return run
+
+
+def _get_state(variant, n):
+    from dealer import Dealer
+    from game import Game
+    from q_learner import QLearner
+    game = Game(1, rules=_rules(variant))
+    deck = game.deck
+    hands = []
+    for _ in range(100):
+        player, dealer = QLearner(), Dealer()
+        for _ in range(2):
+            player.hit(deck)
+            dealer.hit(deck)
+        hands.append((player, dealer))
+
+    def run():
+        for i in range(n):
+            game.get_state(*hands[i % 100])
+    return run
+
+
+def _new_game(variant, n, **kwargs):
+    from game import Game
+    from progress import ProgressReporter
+    return Game(n, progress=ProgressReporter(quiet=True), rules=_rules(variant),
+                **kwargs)
+
+
+def _game_run(variant, n):
+    return _new_game(variant, n).run
+
+
+def _game_run_batch(variant, n):
+    from constants import Constants
+    return _new_game(variant, n, mode=Constants.batch).run
+
+
+def _policy_lookup_batch(variant, n):
+    import numpy as np
+    from policy_table import PolicyTable
+    from state_encoding import new_q_table
+    rng = np.random.default_rng(0)
+    policy = PolicyTable.from_q_table(rng.random(new_q_table().shape))
+    states = rng.choice(_reachable_states(variant), n)
+    # only the legality codes the variant's rules can give
+    legality = rng.choice(np.unique(_rules(variant).legality), n)
+
+    def run():
+        policy.lookup_batch(states, legality)
+    return run
+
+
+def _optimal_strategy(variant, n):
+    game = _new_game(variant, 20000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        game.run()
+
+    def run():
+        for _ in range(n):
+            game.learner.get_optimal_strategy(game.rules)
+    return run
+
+
+BENCHMARKS = {
+    "deck_draw": (VARIANTS, _deck_draw, 200000),
+    "player_hit": (VARIANTS, _player_hit, 200000),
+    "learner_get_action": (VARIANTS, _get_action, 200000),
+    "learner_update": (VARIANTS, _update, 200000),
+    "game_get_state": (VARIANTS, _get_state, 200000),
+    "game_run": (VARIANTS, _game_run, 20000),
+    "game_run_batch": (VARIANTS, _game_run_batch, 1000000),
+    "policy_lookup_batch": (VARIANTS, _policy_lookup_batch, 10000000),
+    "get_optimal_strategy": (VARIANTS, _optimal_strategy, 20),
+}
+
+
+def _peak_rss_kb():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(variant, name, scale):
+    """
+    Runs one benchmark in this process, which must have been started in the
+    engine's directory.
+    Returns: A dict with the results.
+    """
+    variants, setup, ops = BENCHMARKS[name]
+    ops = max(1, int(ops * scale))
+    sys.path.insert(0, os.getcwd())
+
+    pauses = []
+    started = []
+
+    def on_gc(phase, info):
+        if phase == "start":
+            started.append(time.perf_counter())
+        elif started:
+            pauses.append(time.perf_counter() - started.pop())
+
+    run = setup(variant, ops)
+    gc.collect()
+    collections = sum(stats["collections"] for stats in gc.get_stats())
+    gc.callbacks.append(on_gc)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+    gc.callbacks.remove(on_gc)
+    collections = sum(stats["collections"] for stats in gc.get_stats()) - \
+        collections
+    peak_rss = _peak_rss_kb()
+
+    # tracing slows everything down, so it gets a run of its own
+    run = setup(variant, ops)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+    gc.collect()
+    after, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"variant": variant, "benchmark": name, "ops": ops,
+            "seconds": seconds, "ops_per_sec": ops / seconds,
+            "peak_rss_kb": peak_rss, "traced_peak_kb": traced_peak / 1024,
+            "retained_bytes_per_op": (after - before) / ops,
+            "gc_collections": collections, "gc_pause_ms": sum(pauses) * 1000}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(variants, names, scale):
+    """
+    Runs every selected benchmark of every selected variant in a fresh
+    process.
+    Returns: The list of result dicts.
+    """
+    results = []
+    for variant in variants:
+        for name in names:
+            if variant not in BENCHMARKS[name][0]:
+                continue
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker",
+                 variant, name, "--scale", str(scale)],
+                cwd=ENGINE, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{variant} {name} failed:\n{proc.stderr}", file=sys.stderr)
+                continue
+            result = json.loads(proc.stdout.splitlines()[-1])
+            results.append(result)
+            print(f"{variant:18} {name:22} {result['ops_per_sec']:>14,.0f} ops/s"
+                  f" {result['peak_rss_kb'] or 0:>10,} KB RSS"
+                  f" {result['retained_bytes_per_op']:>8.1f} B/op retained")
+    return results
+
+
+def compare(results, path):
+    """Prints the change in ops/s of every benchmark also found in path"""
+    with open(path) as f:
+        previous = {(r["variant"], r["benchmark"]): r
+                    for r in json.load(f)["results"]}
+    print(f"\nCompared to {path}:")
+    for result in results:
+        old = previous.get((result["variant"], result["benchmark"]))
+        if old:
+            change = result["ops_per_sec"] / old["ops_per_sec"] - 1
+            print(f"{result['variant']:18} {result['benchmark']:22} {change:+8.1%}")
+
+
+def main():
+    """
+    Benchmarks the components of the basic_strat and with_split_double games.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--variant", choices=VARIANTS, action="append",
+                        help="variant to benchmark, all by default")
+    parser.add_argument("--benchmark", choices=list(BENCHMARKS), action="append",
+                        help="benchmark to run, all by default")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiplies the number of operations of every benchmark")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(*args.worker, args.scale)))
+        return
+
+    results = run_all(args.variant or VARIANTS, args.benchmark or list(BENCHMARKS),
+                      args.scale)
+    report = {"commit": _git_commit(), "python": platform.python_version(),
+              "platform": platform.platform(), "scale": args.scale,
+              "date": datetime.now(timezone.utc).isoformat(), "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
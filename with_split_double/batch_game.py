@@ -0,0 +1,399 @@
+from constants import Constants
+from dealer_cache import BUST, DealerOutcomeCache
+from rules import DEFAULT_RULES, LOSS, PUSH, WIN, NATURAL
+from state_encoding import (ACTIONS, HIT, STAY, SPLIT, DOUBLE, LEGAL_MASKS,
+                            TERMINAL_STATE, encode_hands)
+import numpy as np
+"""
+Vectorized blackjack engine that simulates many independent rounds at once.
+
+Every round gets its own shoe of rules.num_decks decks stored as integer rank
+codes (1 = Ace ... 13 = King) in one preallocated array of batch_size shoes.
+Cards are drawn with a lazy Fisher-Yates swap, so only the cards that are
+actually dealt get shuffled and every round starts from a full, uniformly
+random shoe. Player decisions, splits, dealer play and settlement are then
+applied to all rounds that are still in that phase with array operations, and
+the results are written into preallocated arrays that are reused between calls.
+Game uses this engine when it is created with mode=Constants.batch.
+
+States handed to the Q-table are the integer codes of state_encoding. Which
+actions are legal, the dealer's play and what every hand pays follow the
+engine's Rules, looked up in the tables they are compiled into.
+
+The dealer is rolled out card by card by default. With
+dealer_mode=Constants.sample its final total is instead drawn from the
+DealerOutcomeCache distribution of its showing card, and with
+Constants.expected every standing hand is paid its expected value against
+that distribution (win, loss and tie counts still come from a sampled
+total), which takes the dealer's luck out of the rewards. Both use the full
+shoe distribution, so they ignore the few cards the player has drawn.
+
+Attributes:
+    batch_size (int): The maximum number of rounds simulated per call to play.
+    dealer_mode (str): Constants.rollout, Constants.sample or Constants.expected.
+    rules (Rules): The rules the rounds are played by.
+    infinite_deck (bool): Whether cards are drawn with replacement instead of
+        from each round's own shoe, always the case when rules.num_decks is
+        None.
+    rewards (ndarray): Net reward of each round from the last call to play.
+    wins (ndarray): Number of winning hands of each round from the last call.
+    losses (ndarray): Number of losing hands of each round from the last call.
+    ties (ndarray): Number of tied hands of each round from the last call.
+    busts (ndarray): Number of busted hands of each round from the last call.
+    hands (ndarray): Number of hands each round was played as, more than one
+        after splits.
+"""
+
+MAX_HANDS = 4  # hands a round can be split into
+DECK = np.repeat(np.arange(1, 14, dtype=np.int8), 4)
+RANK_VALUE = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10],
+                      dtype=np.int16)
+
+# legality code (2 * can_split + can_double) -> the legal actions, padded
+_N_LEGAL = LEGAL_MASKS.sum(axis=1)
+_LEGAL_ACTIONS = np.array([np.flatnonzero(mask).tolist() + [0] * (4 - mask.sum())
+                           for mask in LEGAL_MASKS])
+
+
+def apply_q_updates(q, states, actions, rewards, next_states,
+                    learning_rate, discount):
+    """
+    Applies a batch of Q-learning updates to the dense table q in place.
+
+    Targets are computed from the table as it was before the batch. Updates
+    that hit the same state-action pair are folded together in closed form, so
+    the result equals applying them one after another in recorded order.
+    """
+    if len(states) == 0:
+        return
+    n_actions = q.shape[1]
+    targets = rewards + discount * q[next_states].max(axis=1)
+
+    keys = states.astype(np.int64) * n_actions + actions
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    targets = targets[order]
+    unique_keys, starts, counts = np.unique(
+        keys, return_index=True, return_counts=True)
+    group = np.repeat(np.arange(len(unique_keys)), counts)
+    remaining = np.repeat(starts + counts, counts) - 1 - np.arange(len(keys))
+
+    decay = 1.0 - learning_rate
+    weighted = np.bincount(group, weights=learning_rate *
+                           decay ** remaining * targets,
+                           minlength=len(unique_keys))
+    flat = q.reshape(-1)
+    flat[unique_keys] = decay ** counts * flat[unique_keys] + weighted
+
+
+class BatchGame:
+    def __init__(self, batch_size=65536, rng=None,
+                 dealer_mode=Constants.rollout, dealer_outcomes=None,
+                 infinite_deck=False, rules=None):
+        """
+        Preallocates every per-round array for batch_size rounds. Per-hand
+        arrays are flat with MAX_HANDS slots per round, so a hand is addressed
+        by the single index round * MAX_HANDS + hand. dealer_outcomes is the
+        DealerOutcomeCache used by the sample and expected dealer modes. With
+        infinite_deck, cards are drawn with replacement, like InfiniteShoe.
+        rules defaults to DEFAULT_RULES.
+        """
+        assert dealer_mode in (Constants.rollout, Constants.sample,
+                               Constants.expected)
+        assert rules is None or rules.max_hands <= MAX_HANDS
+        self.batch_size = batch_size
+        self.dealer_mode = dealer_mode
+        self.rules = rules = rules if rules is not None else DEFAULT_RULES
+        self.infinite_deck = infinite_deck or rules.num_decks is None
+        self._rng = rng if rng is not None else np.random.default_rng()
+        if dealer_mode != Constants.rollout:
+            if dealer_outcomes is None:
+                dealer_outcomes = DealerOutcomeCache(rules)
+            self._dealer_cdf = dealer_outcomes.cumulative()
+            self._dealer_cdf[:, -1] = 1.0
+            self._stand_ev = dealer_outcomes.stand_ev_table()
+        n = batch_size
+        slots = n * MAX_HANDS
+        self._shoe = np.tile(DECK, rules.num_decks or 1)
+        self._decks = np.tile(self._shoe, n)
+        self._deck_start = np.arange(n) * len(self._shoe)
+        self._slot_start = np.arange(n) * MAX_HANDS
+        self._pos = np.empty(n, dtype=np.int64)
+
+        self._hard = np.empty(slots, dtype=np.int16)
+        self._aces = np.empty(slots, dtype=bool)
+        self._ncards = np.empty(slots, dtype=np.int16)
+        self._first = np.empty(slots, dtype=np.int8)
+        self._second = np.empty(slots, dtype=np.int8)
+        self._doubled = np.zeros(slots, dtype=bool)
+        self._done = np.empty(slots, dtype=bool)
+        self._pending = np.empty(slots, dtype=np.int64)
+        self._nhands = np.empty(n, dtype=np.int64)
+        self._cur = np.empty(n, dtype=np.int64)
+
+        self._dealer_hard = np.empty(n, dtype=np.int16)
+        self._dealer_aces = np.empty(n, dtype=bool)
+        self._upcard = np.empty(n, dtype=np.int64)
+
+        self.rewards = np.empty(n, dtype=np.float64)
+        self.wins = np.empty(n, dtype=np.int64)
+        self.losses = np.empty(n, dtype=np.int64)
+        self.ties = np.empty(n, dtype=np.int64)
+        self.busts = np.empty(n, dtype=np.int64)
+        self.hands = np.empty(n, dtype=np.int64)
+
+    def _draw(self, rows):
+        """
+        Draws one card for each (unique) round in rows without replacement,
+        or with replacement from an infinite deck.
+        Returns: The rank codes of the drawn cards.
+        """
+        if self.infinite_deck:
+            return DECK[self._rng.integers(len(DECK), size=len(rows))]
+        pos = self._pos[rows]
+        top = self._deck_start[rows] + pos
+        swap = top + (self._rng.random(len(rows)) *
+                      (len(self._shoe) - pos)).astype(np.int64)
+        cards = self._decks[swap]
+        self._decks[swap] = self._decks[top]
+        self._decks[top] = cards
+        self._pos[rows] = pos + 1
+        return cards
+
+    def _add_card(self, slots, cards):
+        """Adds one card to each of the given player hands"""
+        ncards = self._ncards[slots]
+        self._hard[slots] += RANK_VALUE[cards]
+        self._aces[slots] |= cards == 1
+        second = ncards == 1
+        self._second[slots[second]] = cards[second]
+        self._ncards[slots] = ncards + 1
+
+    def _start_hand(self, slots, cards):
+        """Starts each of the given player hands with a single card"""
+        self._hard[slots] = RANK_VALUE[cards]
+        self._aces[slots] = cards == 1
+        self._ncards[slots] = 1
+        self._first[slots] = cards
+        self._doubled[slots] = False
+        self._done[slots] = False
+        self._pending[slots] = -1
+
+    def _dealer_total(self, rows):
+        hard = self._dealer_hard[rows]
+        return hard + 10 * (self._dealer_aces[rows] & (hard <= 11))
+
+    def _dealer_hits(self, rows):
+        """Returns: Whether the dealer of each of rows must hit"""
+        hard = self._dealer_hard[rows]
+        soft = self._dealer_aces[rows] & (hard <= 11)
+        return self.rules.dealer_hit[soft.view(np.int8), hard + 10 * soft]
+
+    @staticmethod
+    def _greedy_actions(q_values):
+        """
+        Returns: A (len(q_values), 4) array with the best legal action of every
+        state for each legality code (2 * can_split + can_double), and a
+        boolean array marking states whose actions all have the same value.
+        """
+        greedy = np.empty((len(q_values), len(_LEGAL_ACTIONS)), dtype=np.int64)
+        for legality, mask in enumerate(LEGAL_MASKS):
+            greedy[:, legality] = np.where(
+                mask, q_values, -np.inf).argmax(axis=1)
+        tied = (q_values == q_values[:, :1]).all(axis=1)
+        return greedy, tied
+
+    def play(self, q_values, epsilon, n_rounds=None, policy=None):
+        """
+        Simulates n_rounds rounds, choosing player actions epsilon-greedily
+        from the Q-table q_values the same way QLearner does. If policy (a
+        PolicyTable) is given, its actions are the greedy ones instead and no
+        state counts as unseen, so with epsilon = 1 the policy is played as is.
+
+        Returns: A tuple (n_splits, states, actions, rewards, next_states) where
+        the last four arrays describe every transition taken, ready for
+        apply_q_updates. Per-round results are left in self.rewards, self.wins,
+        self.losses and self.ties.
+        """
+        n = self.batch_size if n_rounds is None else n_rounds
+        assert n <= self.batch_size
+        rng = self._rng
+        everyone = np.arange(n)
+        first_slots = self._slot_start[:n]
+        if policy is None:
+            greedy, tied = self._greedy_actions(q_values)
+        else:
+            greedy = policy.table
+            tied = np.zeros(len(greedy), dtype=bool)
+
+        # every shoe is still some ordering of all its cards, which is all
+        # the lazy shuffle in _draw needs, so it only has to be rewound
+        self._pos[:n] = 0
+        self._nhands[:n] = 1
+        self._cur[:n] = 0
+
+        # Initial card deal, in the same order as Game.reset_round
+        self._start_hand(first_slots, self._draw(everyone))
+        upcard = self._draw(everyone)
+        self._add_card(first_slots, self._draw(everyone))
+        hole = self._draw(everyone)
+        self._dealer_hard[:n] = RANK_VALUE[upcard] + RANK_VALUE[hole]
+        self._dealer_aces[:n] = (upcard == 1) | (hole == 1)
+        self._upcard[:n] = np.where(upcard == 1, 9, RANK_VALUE[upcard] - 2)
+
+        # handle blackjack
+        player_bj = (self._hard[first_slots] == 11) & self._aces[first_slots]
+        dealer_bj = self._dealer_total(everyone) == 21
+        resolved = player_bj | dealer_bj
+        payout = self.rules.payout
+        self.rewards[:n] = payout[np.where(
+            player_bj & ~dealer_bj, NATURAL,
+            np.where(dealer_bj & ~player_bj, LOSS, PUSH)), 0]
+
+        states, actions, next_states = [], [], []
+        split_transitions, split_rounds = [], []
+        n_transitions = 0
+        n_splits = 0
+        rows = everyone[~resolved]
+        while len(rows):
+            slots = self._slot_start[rows] + self._cur[rows]
+            hard = self._hard[slots]
+            soft = self._aces[slots] & (hard <= 11)
+            first_card = self._first[slots]
+            second_card = self._second[slots]
+            two_cards = self._ncards[slots] == 2
+            pair_value = RANK_VALUE[first_card]
+            # pairs are states of their own only when they can be split
+            pair = two_cards & (pair_value == RANK_VALUE[second_card]) & \
+                self.rules.split
+            code = encode_hands(hard + 10 * soft, soft, pair, pair_value,
+                                self._upcard[rows])
+
+            # epsilon-greedy over the legal actions
+            k = len(rows)
+            nhands = self._nhands[rows]
+            can_split = pair & (first_card == second_card) & \
+                (nhands < self.rules.max_hands)
+            legality = self.rules.legality[can_split.view(np.int8),
+                                           two_cards.view(np.int8),
+                                           (nhands > 1).view(np.int8)]
+            action = greedy[code, legality]
+            explore = np.flatnonzero(tied[code] | (rng.random(k) >= epsilon))
+            legality = legality[explore]
+            pick = (rng.random(len(explore)) *
+                    _N_LEGAL[legality]).astype(np.int64)
+            action[explore] = _LEGAL_ACTIONS[legality, pick]
+
+            index = np.arange(n_transitions, n_transitions + k)
+            n_transitions += k
+            states.append(code)
+            actions.append(action)
+            next_state = np.full(k, TERMINAL_STATE, dtype=np.int64)
+            next_states.append(next_state)
+
+            # hit and double draw a card
+            hitting = action == HIT
+            doubling = action == DOUBLE
+            drawing = hitting | doubling
+            self._add_card(slots[drawing], self._draw(rows[drawing]))
+            self._doubled[slots] = doubling
+            busted = self._hard[slots] > 21
+            finished = (action == STAY) | doubling | (hitting & busted)
+            self._done[slots] = finished
+            self._pending[slots[finished]] = index[finished]
+
+            # a hit that did not bust continues from its new state
+            going = hitting & ~busted
+            g_hard = self._hard[slots[going]]
+            g_soft = self._aces[slots[going]] & (g_hard <= 11)
+            next_state[going] = encode_hands(g_hard + 10 * g_soft, g_soft,
+                                             False, 0, self._upcard[rows[going]])
+
+            splitting = np.flatnonzero(action == SPLIT)
+            if len(splitting):
+                s_rows, s_slots = rows[splitting], slots[splitting]
+                n_splits += len(s_rows)
+                split_transitions.append(index[splitting])
+                split_rounds.append(s_rows)
+                new_slots = self._slot_start[s_rows] + self._nhands[s_rows]
+                self._nhands[s_rows] += 1
+                kept = self._first[s_slots]
+                moved = self._second[s_slots]
+                self._start_hand(s_slots, kept)
+                self._start_hand(new_slots, moved)
+                self._add_card(s_slots, self._draw(s_rows))
+                self._add_card(new_slots, self._draw(s_rows))
+                # split aces receive one card each and must stay
+                if not self.rules.hit_split_aces:
+                    aces = kept == 1
+                    self._done[s_slots[aces]] = True
+                    self._done[new_slots[aces]] = True
+
+            # move every round on to its next unfinished hand
+            while len(rows):
+                playing = self._cur[rows] < self._nhands[rows]
+                rows = rows[playing]
+                slots = self._slot_start[rows] + self._cur[rows]
+                moving = self._done[slots]
+                if not moving.any():
+                    break
+                self._cur[rows[moving]] += 1
+
+        # dealer's turn, only against rounds with a hand still standing
+        valid = (np.arange(MAX_HANDS) < self._nhands[:n, None]) & \
+            ~resolved[:, None]
+        hard = self._hard[:n * MAX_HANDS].reshape(n, MAX_HANDS)
+        player_bust = hard > 21
+        if self.dealer_mode == Constants.rollout:
+            dealer_rows = everyone[(valid & ~player_bust).any(axis=1)]
+            while len(dealer_rows):
+                dealer_rows = dealer_rows[self._dealer_hits(dealer_rows)]
+                if len(dealer_rows):
+                    cards = self._draw(dealer_rows)
+                    self._dealer_hard[dealer_rows] += RANK_VALUE[cards]
+                    self._dealer_aces[dealer_rows] |= cards == 1
+            dealer_total = self._dealer_total(everyone)[:, None]
+        else:
+            final = (rng.random(n)[:, None] >
+                     self._dealer_cdf[self._upcard[:n]]).sum(axis=1)
+            dealer_total = np.where(final == BUST, 22, 17 + final)[:, None]
+
+        # Play staying hands against same dealer
+        aces = self._aces[:n * MAX_HANDS].reshape(n, MAX_HANDS)
+        player_total = hard + 10 * (aces & (hard <= 11))
+        won = valid & ~player_bust & ((dealer_total > 21) |
+                                      (player_total > dealer_total))
+        lost = valid & (player_bust | (~won & (player_total < dealer_total)))
+        doubled = self._doubled[:n * MAX_HANDS].reshape(n, MAX_HANDS).view(
+            np.int8)
+        if self.dealer_mode == Constants.expected:
+            # slots past a round's last hand hold stale totals
+            expected = self._stand_ev[np.where(valid, player_total, 0),
+                                      self._upcard[:n, None]]
+            outcome = np.where(valid, payout[WIN, doubled] * expected, 0.0)
+        else:
+            # a push pays nothing, as do slots past a round's last hand
+            outcome = payout[np.where(won, WIN, np.where(lost, LOSS, PUSH)),
+                             doubled]
+        self.rewards[:n] += outcome.sum(axis=1)
+        self.wins[:n] = won.sum(axis=1) + (player_bj & ~dealer_bj)
+        self.losses[:n] = lost.sum(axis=1) + (dealer_bj & ~player_bj)
+        self.ties[:n] = (valid & ~won & ~lost).sum(axis=1) + \
+            (player_bj & dealer_bj)
+        self.busts[:n] = (valid & player_bust).sum(axis=1)
+        self.hands[:n] = self._nhands[:n]
+
+        if not states:
+            empty = np.empty(0, dtype=np.int64)
+            return n_splits, empty, empty, np.empty(0), empty
+        states = np.concatenate(states)
+        actions = np.concatenate(actions)
+        next_states = np.concatenate(next_states)
+        rewards = np.zeros(n_transitions)
+        pending = self._pending[:n * MAX_HANDS].reshape(n, MAX_HANDS)
+        settled = valid & (pending >= 0)
+        rewards[pending[settled]] = outcome[settled]
+        if split_transitions:
+            rewards[np.concatenate(split_transitions)] = \
+                self.rewards[np.concatenate(split_rounds)]
+        return n_splits, states, actions, rewards, next_states
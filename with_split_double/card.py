@@ -1,9 +1,14 @@
 """
 Represents a Card in a blackjack game.
 
+Cards are immutable and interned: creating a card that already exists
+returns the existing object, so the 52 cards of a deck are 52 objects for
+the whole program, however many rounds are dealt. An Ace's value is always
+1; whether it counts as 11 is up to the hand holding it.
+
 Attributes:
   value (int): Value of a card in a blackjack game.
-  rank (str): Type of Card. 
+  rank (str): Type of Card.
   suit (str): Suit of Card.
 """
 
@@ -12,14 +17,33 @@ class Card():
     """
     Implement a basic playing card
     """
+    __slots__ = ("value", "rank", "suit")
+    _interned = {}
 
-    def __init__(self, value=1, rank="Ace", suit="Spades"):
+    def __new__(cls, value=1, rank="Ace", suit="Spades"):
         """
-        Initializes a new card given a value, rank, and suit.
+        Returns the card with the given value, rank, and suit, creating it
+        the first time it is asked for.
         """
-        self.value = value
-        self.rank = rank
-        self.suit = suit
+        key = (value, rank, suit)
+        card = cls._interned.get(key)
+        if card is None:
+            card = super().__new__(cls)
+            object.__setattr__(card, "value", value)
+            object.__setattr__(card, "rank", rank)
+            object.__setattr__(card, "suit", suit)
+            cls._interned[key] = card
+        return card
+
+    def __setattr__(self, name, value):
+        raise AttributeError("cards are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("cards are immutable")
+
+    def __reduce__(self):
+        # unpickled cards are interned again
+        return Card, (self.value, self.rank, self.suit)
 
     def __str__(self):
         """
@@ -32,6 +56,3 @@ class Card():
 
     def get_value(self):
         return self.value
-
-    def set_value(self, value):
-        self.value = value
@@ -0,0 +1,186 @@
+import json
+import os
+import numpy as np
+from batch_game import DECK, BatchGame
+from metrics import RECORD_DTYPE
+from rng import RandomStream
+from rules import Rules
+"""
+Checkpoints of a training Game, so that a long run can be resumed after a
+crash without repeating or losing rounds.
+
+A checkpoint is a single .npz file holding the Q-table, the order of the shoe,
+the downsampled series and rolling windows of the metrics, and a JSON document
+with everything else: the rules, the game's counters, the learner's parameters
+and decision state, the states of every random generator (the deck's, the
+learner's stream including its unused block, and the batch engine's along with
+the order of its decks), the progress count and any extra values the caller
+passes, such as the number of runs done. Checkpoints are written to a temporary
+file next to the target and then renamed over it, so a crash while saving
+leaves the previous checkpoint intact.
+
+Restoring a checkpoint into a Game built with the same settings puts it back
+exactly where it was, so the resumed game plays the same rounds the
+original would have. If the metrics spill to a file, rounds spilled after
+the checkpoint was written are cut off again.
+
+Attributes:
+    VERSION (int): The checkpoint format version, checked on load.
+"""
+
+VERSION = 1
+
+_LEARNER_FIELDS = ["_last_state", "_last_action", "_learning_rate", "_discount",
+                   "_epsilon", "_learning", "_split", "_can_double",
+                   "_has_doubled", "_action_list"]
+_METRICS_FIELDS = ["rounds", "reward", "reward_squares", "wins", "losses", "ties"]
+_SERIES = ["reward_series", "win_rate_series"]
+_WINDOWS = ["window_rewards", "window_wins", "window_hands"]
+
+
+def _generator_state(rng):
+    return None if rng is None else rng.bit_generator.state
+
+
+def _generator(state):
+    rng = np.random.default_rng()
+    rng.bit_generator.state = state
+    return rng
+
+
+def save_checkpoint(path, game, **extra):
+    """
+    Atomically writes a checkpoint of game to path, along with the
+    JSON-serializable values in extra.
+    """
+    learner, metrics, deck = game.learner, game.metrics, game.deck
+    if metrics.spill_path is not None:
+        metrics.flush()
+    # updates still waiting in a replay buffer are not saved on their own
+    learner.flush_updates()
+    engine_rng = game._engine._rng if game._engine is not None \
+        else game._engine_rng
+    stream = learner._rng
+    state = {
+        "version": VERSION,
+        "rules": game.rules.settings(),
+        "counters": {"win": game.win, "loss": game.loss, "tie": game.tie,
+                     "reward": game.reward, "game_count": game.game_count},
+        "learner": {field: getattr(learner, field) for field in _LEARNER_FIELDS},
+        "metrics": {field: getattr(metrics, field) for field in _METRICS_FIELDS},
+        "series": {name: {"stride": getattr(metrics, name).stride,
+                          "count": getattr(metrics, name).count}
+                   for name in _SERIES},
+        "windows": {name: {"count": getattr(metrics, name).count,
+                           "pos": getattr(metrics, name)._pos}
+                    for name in _WINDOWS},
+        "deck_pos": deck._pos,
+        "deck_rng": _generator_state(deck._rng),
+        "learner_rng": _generator_state(stream.generator),
+        "learner_rng_pos": stream._pos,
+        "engine_rng": _generator_state(engine_rng),
+        "progress_count": game.progress.count,
+        "extra": extra,
+    }
+    # counters may hold NumPy scalars
+    arrays = {"state": np.array(json.dumps(state, default=lambda x: x.item())),
+              "q_table": learner._Q,
+              "deck": np.frombuffer(deck._codes, dtype=np.int8),
+              "learner_block": np.array(stream._block, dtype=np.float64)}
+    if game._engine is not None:
+        arrays["engine_decks"] = game._engine._decks
+    for name in _SERIES:
+        arrays[name] = getattr(metrics, name).values()
+    for name in _WINDOWS:
+        arrays[name] = getattr(metrics, name)._values
+
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def load_checkpoint(path, game):
+    """
+    Restores the checkpoint at path into game, which must have been created
+    with the same settings (rules, metrics resolution and window) as the
+    game that was saved.
+    Returns: The extra values saved with the checkpoint.
+    """
+    with np.load(path) as data:
+        state = json.loads(str(data["state"]))
+        if state["version"] != VERSION:
+            raise ValueError(f"checkpoint {path} has version "
+                             f"{state['version']}, expected {VERSION}")
+        learner, metrics, deck = game.learner, game.metrics, game.deck
+        rules = state.get("rules")
+        if rules is not None and Rules(**rules) != game.rules:
+            raise ValueError(f"checkpoint {path} was played by "
+                             f"{Rules(**rules)}, not {game.rules}")
+        if data["q_table"].shape != learner._Q.shape:
+            raise ValueError(f"checkpoint {path} has a Q-table of shape "
+                             f"{data['q_table'].shape}, expected {learner._Q.shape}")
+        learner._Q[...] = data["q_table"]
+        for field, value in state["learner"].items():
+            setattr(learner, field, value)
+        stream = RandomStream(_generator(state["learner_rng"]),
+                              learner._rng.block_size)
+        stream._block = data["learner_block"].tolist()
+        stream._pos = state["learner_rng_pos"]
+        learner._rng = stream
+
+        if len(data["deck"]) != len(deck._codes):
+            raise ValueError(f"checkpoint {path} has a shoe of {len(data['deck'])}"
+                             f" cards, expected {len(deck._codes)}")
+        deck._shuffle_view[:] = data["deck"]
+        deck._pos = state["deck_pos"]
+        # the running count is recounted from the restored shoe when needed
+        deck._count = deck._counted = 0
+        deck._rng = _generator(state["deck_rng"])
+
+        if state["engine_rng"] is not None:
+            game._engine_rng = _generator(state["engine_rng"])
+            if game._engine is not None:
+                game._engine._rng = game._engine_rng
+        if "engine_decks" in data:
+            decks = data["engine_decks"]
+            if game._engine is None or len(game._engine._decks) != len(decks):
+                shoe = len(DECK) * (game.rules.num_decks or 1)
+                game._engine = BatchGame(len(decks) // shoe,
+                                         rng=game._engine_rng,
+                                         dealer_mode=game.dealer_mode,
+                                         infinite_deck=game.infinite_deck,
+                                         rules=game.rules)
+            game._engine._decks[:] = decks
+
+        for field, value in state["counters"].items():
+            setattr(game, field, value)
+        for field, value in state["metrics"].items():
+            setattr(metrics, field, value)
+        for name in _SERIES:
+            series, values = getattr(metrics, name), data[name]
+            if len(values) > series.resolution:
+                raise ValueError(f"checkpoint {path} keeps more samples than "
+                                 f"the metrics resolution {series.resolution}")
+            series._values[:len(values)] = values
+            series._n = len(values)
+            series.stride = state["series"][name]["stride"]
+            series.count = state["series"][name]["count"]
+        for name in _WINDOWS:
+            window, values = getattr(metrics, name), data[name]
+            if len(values) != window.size:
+                raise ValueError(f"checkpoint {path} has a window of "
+                                 f"{len(values)} rounds, expected {window.size}")
+            window._values[:] = values
+            window._pos = state["windows"][name]["pos"]
+            window.count = state["windows"][name]["count"]
+            window._sum = float(values.sum())
+        game.progress.count = state["progress_count"]
+
+    if metrics.spill_path is not None and os.path.exists(metrics.spill_path):
+        # rounds spilled after the checkpoint are played again
+        metrics._pending = []
+        os.truncate(metrics.spill_path, metrics.rounds * RECORD_DTYPE.itemsize)
+    return state["extra"]
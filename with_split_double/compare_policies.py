@@ -1,4 +1,5 @@
 import pandas as pd
+from strategy_solver import StrategySolver
 
 df_learner = pd.read_csv("optimal_policy.csv")
 # Select 1nd, 2rd, and 5th columns
@@ -8,8 +9,16 @@ print(df_learner)
 df_basic = pd.read_csv("basic_strat.csv")
 print(df_basic)
 
+# solved reference for the rules the game is actually played with
+df_solved = StrategySolver().solve()[['player', 'dealer', 'optimal']]
+df_solved['player'] = df_solved['player'].astype(str)
+df_learner['player'] = df_learner['player'].astype(str)
+df_basic['player'] = df_basic['player'].astype(str)
+
 # diff = pd.concat([df_basic, df_learner]).drop_duplicates(keep=False)
 merge_df = pd.merge(df_learner, df_basic, on=['player', 'dealer'], suffixes=('_learner', '_basic'))
+merge_df = pd.merge(merge_df, df_solved.rename(columns={'optimal': 'optimal_solved'}),
+                    on=['player', 'dealer'], how='left')
 
 # print(diff)
 merge_df.to_csv('merged.csv', index=False)
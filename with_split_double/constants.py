@@ -5,3 +5,9 @@ class Constants:
     double = 'double'
     player1 = 'you'
     player2 = 'dealer'
+    sequential = 'sequential'
+    batch = 'batch'
+    parallel = 'parallel'
+    rollout = 'rollout'
+    sample = 'sample'
+    expected = 'expected'
@@ -1,11 +1,12 @@
 from constants import Constants
 from player import Player
+from rules import DEFAULT_RULES
 """
 Represents the dealer in the Blackjack game. Extends the Player class.
 
-While inheritting most behaviors of Player class, the Dealer is different from 
-other players on the table in that they must hit when their value is less than 17.
-The Dealer also shows the first card initially.
+While inheritting most behaviors of Player class, the Dealer is different from
+other players on the table in that they must hit or stay as the table rules
+say (see rules.Rules). The Dealer also shows the first card initially.
 
 """
 
@@ -23,13 +24,12 @@ class Dealer(Player):
         """
         return self._hand[0].value
 
-    def get_action(self):
+    def get_action(self, rules=DEFAULT_RULES):
         """
-        Returns: dealer's action based on the total hand value. 
-        If the total hand value is less than 17, the dealer must hit, else
-        the dealer stays.
+        Returns: dealer's action based on the total hand value.
+        The dealer hits while rules say it must, else the dealer stays.
         """
-        if self.get_hand_value() < 17:
+        if rules.dealer_hits(self.get_hand_value(), self.is_soft()):
             return Constants.hit
         else:
             return Constants.stay
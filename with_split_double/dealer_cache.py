@@ -0,0 +1,164 @@
+from collections import OrderedDict
+import numpy as np
+from rules import DEFAULT_RULES
+"""
+Cache of the dealer's final-total probabilities. How the dealer finishes only
+depends on the showing card, the rules and the cards left in the shoe, so
+instead of rolling the dealer out card by card the distribution is computed
+once by recursion over the remaining card counts and looked up afterwards.
+
+Entries for a full shoe (minus the showing card) are kept for good. Entries
+keyed by a specific remaining-deck composition are kept in least recently
+used order and evicted once there are more than maxsize of them.
+
+The shoe and the dealer's play come from a Rules object, the dealer hitting
+wherever its compiled dealer_hit table says so. With num_decks=None the shoe
+is infinite: drawing never changes the counts, so every distribution is the
+full-shoe one.
+
+Attributes:
+    rules (Rules): The rules the distributions are for.
+    shoe (tuple): Counts of card values 1 (Ace) to 10 in a full shoe, or
+        their proportions in an infinite one.
+    maxsize (int): Composition-keyed entries kept, None for no limit.
+    hits (int): Lookups answered from the cache.
+    misses (int): Lookups that had to be computed.
+"""
+
+# dealer final totals 17-21 followed by bust
+OUTCOMES = [17, 18, 19, 20, 21, 'bust']
+N_OUTCOMES = len(OUTCOMES)
+BUST = N_OUTCOMES - 1
+_FINAL = [tuple(float(i == outcome) for i in range(N_OUTCOMES))
+          for outcome in range(N_OUTCOMES)]
+
+
+def remove_card(counts, value):
+    """
+    Returns: The counts tuple with one card of value (Ace = 1) removed.
+    """
+    counts = list(counts)
+    counts[value - 1] -= 1
+    return tuple(counts)
+
+
+class DealerOutcomeCache:
+    def __init__(self, rules=DEFAULT_RULES, maxsize=4096):
+        """
+        Initializes an empty cache for the shoe and dealer of rules.
+        """
+        self.rules = rules
+        # the settings the dealer's outcomes depend on, part of every key
+        self._key = (rules.num_decks, rules.dealer_stand, rules.hit_soft_17)
+        self._dealer_hit = rules.dealer_hit.tolist()
+        self._infinite = rules.num_decks is None
+        decks = 1 if self._infinite else rules.num_decks
+        self.shoe = tuple([4 * decks] * 9 + [16 * decks])
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._fixed = {}
+        self._lru = OrderedDict()
+        self._nodes = {}  # memo of the recursion, shared between entries
+
+    def distribution(self, upcard, counts=None):
+        """
+        Returns: The probabilities of the dealer finishing on 17, 18, 19, 20,
+        21 and bust as a tuple, given the showing card value (Ace as 1 or 11)
+        and optionally the counts of card values left in the shoe (the full
+        shoe minus the showing card by default), conditioned on the dealer not
+        having a natural.
+        """
+        upcard = 1 if upcard == 11 else upcard
+        if counts is None:
+            key = (upcard, self._key)
+            dist = self._fixed.get(key)
+            if dist is None:
+                self.misses += 1
+                dist = self._fixed[key] = self._dealer(
+                    self._remove(self.shoe, upcard), upcard, upcard == 1, True)
+            else:
+                self.hits += 1
+            return dist
+
+        key = (upcard, self._key, counts)
+        dist = self._lru.get(key)
+        if dist is not None:
+            self.hits += 1
+            self._lru.move_to_end(key)
+            return dist
+        self.misses += 1
+        dist = self._lru[key] = self._dealer(counts, upcard, upcard == 1, True)
+        if self.maxsize is not None and len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+            # the recursion memo is only worth keeping while entries are
+            self._nodes.clear()
+        return dist
+
+    def _dealer(self, counts, hard, ace, hole):
+        key = (counts, hard, ace, hole)
+        memo = self._nodes.get(key)
+        if memo is not None:
+            return memo
+        soft = ace and hard <= 11
+        total = hard + 10 if soft else hard
+        if total > 21:
+            dist = _FINAL[BUST]
+        elif not hole and not self._dealer_hit[soft][total]:
+            dist = _FINAL[total - 17]
+        else:
+            # the hole card cannot complete a natural, those were settled
+            natural = 0
+            if hole and hard == 1:
+                natural = 10
+            elif hole and hard == 10:
+                natural = 1
+            remaining = sum(counts) - (counts[natural - 1] if natural else 0)
+            dist = [0.0] * N_OUTCOMES
+            for value in range(1, 11):
+                count = counts[value - 1]
+                if count == 0 or value == natural:
+                    continue
+                p = count / remaining
+                child = self._dealer(self._remove(counts, value), hard + value,
+                                     ace or value == 1, False)
+                dist = [d + p * c for d, c in zip(dist, child)]
+            dist = tuple(dist)
+        self._nodes[key] = dist
+        return dist
+
+    def _remove(self, counts, value):
+        """Returns: counts after drawing a card of value from the shoe"""
+        return counts if self._infinite else remove_card(counts, value)
+
+    def stand_ev(self, total, upcard, counts=None):
+        """
+        Returns: The expected value of standing on total against the dealer's
+        showing card.
+        """
+        if total > 21:
+            return -1.0
+        dist = self.distribution(upcard, counts)
+        ev = dist[BUST]
+        for dealer_total in range(17, 22):
+            if dealer_total < total:
+                ev += dist[dealer_total - 17]
+            elif dealer_total > total:
+                ev -= dist[dealer_total - 17]
+        return ev
+
+    def cumulative(self):
+        """
+        Returns: A (10, N_OUTCOMES) array with the cumulative full-shoe
+        distribution for each showing card 2-11, for sampling final totals.
+        """
+        return np.cumsum([self.distribution(upcard) for upcard in range(2, 12)],
+                         axis=1)
+
+    def stand_ev_table(self):
+        """
+        Returns: A (32, 10) array with the full-shoe expected value of
+        standing on every total 0-31 against each showing card 2-11.
+        """
+        return np.array([[self.stand_ev(total, upcard) for upcard in range(2, 12)]
+                         for total in range(32)])
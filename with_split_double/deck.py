@@ -1,12 +1,41 @@
-import random
+from array import array
+import numpy as np
 from card import Card
+from rng import make_rng
 """
-Represents a standard deck of playing cards in blackjack. Has attributes and 
-methods that allows for storing values of cards as well as drawing cards at r
-andom without replacement. 
+Represents a shoe of one or more standard decks of playing cards in blackjack.
+Cards are stored as integer codes (rank index * 4 + suit index) in a
+preshuffled array and dealt from a cursor, so drawing a card is O(1) and
+allocates nothing. The shoe is reused across rounds and only reshuffled once
+the cursor passes the penetration point. Drawing a Card returns one of the
+52 interned Card objects in Deck.cards, so no Card is ever created while
+dealing.
+
+The shoe keeps the Hi-Lo running count of the cards dealt since it was
+last shuffled (+1 for 2-6, -1 for tens and Aces). Drawing does no counting:
+the count catches up on the cards dealt since it was last asked for, so it
+costs nothing unless it is used, and true_count divides it by the decks
+left.
+
+InfiniteShoe deals from infinitely many decks instead, which is the model
+the strategy tables assume. It draws its card codes in blocks with a single
+call to the generator and deals them from the same cursor, refilling the
+block when it runs out.
 
 Attributes:
-  _cards (list): A list containing all playing cards in blackjack. 
+  num_decks (int): Number of 52 card decks in the shoe.
+  penetration (float): Fraction of the shoe dealt before it is reshuffled at
+    the start of a round. Defaults to 0, which reshuffles before every round
+    like a brand new deck.
+  _codes (array): The shuffled card codes of the shoe.
+  _shuffle_view (ndarray): A NumPy view sharing _codes' memory, used to
+    shuffle the shoe in place.
+  _pos (int): Index of the next card to be dealt.
+  _rng (Generator): The generator the shoe is shuffled with.
+  _count (int): The running count of the cards up to _counted.
+  _counted (int): Index of the first card not counted yet.
+  cards (tuple): The Card of every card code.
+  hi_lo (tuple): The Hi-Lo count of every card code.
 """
 
 
@@ -16,20 +45,176 @@ class Deck:
              ('Queen', 10), ('King', 10)]
     suits = ['Spades', 'Diamonds', 'Hearts', 'Clubs']
 
-    def __init__(self):
+    def __init__(self, num_decks=1, penetration=0.0, rng=None):
+        """
+        Initializes the shoe with num_decks decks in shuffled order, shuffled
+        by rng (a Generator or a seed for one).
+        """
+        self.num_decks = num_decks
+        self.penetration = penetration
+        self._rng = make_rng(rng)
+        self._set_codes(list(range(len(self.ranks) * len(self.suits))) *
+                        num_decks)
+        self.shuffle()
+
+    def _set_codes(self, codes):
+        self._codes = array('b', codes)
+        self._shuffle_view = np.frombuffer(self._codes, dtype=np.int8)
+        self._pos = 0
+        self._count = self._counted = 0
+
+    @classmethod
+    def card(cls, code) -> Card:
+        """
+        Returns: The Card object for the given card code.
+        """
+        return cls.cards[code]
+
+    @classmethod
+    def code(cls, card: Card):
+        """
+        Returns: The card code of the given Card object.
+        """
+        return cls._codes_by_name[card.get_rank(), card.suit]
+
+    @property
+    def _cards(self):
+        """The cards left in the shoe, as Card objects"""
+        return [self.card(code) for code in self._codes[self._pos:]]
+
+    @_cards.setter
+    def _cards(self, cards):
+        """Replaces the shoe with the given cards, dealt in that order"""
+        self._set_codes([self.code(card) for card in cards])
+
+    def shuffle(self):
+        """
+        Shuffles every card back into the shoe.
+        """
+        self._rng.shuffle(self._shuffle_view)
+        self._pos = 0
+        self._count = self._counted = 0
+
+    def reseed(self, rng):
+        """
+        Puts the shoe back in order and shuffles it with rng (a Generator or a
+        seed for one), so that its deals only depend on rng from now on.
+        """
+        self._rng = make_rng(rng)
+        self._shuffle_view.sort()
+        self.shuffle()
+
+    def remaining(self):
+        """
+        Returns: The number of cards left before the shoe runs out.
+        """
+        return len(self._codes) - self._pos
+
+    def start_round(self):
+        """
+        Reshuffles the shoe if the penetration point has been reached.
+        """
+        if self._pos >= self.penetration * len(self._codes):
+            self.shuffle()
+
+    def reshuffles_every_round(self):
+        """
+        Returns: True if the shoe is reshuffled before every round, because
+        its penetration point comes before the four cards of a deal, so no
+        count carries over from one round to the next.
+        """
+        return self.penetration * len(self._codes) <= 4
+
+    def draw_code(self):
         """
-        Initializes the deck by creating list of cards, iterating through all ranks and suits.
+        Draws the next card from the shoe, reshuffling it if it ran out.
+        Returns: The card code of the drawn card.
         """
-        self._cards = []
-        for r in self.ranks:
-            for s in self.suits:
-                self._cards.append(Card(r[1], r[0], s))
+        if self._pos == len(self._codes):
+            self.shuffle()
+        code = self._codes[self._pos]
+        self._pos += 1
+        return code
 
     def draw(self) -> Card:
         """
-        Draws a card randomly from the deck without replacement.
-        Returns: A tuple containing the card identifier and card value.
+        Draws the next card from the shoe without replacement.
+        Returns: A Card object for the drawn card.
+        """
+        return self.cards[self.draw_code()]
+
+    def running_count(self):
+        """
+        Returns: The Hi-Lo running count of the cards dealt since the shoe was
+        last shuffled.
+        """
+        if self._counted < self._pos:
+            self._count += sum(map(self.hi_lo.__getitem__,
+                                   self._codes[self._counted:self._pos]))
+            self._counted = self._pos
+        return self._count
+
+    def true_count(self, unseen=()):
+        """
+        Returns: The running count per deck left in the shoe, leaving out the
+        dealt cards in unseen, such as the dealer's hole card, which count as
+        still in the shoe.
+        """
+        running = self.running_count() - \
+            sum(self.hi_lo[self.code(card)] for card in unseen)
+        cards_left = max(self.remaining() + len(unseen), 1)
+        return running * len(self.cards) / cards_left
+
+
+class InfiniteShoe(Deck):
+    def __init__(self, block_size=4096, rng=None):
+        """
+        Initializes an infinite shoe, in which every card is drawn
+        independently and uniformly from the 52 card codes, as if from
+        infinitely many decks. Cards are generated block_size at a time by rng
+        (a Generator or a seed for one) and dealt from the block by the cursor.
+        """
+        self.num_decks = None
+        self.penetration = 0.0
+        self._rng = make_rng(rng)
+        self._set_codes([0] * block_size)
+        self.shuffle()
+
+    def shuffle(self):
+        """
+        Replaces the block with block_size freshly drawn cards.
         """
-        card = random.choice(self._cards)
-        self._cards.remove(card)
-        return card
+        self._shuffle_view[:] = self._rng.integers(
+            len(self.cards), size=len(self._shuffle_view))
+        self._pos = 0
+
+    def start_round(self):
+        """
+        Does nothing: drawing never changes what an infinite shoe deals next.
+        """
+
+    def reshuffles_every_round(self):
+        """
+        Returns: True, no card dealt makes any other more or less likely.
+        """
+        return True
+
+    def running_count(self):
+        """
+        Returns: 0, the cards dealt say nothing about the ones to come.
+        """
+        return 0
+
+    def true_count(self, unseen=()):
+        """
+        Returns: 0.0, the count of an infinite shoe never moves.
+        """
+        return 0.0
+
+
+Deck.cards = tuple(Card(value, rank, suit) for rank, value in Deck.ranks
+                   for suit in Deck.suits)
+Deck._codes_by_name = {(card.rank, card.suit): code
+                       for code, card in enumerate(Deck.cards)}
+Deck.hi_lo = tuple(1 if 2 <= card.value <= 6 else -1 if card.value in (1, 10)
+                   else 0 for card in Deck.cards)
@@ -0,0 +1,164 @@
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+from batch_game import BatchGame
+from constants import Constants
+from policy_table import PolicyTable
+from q_store import EXTENSION, QTableStore
+from rng import spawn_seeds
+"""
+Evaluation of a frozen policy, separate from learning. The policy is played
+greedily by the vectorized BatchGame, with no exploration and no Q-updates,
+in chunks of batch_size rounds. With more than one worker the chunks of each
+wave are played in a pool of processes. Every chunk has its own SeedSequence,
+the child of the seed at the chunk's position, so for a given seed the same
+chunks are played however many workers there are.
+
+After every wave the expected value per round (per initial hand, splits and
+doubles included in its reward) and its 95% confidence interval are
+computed from the running sums, and evaluation stops early once the interval
+is narrower than tol.
+
+sweep_rules evaluates one policy under several sets of rules, e.g. to see
+what hitting soft 17 or a 6:5 payout costs it.
+
+Attributes:
+    Z_95 (float): The normal quantile of a two-sided 95% confidence interval.
+    FIELDS (list): The keys of an evaluation result, in order.
+"""
+
+Z_95 = 1.959963984540054
+FIELDS = ["rounds", "hands", "ev", "ev_per_hand", "variance", "std_error",
+          "ci_low", "ci_high", "win", "loss", "push", "bust", "win_rate",
+          "loss_rate", "push_rate", "bust_rate", "stopped_early"]
+
+# totals returned for every chunk, in this order
+_TOTALS = ["rounds", "hands", "reward", "reward_sq", "win", "loss", "push",
+           "bust"]
+
+
+def as_policy(policy):
+    """
+    Returns: policy as a PolicyTable. A Q-table, or a QTableStore or the path
+    of one, gives its greedy policy, and a strategy DataFrame or file is
+    compiled with PolicyTable.from_strategy.
+    """
+    if isinstance(policy, PolicyTable):
+        return policy
+    if isinstance(policy, str) and policy.endswith(EXTENSION):
+        policy = QTableStore(policy)
+    if isinstance(policy, QTableStore):
+        policy = policy.q
+    if isinstance(policy, np.ndarray):
+        return PolicyTable.from_q_table(policy)
+    return PolicyTable.from_strategy(policy)
+
+
+def play_chunk(chunk):
+    """
+    Plays one chunk of rounds with a policy, in whichever process runs it.
+    chunk is (policy table, SeedSequence, number of rounds, batch size,
+    dealer mode, rules).
+    Returns: The chunk's totals, an array in _TOTALS order.
+    """
+    policy, seed, n_rounds, batch_size, dealer_mode, rules = chunk
+    engine = BatchGame(min(batch_size, n_rounds), rng=np.random.default_rng(seed),
+                       dealer_mode=dealer_mode, rules=rules)
+    totals = np.zeros(len(_TOTALS))
+    remaining = n_rounds
+    while remaining > 0:
+        n = min(remaining, engine.batch_size)
+        engine.play(None, 1.0, n, policy=policy)
+        rewards = engine.rewards[:n]
+        totals += [n, engine.hands[:n].sum(), rewards.sum(),
+                   np.dot(rewards, rewards), engine.wins[:n].sum(),
+                   engine.losses[:n].sum(), engine.ties[:n].sum(),
+                   engine.busts[:n].sum()]
+        remaining -= n
+    return totals
+
+
+def summarize(totals, stopped_early=False):
+    """
+    Returns: The evaluation result for totals in _TOTALS order, a dict with
+    the FIELDS keys.
+    """
+    t = dict(zip(_TOTALS, totals.tolist()))
+    n, hands = int(t["rounds"]), int(t["hands"])
+    ev = t["reward"] / n
+    variance = max(t["reward_sq"] / n - ev * ev, 0.0) * n / max(n - 1, 1)
+    std_error = (variance / n) ** 0.5
+    outcomes = {key: int(t[key]) for key in ("win", "loss", "push", "bust")}
+    return {"rounds": n, "hands": hands, "ev": ev,
+            "ev_per_hand": t["reward"] / hands, "variance": variance,
+            "std_error": std_error, "ci_low": ev - Z_95 * std_error,
+            "ci_high": ev + Z_95 * std_error, **outcomes,
+            **{f"{key}_rate": count / hands for key, count in outcomes.items()},
+            "stopped_early": stopped_early}
+
+
+def evaluate(policy, n_rounds=1000000, n_workers=1, seed=None, tol=None,
+             batch_size=65536, dealer_mode=Constants.rollout, rules=None):
+    """
+    Plays up to n_rounds rounds of policy (a PolicyTable, a Q-table, a
+    QTableStore or its path, or a strategy) without learning, n_workers
+    chunks of batch_size rounds at a time. If tol is given, stops as soon as
+    the 95% confidence interval of the expected value is narrower than tol.
+    dealer_mode and rules are passed to BatchGame; Constants.expected gives
+    the narrowest intervals. A store is played by the rules it was learned
+    under unless rules are given.
+    Returns: A dict with the number of rounds and hands played, the expected
+    value per round and per hand, the variance of the reward of a round, the
+    standard error and confidence interval of the expected value, the win,
+    loss, push and bust counts and their rates per hand, and whether the
+    evaluation stopped early.
+    """
+    if isinstance(policy, str) and policy.endswith(EXTENSION):
+        policy = QTableStore(policy)
+    if isinstance(policy, QTableStore) and rules is None:
+        rules = policy.rules
+    policy = as_policy(policy)
+    root = np.random.SeedSequence(seed)
+    totals = np.zeros(len(_TOTALS))
+    pool = Pool(n_workers) if n_workers > 1 else None
+    try:
+        played = 0
+        while played < n_rounds:
+            sizes = []
+            while len(sizes) < n_workers and played < n_rounds:
+                sizes.append(min(batch_size, n_rounds - played))
+                played += sizes[-1]
+            chunks = [(policy, child, size, batch_size, dealer_mode, rules) for
+                      child, size in zip(spawn_seeds(root, len(sizes)), sizes)]
+            results = pool.map(play_chunk, chunks) if pool \
+                else map(play_chunk, chunks)
+            for result in results:
+                totals += result
+            if tol is not None and played < n_rounds:
+                result = summarize(totals, stopped_early=True)
+                if result["ci_high"] - result["ci_low"] < tol:
+                    return result
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return summarize(totals)
+
+
+def sweep_rules(policy, variants, **kwargs):
+    """
+    Evaluates policy under every set of rules in variants, a dict of name ->
+    Rules, passing kwargs on to evaluate.
+    Returns: An evaluation_frame with one row per variant.
+    """
+    policy = as_policy(policy)
+    return evaluation_frame({name: evaluate(policy, rules=rules, **kwargs)
+                             for name, rules in variants.items()})
+
+
+def evaluation_frame(results):
+    """
+    Returns: A DataFrame of evaluation results with one row per policy, from
+    a dict of policy name -> result.
+    """
+    return pd.DataFrame.from_dict(results, orient="index", columns=FIELDS)
@@ -1,8 +1,20 @@
 from constants import Constants
 from dealer import Dealer
-from deck import Deck
+from deck import Deck, InfiniteShoe
 from q_learner import QLearner
+from policy_table import PolicyPlayer
+from batch_game import BatchGame, apply_q_updates
+from parallel_train import ParallelTrainer
+from state_encoding import (DOUBLE, N_CODES, TERMINAL_STATE, count_bucket,
+                            encode_state)
+from metrics import Metrics
+from progress import ProgressReporter
+from rng import RandomStream, spawn
+from rules import Rules, LOSS, PUSH, WIN, NATURAL
 import matplotlib.pyplot as plt
+import numpy as np
+import os
+import time
 
 """
 Designed to simulate and run the game of Blackjack using a Q-Learner agent.
@@ -12,15 +24,47 @@ reward (profit/loss) over time and contains tools to plot the win rate over time
 
 Attributes:
     learner (Learner): The Q-Learner agent that learns and plays game. Defaults to QLearner if not provided.
+        A PolicyPlayer plays a frozen policy instead, without learning.
     num_learning_rounds (int): The total number of rounds to be played for learning.
-    report_every (int): The frequency at which the current win rate is reported. Default to 100.
+    progress (ProgressReporter): Reports the win rate, rounds per second and
+        time left as rounds are played, at most once a second by default.
     win (int): Counts the number of games learner has won.
     loss (int): Counts the number of games learner has lost.
     tie (int): Counts the number of games learner has tied.
     game_count (int): The total number of rounds played (learning and testing).
-    win_rate_history (list): A list storing the win rate after each game.
-    reward_history (list): A list storing cumulative rewards after each game.
+    metrics (Metrics): Running aggregates of the results of every round, in
+        constant memory.
+    win_rate_history (ndarray): The win rate after each game, downsampled by
+        metrics to at most its resolution.
+    reward_history (ndarray): The cumulative reward after each game,
+        downsampled the same way.
     reward (int): Tracks the cumulative reward. 
+    mode (str): Constants.sequential plays one round at a time, Constants.batch
+        simulates batch_size rounds at once with BatchGame, and
+        Constants.parallel has n_workers processes simulate batches at once
+        with ParallelTrainer, merging their Q-updates after every batch.
+    batch_size (int): The number of rounds simulated per batch in batch mode,
+        and by each worker in parallel mode.
+    n_workers (int): The number of worker processes in parallel mode. Defaults
+        to the number of CPUs.
+    dealer_mode (str): How BatchGame plays the dealer in batch mode, see
+        batch_game. Defaults to Constants.rollout.
+    rules (Rules): The rules every mode plays by: whether split and double
+        are allowed, the number of decks, when the dealer stands and what
+        every hand pays. Defaults to Rules().
+    deck (Deck): The shoe reused by every round. Defaults to rules.new_deck(),
+        a shoe of rules.num_decks decks reshuffled before each round, or an
+        InfiniteShoe. With an InfiniteShoe, the batch and parallel modes draw
+        with replacement as well.
+    profiler (Profiler): If given, times the phases of every round and counts
+        splits, doubles, busts, Q-table misses and new states, see profiling.
+    _count_offset (int): The first state code of the true count bucket of
+        the round being played, 0 unless the learner counts cards. The count
+        is taken when the cards are dealt, without the dealer's hole card,
+        and holds for the whole round.
+    seed (int): If given, the deck, the learner and the batch engine are each
+        given an independent random stream spawned from it, so that the game
+        plays the same rounds every time. Otherwise they draw fresh entropy.
 """
 
 
@@ -35,13 +79,13 @@ def perform_stay(hand: QLearner, staying_hands: list):
 
 
 def perform_split(hand: QLearner, staying_hands: list, hands: list, deck: Deck,
-                  get_state, orig_hand, dealer: Dealer):
+                  get_state, orig_hand, dealer: Dealer, hit_split_aces=False):
     is_pair = (orig_hand[0].get_value() == orig_hand[1].get_value())
     assert is_pair or pair_of_aces(orig_hand)
     assert len(orig_hand) == 2
 
-    p1 = QLearner(hand._last_state, hand._last_action)
-    p2 = QLearner(hand._last_state, hand._last_action)
+    p1 = hand.split_hand()
+    p2 = hand.split_hand()
     p1.set_initial_split_hand(hand.get_hand()[0])
     p1.hit(deck)
     state = get_state(p1, dealer)
@@ -51,7 +95,7 @@ def perform_split(hand: QLearner, staying_hands: list, hands: list, deck: Deck,
     p2.hit(deck)
     state = get_state(p2, dealer)
     p2.update(state, 0)
-    if pair_of_aces(orig_hand):
+    if pair_of_aces(orig_hand) and not hit_split_aces:
         staying_hands.extend([p1, p2])
     else:
         hands.extend([p1, p2])
@@ -69,33 +113,59 @@ def pair_of_aces(hand):
 
 
 class Game:
-    SPECIAL_DECK = {(2, 2): "2,2", (3, 3): "3,3", (4, 4): "4,4", (5, 5): "5,5",
-                    (6, 6): "6,6", (7, 7): "7,7", (8, 8): "8,8", (9, 9): "9,9",
-                    (10, 10): "10,10", (11, 1): "A,A"}  # (1,11) not possible with ace impl
-
-    for i in range(2, 10):  # Add Aces table
-        SPECIAL_DECK[(i, 11)] = f"A,{i}"
-        SPECIAL_DECK[(11, i)] = f"A,{i}"
-
-    def __init__(self, num_learning_rounds, learner=None, report_every=100):
+    def __init__(self, num_learning_rounds, learner=None, progress=None,
+                 mode=Constants.sequential, batch_size=65536, deck=None,
+                 dealer_mode=Constants.rollout, metrics=None, seed=None,
+                 profiler=None, n_workers=None, rules=None):
         """
         Initializes a new game instance with initial settings.
         """
         # Default to QLearner if not provided
         self.learner = learner if learner else QLearner()
         self.num_learning_rounds = num_learning_rounds
-        self.report_every = report_every
+        self.progress = progress if progress else ProgressReporter()
         self.win = 0
         self.loss = 0
         self.tie = 0
         self.game_count = 1
-        self.win_rate_history = []  # List to store win rates over time
-        self.reward_history = []
+        self.metrics = metrics if metrics else Metrics()
         self.reward = 0
+        self.mode = mode
+        self.batch_size = batch_size
+        self.n_workers = n_workers if n_workers else os.cpu_count()
+        self.dealer_mode = dealer_mode
+        self._engine = None
+        self.rules = rules if rules else Rules()
+        self.deck = deck if deck else self.rules.new_deck()
+        self.profiler = profiler
+        self.seed = seed
+        # reused by every round instead of being created per round
+        self._dealer = Dealer()
+        self._hands = []
+        self._staying_hands = []
+        self._engine_rng = None
+        self._count_offset = 0
+        if seed is not None:
+            deck_rng, learner_rng, self._engine_rng = spawn(seed, 3)
+            self.deck.reseed(deck_rng)
+            self.learner._rng = RandomStream(learner_rng)
+
+    @property
+    def infinite_deck(self):
+        """Whether cards are dealt from an InfiniteShoe"""
+        return isinstance(self.deck, InfiniteShoe)
 
     def get_reward(self):
         return self.reward
 
+    @property
+    def win_rate_history(self):
+        return self.metrics.win_rate_series.values()
+
+    @property
+    def reward_history(self):
+        return self.metrics.reward_series.values()
+
     def run(self):
         """
         Runs the blackjack game for a set number of learning rounds.
@@ -104,51 +174,107 @@ class Game:
         its Q-values based on the outcome of the game. Win rates and rewards are
         tracked after each round.
         """
+        if self.learner._count_limit and self.mode != Constants.sequential:
+            raise ValueError("card counting needs the sequential mode, the "
+                             f"{self.mode} mode deals every round from a new "
+                             "shoe")
+        if self.learner._count_limit and self.deck.reshuffles_every_round():
+            raise ValueError("card counting needs a shoe dealt over several "
+                             "rounds, this one is reshuffled before every "
+                             "round; give the Deck a penetration")
+        prof = self.profiler
+        if prof:
+            prof.enable()
+            seen = int(self.learner._Q.any(axis=1).sum())
+        self.progress.start()
+        if self.mode == Constants.batch:
+            self.run_batch()
+        elif self.mode == Constants.parallel:
+            self.run_parallel()
+        else:
+            self.run_sequential()
+        if prof:
+            prof.disable()
+            prof.count("new_states",
+                       int(self.learner._Q.any(axis=1).sum()) - seen)
 
+    def run_sequential(self):
+        """
+        Plays the learning rounds one at a time.
+        """
+        progress = self.progress
+        prof = self.profiler
+        rules = self.rules
+        # the compiled rule tables, as lists for cheap scalar lookups
+        dealer_hit = rules.dealer_hit.tolist()
+        payout = rules.payout.tolist()
         for _ in range(self.num_learning_rounds):
+            if progress.tick():
+                self.report()
+            if prof:
+                prof.rounds += 1
+                t = time.perf_counter()
             deck, player, dealer, winner = self.reset_round()
+            if prof:
+                t = prof.lap("deal", t)
             orig_player = player
-            orig_hand = player.get_hand()
+            win, loss, tie = self.win, self.loss, self.tie
 
             # handle blackjack
             if player.get_hand_value() == 21 and dealer.get_hand_value() != 21:
+                natural = payout[NATURAL][0]
                 self.win += 1
-                self.reward += 1.5
+                self.reward += natural
                 player.update(self.get_final_state(
-                    player, dealer), 1.5)
+                    player, dealer), natural)
+                self.metrics.record(natural, 1, 0, 0)
                 continue
             elif player.get_hand_value() == 21 and dealer.get_hand_value() == 21:
                 self.tie += 1
                 player.update(self.get_final_state(
                     player, dealer), 0)
+                self.metrics.record(0, 0, 0, 1)
                 continue
             elif player.get_hand_value() != 21 and dealer.get_hand_value() == 21:
                 self.loss += 1
                 self.reward -= 1
                 player.update(self.get_final_state(
                     player, dealer), -1)
+                self.metrics.record(-1, 0, 1, 0)
                 continue
 
-            staying_hands = []
-            hands = [player]
+            staying_hands = self._staying_hands
+            staying_hands.clear()
+            hands = self._hands
+            hands.clear()
+            hands.append(player)
             split = False
+            n_hands = 1
             cum_reward = 0
             idx = 0
             while idx < len(hands):
                 hand = hands[idx]
                 state = self.get_state(hand, dealer)
+                if not rules.may_double(split):
+                    hand._can_double = False
                 while True:
                     hand.disable_split()
-                    if hand.can_split():
+                    if rules.may_split(n_hands) and \
+                            len(hand.get_hand()) == 2 and hand.can_split():
                         hand.enable_split()
 
-                    action = player.get_action(state)
+                    if prof and not hand._Q[state].any():
+                        prof.count("q_misses")
+                    # every hand decides with its own split and double flags
+                    action = hand.get_action(state)
 
                     if action == Constants.hit:  # hits
                         perform_hit(hand, deck)
                         if self.is_bust(hand):
-                            cum_reward -= 1
+                            cum_reward += payout[LOSS][0]
                             self.loss += 1
+                            if prof:
+                                prof.count("busts")
                             break
 
                     elif action == Constants.stay:  # stays
@@ -157,106 +283,222 @@ class Game:
 
                     elif action == Constants.split:  # splits
                         split = True
+                        n_hands += 1
                         self.game_count += 1
 
-                        perform_split(hand, staying_hands, hands,
-                                      deck, self.get_state, orig_hand, dealer)
+                        if prof:
+                            t = prof.lap("decisions", t)
+                            prof.count("splits")
+                        perform_split(hand, staying_hands, hands, deck,
+                                      self.get_state, hand.get_hand(), dealer,
+                                      rules.hit_split_aces)
+                        if prof:
+                            t = prof.lap("split", t)
                         break
 
                     elif action == Constants.double:
                         perform_double(hand, deck)
+                        if prof:
+                            prof.count("doubles")
                         if self.is_bust(hand):
-                            cum_reward -= 2
+                            cum_reward += payout[LOSS][1]
                             self.loss += 1
+                            if prof:
+                                prof.count("busts")
                             break
 
                         staying_hands.append(hand)  # must stay after doubled
                     state = self.get_state(hand, dealer)
-                    player.update(state, 0)
+                    if prof:
+                        t = prof.lap("decisions", t)
+                    hand.update(state, 0)
+                    if prof:
+                        t = prof.lap("update", t)
+                    if hand._has_doubled:
+                        break
 
                 idx += 1
+            if prof:
+                t = prof.lap("decisions", t)
             dealer_bust = False
 
             if len(staying_hands) != 0:  # if there is a staying hand
                 # dealer's turn
-                while dealer.get_hand_value() <= 17:
-                    if dealer.get_hand_value() == 17 and dealer._ace_count > 0:
-                        dealer.hit(deck)
-                    else:
-                        dealer.hit(deck)
-                        if self.is_bust(dealer):
-                            dealer_bust = True
-                            break
+                while dealer_hit[dealer.is_soft()][dealer.get_hand_value()]:
+                    dealer.hit(deck)
+                    if self.is_bust(dealer):
+                        dealer_bust = True
+                        break
+            if prof:
+                t = prof.lap("dealer", t)
             # Play staying hands against same dealer
             for hand in staying_hands:
                 winner = self.determine_winner(hand, dealer)
                 if dealer_bust or winner == Constants.player1:
-                    if hand._has_doubled:
-                        cum_reward += 2
-                    else:
-                        cum_reward += 1
+                    result = WIN
                     self.win += 1
 
                 elif winner == Constants.player2:
+                    result = LOSS
                     self.loss += 1
-                    if hand._has_doubled:
-                        cum_reward -= 2
-                    else:
-                        cum_reward -= 1
                 else:
+                    result = PUSH
                     self.tie += 1
+                cum_reward += payout[result][hand._has_doubled]
+            if prof:
+                t = prof.lap("settle", t)
             if split:
                 # Update original hand with cumulative reward
                 orig_player.split_update(self.get_state(
                     orig_player, dealer), cum_reward)
             orig_player.update(self.get_final_state(
                 orig_player, dealer), cum_reward)
+            if prof:
+                prof.lap("update", t)
             self.reward += cum_reward
-            self.reward_history.append(self.reward)
+            self.metrics.record(cum_reward, self.win - win, self.loss - loss,
+                                self.tie - tie)
             self.game_count += 1
-            self.update_win_rate()
-            self.report()
 
         # End of learning
         # print("Learning finished!")
+        self.learner.flush_updates()
         self.learner._learning = False
 
-    def update_win_rate(self):
+    def run_batch(self):
         """
-        Calculates the current win rate and stores it in the win_rate_history list.
+        Runs the learning rounds with the vectorized BatchGame engine.
+        Every batch is played epsilon-greedily against the values learned so
+        far, and the batch's transitions are applied to the learner's Q-table
+        before the next batch.
         """
-        total_games = self.win + self.loss + self.tie
-        if total_games > 0:
-            win_rate = self.win / total_games
-            self.win_rate_history.append(win_rate)
+        if self._engine is None:
+            self._engine = BatchGame(
+                min(self.batch_size, self.num_learning_rounds),
+                rng=self._engine_rng, dealer_mode=self.dealer_mode,
+                infinite_deck=self.infinite_deck, rules=self.rules)
+        learner = self.learner
+        q = learner._Q
+        # a PolicyPlayer's table is played as is
+        policy = learner.policy if isinstance(learner, PolicyPlayer) else None
+        prof = self.profiler
+        remaining = self.num_learning_rounds
+        while remaining > 0:
+            n = min(remaining, self._engine.batch_size)
+            if prof:
+                t = time.perf_counter()
+            n_splits, states, actions, rewards, next_states = self._engine.play(
+                q, learner._epsilon, n, policy=policy)
+            if prof:
+                t = prof.lap("play", t)
+                prof.rounds += n
+                prof.count("splits", n_splits)
+                prof.count("doubles", int(np.count_nonzero(actions == DOUBLE)))
+                prof.count("q_misses", int(np.count_nonzero(
+                    ~q[states].any(axis=1))))
+            if learner._learning:
+                apply_q_updates(q, states, actions, rewards, next_states,
+                                learner._learning_rate, learner._discount)
+            if prof:
+                t = prof.lap("update", t)
+            self.record_batch(n, n_splits)
+            if prof:
+                prof.lap("record", t)
+            remaining -= n
+        self.learner._learning = False
+
+    def run_parallel(self):
+        """
+        Runs the learning rounds with n_workers processes. At every sync each
+        worker plays a batch against the current Q-table and the workers'
+        updates are merged into it, see parallel_train.
+        """
+        learner = self.learner
+        prof = self.profiler
+        per_sync = min(self.batch_size,
+                       -(-self.num_learning_rounds // self.n_workers))
+        # seeded games draw the workers' seeds from the engine's stream
+        seed = None if self._engine_rng is None else \
+            int(self._engine_rng.integers(2 ** 63))
+        with ParallelTrainer(learner._Q, self.n_workers, learner._learning_rate,
+                             learner._discount, per_sync, self.dealer_mode,
+                             seed, self.infinite_deck, self.rules) as trainer:
+            remaining = self.num_learning_rounds
+            while remaining > 0:
+                # the last sync is shared out between the workers
+                counts = np.minimum(per_sync, np.maximum(
+                    remaining - per_sync * np.arange(self.n_workers), 0))
+                if prof:
+                    t = time.perf_counter()
+                n_splits = trainer.sync(counts, learner._epsilon,
+                                        learner._learning)
+                learner._Q[...] = trainer.q
+                if prof:
+                    t = prof.lap("play", t)
+                    prof.rounds += int(counts.sum())
+                    prof.count("splits", n_splits)
+                for worker, n in enumerate(counts.tolist()):
+                    if n:
+                        self.record_results(
+                            trainer.rewards[worker, :n], trainer.wins[worker, :n],
+                            trainer.losses[worker, :n], trainer.ties[worker, :n])
+                self.game_count += n_splits
+                remaining -= int(counts.sum())
+                if prof:
+                    prof.lap("record", t)
+        self.learner._learning = False
+
+    def record_batch(self, n, n_splits):
+        """
+        Adds the results of the engine's last n rounds to the counters and
+        metrics, then reports if a report is due.
+        """
+        engine = self._engine
+        self.record_results(engine.rewards[:n], engine.wins[:n],
+                            engine.losses[:n], engine.ties[:n])
+        self.game_count += n_splits
+
+    def record_results(self, rewards, wins, losses, ties):
+        """
+        Adds the results of len(rewards) rounds given as arrays to the counters
+        and metrics, then reports if a report is due.
+        """
+        n = len(rewards)
+        self.metrics.record_batch(rewards, wins, losses, ties)
+        self.win += int(wins.sum())
+        self.loss += int(losses.sum())
+        self.tie += int(ties.sum())
+        self.reward += float(rewards.sum())
+        self.game_count += n
+        if self.progress.tick(n):
+            self.report()
 
     def report(self):
         """
-        Reports the current win rate at intervals of self.report_every.
+        Hands the current win rate and reward to the progress reporter.
         """
-        if self.game_count % self.num_learning_rounds == 0:
-            win_rate = self.win / (self.win + self.loss + self.tie)
-            print(f"Game {self.game_count}: Win rate = {win_rate}")
-        elif self.game_count % self.report_every == 0:
-            win_rate = self.win / (self.win + self.loss + self.tie)
-            print(f"Game {self.game_count}: Current win rate = {win_rate}")
+        self.progress.report(win_rate=self.metrics.win_rate(),
+                             reward=self.reward)
 
     def get_state(self, player: QLearner, dealer: Dealer):
         """
-        Return a tuple representing the state: player's hand value and dealer's showing value
+        Return the state code of player's hand value and dealer's showing value.
+        A pair is only a state of its own when the rules allow splitting.
         """
-        # update hand values from special deck when same value card is presented
-        hand = (player.get_hand()[0].value, player.get_hand()[1].value)
-        if hand in Game.SPECIAL_DECK:
-            return (Game.SPECIAL_DECK[hand], dealer.get_original_showing_value())
-        return (player.get_hand_value(), dealer.get_original_showing_value())
+        total = player.get_hand_value()
+        pair = player.get_pair_value()
+        if pair is not None and self.rules.split:
+            label = "A,A" if pair == 1 else f"{pair},{pair}"
+        elif player.is_soft() and 13 <= total <= 20:
+            label = f"A,{total - 11}"
+        else:
+            label = total
+        return self._count_offset + \
+            encode_state(label, dealer.get_original_showing_value())
 
     def get_final_state(self, player: QLearner, dealer: Dealer):
-        """Final state is the hand values of both players"""
-        hand = (player.get_hand()[0].value, player.get_hand()[1].value)
-        if hand in Game.SPECIAL_DECK:
-            return (Game.SPECIAL_DECK[hand], dealer.get_hand_value())
-        return (player.get_hand_value(), dealer.get_hand_value())
+        """Final states are absorbing, so they all share the terminal state code"""
+        return TERMINAL_STATE
 
     def determine_winner(self, player: QLearner, dealer: Dealer):
         """Determine the winner based on hand values"""
@@ -276,10 +518,13 @@ class Game:
 
     def reset_round(self):
         """Reset the game state and deal cards to players"""
-        deck = Deck()
+        deck = self.deck
+        deck.start_round()
         player = self.learner
-        dealer = Dealer()
+        dealer = self._dealer
 
+        # hands split off last round go back to the pool
+        player.release_split_hands()
         player.reset_hand()
         dealer.reset_hand()
 
@@ -288,13 +533,17 @@ class Game:
         dealer.hit(deck)
         player.hit(deck)
         dealer.hit(deck)
+        if player._count_limit:
+            self._count_offset = N_CODES * count_bucket(
+                deck.true_count(dealer.get_hand()[1:]), player._count_limit)
 
         return deck, player, dealer, None
 
     def plot_win_rate(self):
         """Plot the win rate history"""
         plt.figure(figsize=(10, 6))
-        plt.plot(self.win_rate_history, label="Win Rate")
+        plt.plot(self.metrics.win_rate_series.positions(),
+                 self.win_rate_history, label="Win Rate")
         plt.xlabel("Games Played")
         plt.ylabel("Win Rate")
         plt.title("Win Rate Over Time")
@@ -304,7 +553,8 @@ class Game:
     def plot_profit_loss(self):
         """Plot the reward history"""
         plt.figure(figsize=(10, 6))
-        plt.plot(self.reward_history, label="Profit/Loss")
+        plt.plot(self.metrics.reward_series.positions(),
+                 self.reward_history, label="Profit/Loss")
         plt.xlabel("Games Played")
         plt.ylabel("Profit/Loss")
         plt.title("Profit/Loss Over Time")
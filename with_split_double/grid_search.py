@@ -1,49 +1,172 @@
+import argparse
+import csv
+import itertools
+import os
+from multiprocessing import Pool
+import numpy as np
 import pandas as pd
 from game import Game
+from profiling import Profiler, merge_stats
+from progress import ProgressReporter
 from q_learner import QLearner
-import itertools
+from rng import spawn_seeds
+
+"""
+Grid search over the Q-Learner's hyperparameters. Trials run in a pool of
+worker processes that share nothing: each trial builds its own Game and
+QLearner (and therefore its own Q-table), and its random streams are spawned
+from the trial's own SeedSequence, the child of the base seed at the trial's
+position in the grid. A trial therefore gives the same result no matter which
+worker runs it or in what order, and no two trials share a stream. Results
+are appended to the output csv as trials finish, along with the settings they
+were played with (the base seed and the learning and test rounds), and trials
+already recorded there with the same settings are skipped, so an interrupted
+sweep can simply be started again. A csv with other columns is never appended
+to. grid_search_baseline.csv holds the results of the original, unseeded
+sweep. Trials play quietly; the sweep itself reports trials per second and
+the time left at most once a second. With --profile every trial is profiled,
+and the phase timers and cProfile dumps of all trials are combined.
+"""
+
+learning_rates = [0.001, 0.005, 0.01, 0.1, 0.2, 0.5, 1.0]
+discount_factors = [0.8, 0.9, 0.95, 0.99]
+epislon_values = [0.9, 0.95, 0.99, 0.995, 0.999]
+num_learning_rounds = 20000
+number_of_test_rounds = 50
+FIELDS = ["learning_rate", "discount_factor", "epsilon", "seed",
+          "learning_rounds", "test_rounds", "win_rate", "profit"]
+
+
+def settings(seed):
+    """
+    Returns: The settings recorded with a trial seeded from seed (an int, or
+    a SeedSequence spawned from one), besides its parameters.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        seed = seed.entropy
+    return {"seed": seed, "learning_rounds": num_learning_rounds,
+            "test_rounds": number_of_test_rounds}
+
+
+def run_trial(trial):
+    """
+    Plays one grid-search trial in its own process. The trial may carry a
+    fifth item, a path to profile the trial to.
+    Returns: A csv row with the trial's parameters, settings, win rate and
+    profit, plus
+    the trial's Profiler under "profiler" when it was profiled.
+    """
+    learning_rate, discount_factor, epsilon, seed = trial[:4]
+    profile = trial[4] if len(trial) > 4 else None
+    profiler = Profiler(cprofile=True) if profile else None
+    game = Game(
+        num_learning_rounds,
+        QLearner(
+            learning_rate=learning_rate,
+            discount_factor=discount_factor,
+            epsilon=epsilon
+        ),
+        ProgressReporter(quiet=True),
+        seed=seed,
+        profiler=profiler
+    )
+    for _ in range(0, number_of_test_rounds):
+        game.run()
+    win_rate = game.win / (game.win + game.loss + game.tie)
+    row = {"learning_rate": learning_rate, "discount_factor": discount_factor,
+           "epsilon": epsilon, **settings(seed), "win_rate": win_rate,
+           "profit": game.get_reward()}
+    if profiler:
+        profiler.dump_stats(profile)
+        row["profiler"] = profiler
+    return row
+
+
+def load_completed(path, seed):
+    """
+    Returns: The set of (learning_rate, discount_factor, epsilon) combinations
+    already recorded in the csv at path with the settings of seed.
+    Raises: ValueError if the csv does not have the columns of FIELDS.
+    """
+    if not os.path.exists(path):
+        return set()
+    expected = {key: str(value) for key, value in settings(seed).items()}
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != FIELDS:
+            raise ValueError(f"{path} has the columns {reader.fieldnames}, "
+                             f"expected {FIELDS}; use --fresh or another "
+                             f"--output")
+        return {(float(row["learning_rate"]), float(row["discount_factor"]),
+                 float(row["epsilon"])) for row in reader
+                if all(row[key] == value for key, value in expected.items())}
 
 
 def main():
     """
     Tests for the optimal parameters for Q-Learner using grid search method.
     """
-    learning_rates = [0.001, 0.005, 0.01, 0.1, 0.2, 0.5, 1.0]
-    discount_factors = [0.8, 0.9, 0.95, 0.99]
-    epislon_values = [0.9, 0.95, 0.99, 0.995, 0.999]
-    num_learning_rounds = 20000
-    best_params = None
-    best_val = -float('inf')
-    best_win_rate = -float('inf')
-
-    rows = []
-    for learning_rate, discount_factor, epsilon in itertools.product(learning_rates, discount_factors, epislon_values):
-
-        game = Game(
-            num_learning_rounds,
-            QLearner(
-                learning_rate=learning_rate,
-                discount_factor=discount_factor,
-                epsilon=epsilon
-            )
-        )
-        number_of_test_rounds = 50
-        for _ in range(0, number_of_test_rounds):
-            game.run()
-        final_profit = game.get_reward()
-        win_rate = game.win / (game.win + game.loss + game.tie)
-        if final_profit > best_val:
-            best_params = (learning_rate, discount_factor, epsilon)
-            best_val = final_profit
-            best_win_rate = win_rate
-        rows.append({"learning_rate":learning_rate, "discount_factor":discount_factor, "epsilon":epsilon, "win_rate":win_rate, "profit":final_profit})
-        print(
-            f"Learning Rate: {learning_rate}, Discount Factor: {discount_factor}, Epsilon: {epsilon}, Win Rate: {win_rate}, Profit: {final_profit}")
-    df = pd.DataFrame(rows)
-    df.to_csv("grid_search.csv", index=False)
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="base seed the trial seeds are spawned from")
+    parser.add_argument("--output", default="grid_search.csv")
+    parser.add_argument("--fresh", action="store_true",
+                        help="discard recorded results instead of resuming")
+    parser.add_argument("--profile", nargs="?", const="grid_search.pstats",
+                        help="profile every trial and write the combined "
+                             "cProfile dump to this file (grid_search.pstats)")
+    args = parser.parse_args()
+
+    if args.fresh and os.path.exists(args.output):
+        os.remove(args.output)
+    try:
+        completed = load_completed(args.output, args.seed)
+    except ValueError as exc:
+        parser.error(str(exc))
+    grid = list(itertools.product(learning_rates, discount_factors,
+                                  epislon_values))
+    seeds = spawn_seeds(args.seed, len(grid))
+    trials = [params + (seed,) for params, seed in zip(grid, seeds)
+              if params not in completed]
+    if args.profile:
+        trials = [trial + (f"{args.profile}.{index}",)
+                  for index, trial in enumerate(trials)]
+    print(f"{len(completed)} trials already recorded, {len(trials)} to run")
+
+    new_file = not os.path.exists(args.output)
+    progress = ProgressReporter(total=len(trials), unit="trials", check_every=1)
+    progress.start()
+    best_profit = None
+    profiler = Profiler()
+    with open(args.output, "a", newline="") as f, Pool(args.workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+        for row in pool.imap_unordered(run_trial, trials):
+            trial_profiler = row.pop("profiler", None)
+            if trial_profiler:
+                profiler.merge(trial_profiler)
+            writer.writerow(row)
+            f.flush()
+            if best_profit is None or row["profit"] > best_profit:
+                best_profit = row["profit"]
+            if progress.tick():
+                progress.report(best_profit=best_profit)
+
+    if args.profile and trials:
+        print(profiler.report())
+        paths = [trial[4] for trial in trials]
+        merge_stats(paths, args.profile)
+        for path in paths:
+            os.remove(path)
+
+    df = pd.read_csv(args.output)
+    best = df.loc[df["profit"].idxmax()]
     print(
-        f"Best Parameters: Learning Rate: {best_params[0]}, Discount Factor: {best_params[1]}, Epsilon: {best_params[2]}")
-    print(f"Best Win Rate: {best_win_rate}")
+        f"Best Parameters: Learning Rate: {best['learning_rate']}, Discount Factor: {best['discount_factor']}, Epsilon: {best['epsilon']}")
+    print(f"Best Win Rate: {best['win_rate']}")
 
 
 if __name__ == "__main__":
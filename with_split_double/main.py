@@ -1,5 +1,13 @@
+import argparse
+import os
+from checkpoint import load_checkpoint, save_checkpoint
+from evaluation import evaluate, evaluation_frame
 from game import Game
+from profiling import Profiler
+from progress import ProgressReporter
 from q_learner import QLearner
+from q_store import QTableStore
+from rules import DEFAULT_RULES
 
 
 def main():
@@ -8,11 +16,46 @@ def main():
     results of agent's performance over time. Also outputs the optimal strategy 
     learned by the Q-learner to a csv file. 
     """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--profile", nargs="?", const="main.pstats",
+                        help="time the phases of every round and write a "
+                             "cProfile dump to this file (main.pstats)")
+    parser.add_argument("--checkpoint", default="checkpoint.npz",
+                        help="file training is checkpointed to (checkpoint.npz)")
+    parser.add_argument("--checkpoint-every", type=int, default=10,
+                        help="runs of learning rounds between checkpoints")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the last checkpoint")
+    parser.add_argument("--q-store", default="q_table_final.qtable",
+                        help="Q-table store learning writes into, flushed at "
+                             "every checkpoint (q_table_final.qtable)")
+    args = parser.parse_args()
+    if args.resume and not os.path.exists(args.checkpoint):
+        parser.error(f"no checkpoint to resume from at {args.checkpoint}")
+
     num_learning_rounds = 200000
-    game = Game(num_learning_rounds, QLearner())  # Q learner
     number_of_test_rounds = 500
-    for _ in range(0, number_of_test_rounds):
+    progress = ProgressReporter(total=num_learning_rounds * number_of_test_rounds)
+    profiler = Profiler(cprofile=True) if args.profile else None
+    if args.resume and os.path.exists(args.q_store):
+        store = QTableStore(args.q_store, writable=True)
+    else:
+        store = QTableStore.create(args.q_store, rules=DEFAULT_RULES)
+    game = Game(num_learning_rounds, QLearner(q_table=store.q), progress,
+                profiler=profiler, rules=store.rules)  # Q learner
+    runs_done = 0
+    if args.resume:
+        runs_done = load_checkpoint(args.checkpoint, game)["runs"]
+        print(f"resuming after {runs_done} of {number_of_test_rounds} runs")
+    for run in range(runs_done, number_of_test_rounds):
         game.run()
+        if (run + 1) % args.checkpoint_every == 0:
+            save_checkpoint(args.checkpoint, game, runs=run + 1)
+            store.flush()
+    game.report()
+    if profiler:
+        print(profiler.report())
+        profiler.dump_stats(args.profile)
 
     # plot win rate for each round
     game.plot_win_rate()
@@ -21,8 +64,20 @@ def main():
     df = game.learner.get_optimal_strategy()
     print(df)
     df.to_csv('optimal_policy.csv', index=False)
+    game.learner.save_optimal_strategy('optimal_policy.npy')
+    store.flush()
     print(f"profit/loss: {(game.reward)}")
 
+    # judge the learned policy on its own, without exploration or learning
+    results = {"learned": evaluate(store, n_rounds=10000000,
+                                   n_workers=os.cpu_count(), tol=0.002)}
+    if os.path.exists('basic_strat.csv'):
+        results["basic_strat"] = evaluate('basic_strat.csv', n_rounds=10000000,
+                                          n_workers=os.cpu_count(), tol=0.002)
+    print(evaluation_frame(results)[["rounds", "ev", "ci_low", "ci_high",
+                                     "win_rate", "loss_rate", "push_rate",
+                                     "bust_rate"]])
+
 
 if __name__ == "__main__":
     main()
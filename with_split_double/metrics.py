@@ -0,0 +1,239 @@
+import numpy as np
+"""
+Constant-memory training metrics. Instead of keeping one float per round,
+Metrics keeps running totals, a stride-downsampled copy of the cumulative
+reward and win rate series, and a rolling window over the last rounds.
+
+A StrideSeries holds at most resolution samples of a series, one every
+stride points. When it fills up every other sample is dropped and the
+stride doubles, so the samples always cover the whole run evenly. Per-round
+records can also be spilled to an append-only binary file, which
+load_history maps back into memory for plotting or analysis at full
+resolution.
+
+Attributes:
+    RECORD_DTYPE (dtype): Layout of one round in a spill file.
+"""
+
+RECORD_DTYPE = np.dtype([('reward', '<f8'), ('wins', 'u1'), ('losses', 'u1'),
+                         ('ties', 'u1')])
+
+
+class StrideSeries:
+    def __init__(self, resolution=10000):
+        """
+        Initializes an empty series keeping at most resolution samples
+        (rounded up to an even number).
+        """
+        self.resolution = resolution + resolution % 2
+        self.stride = 1
+        self.count = 0
+        self._values = np.empty(self.resolution)
+        self._n = 0
+
+    def _compact(self):
+        """Drops every other sample and doubles the stride"""
+        kept = self._values[:self._n:2]
+        self._n = len(kept)
+        self._values[:self._n] = kept
+        self.stride *= 2
+
+    def append(self, value):
+        """Adds the next point of the series"""
+        if self.count % self.stride == 0:
+            if self._n == self.resolution:
+                self._compact()
+            if self.count % self.stride == 0:
+                self._values[self._n] = value
+                self._n += 1
+        self.count += 1
+
+    def extend(self, values):
+        """Adds the next len(values) points of the series"""
+        values = np.asarray(values, dtype=np.float64)
+        start = 0
+        while start < len(values):
+            # the first point of this chunk that falls on the stride
+            first = start + (-(self.count + start)) % self.stride
+            picked = values[first::self.stride]
+            room = self.resolution - self._n
+            if len(picked) <= room:
+                self._values[self._n:self._n + len(picked)] = picked
+                self._n += len(picked)
+                break
+            self._values[self._n:] = picked[:room]
+            self._n = self.resolution
+            start = first + room * self.stride
+            self._compact()
+        self.count += len(values)
+
+    def values(self):
+        """
+        Returns: The samples kept, oldest first.
+        """
+        return self._values[:self._n]
+
+    def positions(self):
+        """
+        Returns: The index in the full series of every sample kept.
+        """
+        return np.arange(self._n) * self.stride
+
+
+class RollingWindow:
+    def __init__(self, size=1000):
+        """
+        Initializes an empty window over the last size points.
+        """
+        self.size = size
+        self.count = 0
+        self._values = np.zeros(size)
+        self._pos = 0
+        self._sum = 0.0
+
+    def append(self, value):
+        """Adds a point, pushing out the oldest one once the window is full"""
+        self._sum += value - self._values[self._pos]
+        self._values[self._pos] = value
+        self._pos = (self._pos + 1) % self.size
+        self.count += 1
+
+    def extend(self, values):
+        """Adds several points at once"""
+        values = np.asarray(values, dtype=np.float64)
+        self.count += len(values)
+        values = values[-self.size:]
+        index = (self._pos + np.arange(len(values))) % self.size
+        self._values[index] = values
+        self._pos = (self._pos + len(values)) % self.size
+        # recomputed rather than updated so rounding errors do not build up
+        self._sum = float(self._values.sum())
+
+    def sum(self):
+        return self._sum
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def mean(self):
+        """
+        Returns: The mean of the points in the window, 0 when it is empty.
+        """
+        return self._sum / len(self) if len(self) else 0.0
+
+
+class Metrics:
+    def __init__(self, resolution=10000, window=1000, spill_path=None,
+                 spill_every=65536):
+        """
+        Initializes empty metrics keeping resolution samples of each series
+        and a rolling window of the last window rounds. If spill_path is given
+        every round is also appended to that file, spill_every rounds at a time.
+        """
+        self.rounds = 0
+        self.reward = 0.0
+        self.reward_squares = 0.0
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+        self.reward_series = StrideSeries(resolution)
+        self.win_rate_series = StrideSeries(resolution)
+        self.window_rewards = RollingWindow(window)
+        self.window_wins = RollingWindow(window)
+        self.window_hands = RollingWindow(window)
+        self.spill_path = spill_path
+        self._spill_every = spill_every
+        self._pending = []
+
+    def record(self, reward, wins, losses, ties):
+        """Adds the results of a single round"""
+        self.rounds += 1
+        self.reward += reward
+        self.reward_squares += reward * reward
+        self.wins += wins
+        self.losses += losses
+        self.ties += ties
+        self.reward_series.append(self.reward)
+        self.win_rate_series.append(self.win_rate())
+        self.window_rewards.append(reward)
+        self.window_wins.append(wins)
+        self.window_hands.append(wins + losses + ties)
+        if self.spill_path is not None:
+            self._pending.append((reward, wins, losses, ties))
+            if len(self._pending) >= self._spill_every:
+                self.flush()
+
+    def record_batch(self, rewards, wins, losses, ties):
+        """Adds the results of len(rewards) rounds given as arrays"""
+        hands = wins + losses + ties
+        cumulative = np.cumsum(rewards) + self.reward
+        win_rates = (np.cumsum(wins) + self.wins) / np.maximum(
+            np.cumsum(hands) + self.wins + self.losses + self.ties, 1)
+        self.rounds += len(rewards)
+        self.reward = float(cumulative[-1])
+        self.reward_squares += float(np.dot(rewards, rewards))
+        self.wins += int(wins.sum())
+        self.losses += int(losses.sum())
+        self.ties += int(ties.sum())
+        self.reward_series.extend(cumulative)
+        self.win_rate_series.extend(win_rates)
+        self.window_rewards.extend(rewards)
+        self.window_wins.extend(wins)
+        self.window_hands.extend(hands)
+        if self.spill_path is not None:
+            self.flush()
+            records = np.empty(len(rewards), dtype=RECORD_DTYPE)
+            records['reward'] = rewards
+            records['wins'] = wins
+            records['losses'] = losses
+            records['ties'] = ties
+            with open(self.spill_path, 'ab') as f:
+                records.tofile(f)
+
+    def flush(self):
+        """Writes the rounds recorded one at a time to the spill file"""
+        if self._pending:
+            with open(self.spill_path, 'ab') as f:
+                np.array(self._pending, dtype=RECORD_DTYPE).tofile(f)
+            self._pending = []
+
+    def win_rate(self):
+        """
+        Returns: The fraction of all hands played that were won.
+        """
+        hands = self.wins + self.losses + self.ties
+        return self.wins / hands if hands else 0.0
+
+    def mean_reward(self):
+        return self.reward / self.rounds if self.rounds else 0.0
+
+    def reward_variance(self):
+        """
+        Returns: The variance of the per-round reward.
+        """
+        if self.rounds < 2:
+            return 0.0
+        mean = self.mean_reward()
+        return (self.reward_squares - self.rounds * mean * mean) / \
+            (self.rounds - 1)
+
+    def rolling_reward(self):
+        """
+        Returns: The mean reward per round over the rolling window.
+        """
+        return self.window_rewards.mean()
+
+    def rolling_win_rate(self):
+        """
+        Returns: The fraction of hands won over the rolling window.
+        """
+        hands = self.window_hands.sum()
+        return self.window_wins.sum() / hands if hands else 0.0
+
+
+def load_history(path):
+    """
+    Returns: The rounds spilled to path as a read-only memory-mapped record
+    array with reward, wins, losses and ties fields.
+    """
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r')
@@ -0,0 +1,210 @@
+from multiprocessing import Process, Queue
+from queue import Empty
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from batch_game import BatchGame, apply_q_updates
+from constants import Constants
+from rng import spawn_seeds
+"""
+Parallel actor-learner training. ParallelTrainer starts n_workers actor
+processes that each own a BatchGame. At every sync each actor copies the
+global Q-table into its local table, plays a batch of rounds
+epsilon-greedily against it, applies the batch's Q-updates locally and
+counts how often it took every state-action pair. The learner (the process
+that owns the trainer) then merges the local tables into the global one with
+a visit-weighted average: every state-action pair that was visited becomes
+the average of the workers' values for it, weighted by how often each worker
+visited it, and pairs nobody visited keep their value.
+
+The global table, the local tables, the visit counts and the per-round
+results all live in shared memory, so a sync only sends a few integers
+through the queues and nothing of size is ever pickled. Each actor has its
+own random stream, spawned from the trainer's seed.
+
+An actor that fails sends its exception back instead of a result, and sync
+raises it in the learner. An actor that dies without sending anything is
+noticed while sync waits, so a broken actor never hangs training.
+
+Attributes:
+    n_workers (int): The number of actor processes.
+    batch_size (int): The maximum number of rounds an actor plays per sync.
+    q (ndarray): The global Q-table, in shared memory.
+    rewards (ndarray): Net reward of each round of the last sync, by
+        [worker, round].
+    wins (ndarray): Winning hands of each round of the last sync, by
+        [worker, round].
+    losses (ndarray): Losing hands, laid out like wins.
+    ties (ndarray): Tied hands, laid out like wins.
+    POLL_SECONDS (float): How long sync waits for a result before checking
+        that the actors are still alive.
+"""
+
+POLL_SECONDS = 1.0
+
+
+def _shared_arrays(specs, names=None):
+    """
+    Returns: A dict of name -> ndarray backed by shared memory for specs, a
+    dict of name -> (shape, dtype), and a dict of name -> SharedMemory block.
+    New blocks are created unless names gives the blocks to attach to.
+    """
+    arrays, blocks = {}, {}
+    for key, (shape, dtype) in specs.items():
+        if names is None:
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+            block = SharedMemory(create=True, size=size)
+        else:
+            block = SharedMemory(name=names[key])
+        arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        blocks[key] = block
+    return arrays, blocks
+
+
+def _actor(index, names, specs, learning_rate, discount, batch_size,
+           dealer_mode, infinite_deck, rules, seed, commands, done):
+    """
+    Runs in each actor process: plays one batch per command, until it is
+    sent None or fails, sending its exception through done if it does.
+    """
+    arrays, blocks = _shared_arrays(specs, names)
+    q, local, visits = arrays["q"], arrays["local"][index], \
+        arrays["visits"][index].reshape(-1)
+    try:
+        engine = BatchGame(batch_size, rng=np.random.default_rng(seed),
+                           dealer_mode=dealer_mode,
+                           infinite_deck=infinite_deck, rules=rules)
+        while True:
+            command = commands.get()
+            if command is None:
+                break
+            n, epsilon, learning = command
+            local[...] = q
+            if n == 0:
+                visits[:] = 0
+                done.put((index, 0))
+                continue
+            n_splits, states, actions, rewards, next_states = engine.play(
+                local, epsilon, n)
+            if learning:
+                apply_q_updates(local, states, actions, rewards, next_states,
+                                learning_rate, discount)
+            visits[:] = np.bincount(states * local.shape[1] + actions,
+                                    minlength=len(visits))
+            arrays["rewards"][index, :n] = engine.rewards[:n]
+            arrays["wins"][index, :n] = engine.wins[:n]
+            arrays["losses"][index, :n] = engine.losses[:n]
+            arrays["ties"][index, :n] = engine.ties[:n]
+            done.put((index, n_splits))
+    except Exception as exc:
+        done.put((index, exc))
+    finally:
+        del q, local, visits, arrays
+        for block in blocks.values():
+            block.close()
+
+
+class ParallelTrainer:
+    def __init__(self, q_table, n_workers, learning_rate, discount,
+                 batch_size=65536, dealer_mode=Constants.rollout, seed=None,
+                 infinite_deck=False, rules=None):
+        """
+        Copies q_table into shared memory and starts n_workers actors that
+        update it with the given learning rate and discount, each actor
+        playing batch_size rounds per sync. seed is anything
+        np.random.SeedSequence accepts; the actors' streams are spawned from
+        it. dealer_mode, infinite_deck and rules are passed to the actors'
+        BatchGames.
+        """
+        self.n_workers = n_workers
+        self.batch_size = batch_size
+        specs = {"q": (q_table.shape, np.float64),
+                 "local": ((n_workers,) + q_table.shape, np.float64),
+                 "visits": ((n_workers,) + q_table.shape, np.int64),
+                 "rewards": ((n_workers, batch_size), np.float64),
+                 "wins": ((n_workers, batch_size), np.int64),
+                 "losses": ((n_workers, batch_size), np.int64),
+                 "ties": ((n_workers, batch_size), np.int64)}
+        arrays, self._blocks = _shared_arrays(specs)
+        self.q, self._local, self._visits = \
+            arrays["q"], arrays["local"], arrays["visits"]
+        self.rewards, self.wins, self.losses, self.ties = \
+            arrays["rewards"], arrays["wins"], arrays["losses"], arrays["ties"]
+        self.q[...] = q_table
+
+        names = {key: block.name for key, block in self._blocks.items()}
+        self._done = Queue()
+        self._commands = []
+        self._workers = []
+        for index, child in enumerate(spawn_seeds(seed, n_workers)):
+            commands = Queue()
+            worker = Process(target=_actor, daemon=True, args=(
+                index, names, specs, learning_rate, discount, batch_size,
+                dealer_mode, infinite_deck, rules, child, commands, self._done))
+            worker.start()
+            self._commands.append(commands)
+            self._workers.append(worker)
+
+    def sync(self, n, epsilon, learning=True):
+        """
+        Has the actors play n rounds each (at most batch_size), or n[i] rounds
+        for actor i if n is a sequence, against the global table, then merges
+        their updates into it if learning.
+        Returns: The total number of splits played.
+        Raises: RuntimeError if an actor fails or dies.
+        """
+        counts = np.broadcast_to(n, self.n_workers)
+        assert counts.max() <= self.batch_size
+        for commands, count in zip(self._commands, counts.tolist()):
+            commands.put((count, epsilon, learning))
+        n_splits = sum(self._result() for _ in self._workers)
+        if learning:
+            self.merge()
+        return n_splits
+
+    def _result(self):
+        """
+        Returns: The number of splits of the next actor to finish its batch,
+        checking every POLL_SECONDS that no actor has died meanwhile.
+        """
+        while True:
+            try:
+                index, result = self._done.get(timeout=POLL_SECONDS)
+                break
+            except Empty:
+                for index, worker in enumerate(self._workers):
+                    if not worker.is_alive():
+                        raise RuntimeError(f"actor {index} exited with code "
+                                           f"{worker.exitcode}")
+        if isinstance(result, Exception):
+            raise RuntimeError(f"actor {index} failed") from result
+        return result
+
+    def merge(self):
+        """
+        Sets every visited state-action pair of the global table to the
+        visit-weighted average of the actors' local values.
+        """
+        total = self._visits.sum(axis=0)
+        weighted = np.einsum("wsa,wsa->sa", self._visits, self._local)
+        visited = total > 0
+        self.q[visited] = weighted[visited] / total[visited]
+
+    def close(self):
+        """Stops the actors and frees the shared memory"""
+        for commands in self._commands:
+            commands.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._commands, self._workers = [], []
+        self.q = self._local = self._visits = None
+        self.rewards = self.wins = self.losses = self.ties = None
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,10 +1,20 @@
 """
 Represents a player in the Blackjack table, including the dealer.
 
+The hand's value is kept up to date card by card: the hard total (every Ace
+counted as 1), whether an Ace can still count as 11, and the pair card value
+of a two card pair. Adding a card is O(1) and every read is a plain lookup
+that changes nothing, so the state can be read as often as needed and Card
+objects are never modified.
+
 Attributes:
     _hand(list): A list that stores cards dealt to player
-    _total_hand_val (int): The total value of player's hand incoporating Aces.
+    _total_hand_val (int): The best total value of player's hand, counting
+        an Ace as 11 when that does not bust it.
+    _hard_total (int): The total value of player's hand counting Aces as 1.
     _ace_count (int): Tracks the number of Aces in player's hand
+    _soft (bool): Whether an Ace in the hand is counted as 11.
+    _pair_value (int): The card value (Ace = 1) of a two card pair, else None.
 """
 from deck import Deck
 from card import Card
@@ -18,7 +28,10 @@ class Player:
         """
         self._hand: List[Card] = []
         self._total_hand_val = 0
+        self._hard_total = 0
         self._ace_count = 0
+        self._soft = False
+        self._pair_value = None
 
     def __str__(self):
         hand_str = ', '.join(str(card) for card in self._hand)
@@ -34,33 +47,54 @@ class Player:
         """
         Returns: The total value of a player's current hand.
         """
-        if self._ace_count > 0 and self._total_hand_val > 21:
-            self._total_hand_val -= 10
-            self._ace_count -= 1
         return self._total_hand_val
 
-    def hit(self, deck: Deck):
+    def is_soft(self):
         """
-        Draws a single card from the deck, adjust the updated Ace count, 
-        total value, and new hand accordingly.
+        Returns: True if an Ace in the hand is counted as 11.
         """
-        card = deck.draw()
-        if card.get_rank() == "Ace":
-            self._ace_count += 1
-            if self._total_hand_val > 10:
-                card.set_value(1)
-            else:
-                card.set_value(11)
-        self._total_hand_val += card.get_value()
+        return self._soft
+
+    def get_pair_value(self):
+        """
+        Returns: The card value (Ace = 1) of a hand of exactly two cards of
+        the same value, None for any other hand.
+        """
+        return self._pair_value
+
+    def add_card(self, card: Card):
+        """
+        Adds a card to the hand, updating the totals, soft flag and pair value.
+        """
+        # Aces are counted as 1 here whatever value the card object holds
+        value = 1 if card.get_rank() == "Ace" else card.get_value()
         self._hand.append(card)
+        self._hard_total += value
+        if value == 1:
+            self._ace_count += 1
+        self._soft = self._ace_count > 0 and self._hard_total <= 11
+        self._total_hand_val = self._hard_total + 10 if self._soft \
+            else self._hard_total
+        # two cards make a pair when the first one was worth the same
+        self._pair_value = value if len(self._hand) == 2 and \
+            self._hard_total == 2 * value else None
+
+    def hit(self, deck: Deck):
+        """
+        Draws a single card from the deck and adds it to the hand.
+        """
+        self.add_card(deck.draw())
 
     def reset_hand(self):
         """
-        Resets a player's hand to its intial state.
+        Resets a player's hand to its intial state, reusing its card list.
         """
-        self._hand = []
+        self._hand.clear()
         self._total_hand_val = 0
+        self._hard_total = 0
         self._ace_count = 0
+        self._soft = False
+        self._pair_value = None
         self._has_doubled = False
         self._can_double = True
 
@@ -0,0 +1,114 @@
+import os
+import numpy as np
+import pandas as pd
+from state_encoding import (ACTIONS, DEALER_COLUMNS, N_STATES, PAIR_ROW,
+                            PLAYER_ROWS, SPLIT, count_view)
+"""
+Columnar export of the strategy held in a Q-table. The optimal action of
+every state is a single masked argmax over the table, with split only
+allowed in pair states, and the player column is an ordered categorical in
+state_encoding order (hard totals, soft totals, pairs), so sorting and
+grouping never go through Python level keys. The strategy of a card
+counting Q-table has the states of every true count bucket in turn, with a
+count column in front giving the bucket's true count.
+
+Strategies can be written as CSV, as a structured NumPy array (.npy), or as
+Parquet or Arrow/Feather files, the latter two only if pyarrow is installed.
+
+Attributes:
+    PLAYER_TYPE (CategoricalDtype): The ordered dtype of the player column.
+    STRATEGY_DTYPE (dtype): The record layout of strategies saved as .npy.
+    COUNT_STRATEGY_DTYPE (dtype): The record layout of card counting
+        strategies saved as .npy.
+"""
+
+PLAYER_TYPE = pd.CategoricalDtype([str(player) for player in PLAYER_ROWS],
+                                  ordered=True)
+STRATEGY_DTYPE = np.dtype([('player', 'U5'), ('dealer', 'i1')] +
+                          [(action, 'f8') for action in ACTIONS] +
+                          [('optimal', 'U6')])
+COUNT_STRATEGY_DTYPE = np.dtype([('count', 'i1')] + STRATEGY_DTYPE.descr)
+
+# states that are pairs, the only ones where split is allowed
+_PAIR_STATE = np.arange(N_STATES) // len(DEALER_COLUMNS) >= PAIR_ROW
+
+
+def optimal_actions(q_table, rules=None):
+    """
+    Returns: The index of the best allowed action of every non-terminal
+    state, count bucket after count bucket, never split for states that are
+    not pairs, nor an action rules do not allow.
+    """
+    values = count_view(q_table)[:, :N_STATES]
+    forbidden = ~_PAIR_STATE[:, None] & (np.arange(len(ACTIONS)) == SPLIT)
+    if rules is not None:
+        forbidden = forbidden | ~rules.action_mask()
+    return np.where(forbidden, -np.inf, values).argmax(axis=2).reshape(-1)
+
+
+def strategy_frame(q_table, learned_only=True, rules=None):
+    """
+    Returns: A DataFrame with the player, dealer, the value of every action and
+    the optimal action of each state, in state order. Only states that have
+    been learned (have a nonzero value) are included if learned_only, and
+    only the actions rules allow are optimal. A card counting table has a
+    count column as well, its states ordered by count first.
+    """
+    buckets = count_view(q_table)[:, :N_STATES]
+    values = buckets.reshape(-1, len(ACTIONS))
+    codes = np.arange(len(values))
+    if learned_only:
+        codes = codes[values.any(axis=1)]
+    bucket, states = np.divmod(codes, N_STATES)
+    rows, columns = np.divmod(states, len(DEALER_COLUMNS))
+    df = pd.DataFrame(values[codes], columns=ACTIONS)
+    df.insert(0, 'player', pd.Categorical.from_codes(rows, dtype=PLAYER_TYPE))
+    df.insert(1, 'dealer', np.array(DEALER_COLUMNS)[columns])
+    if len(buckets) > 1:
+        df.insert(0, 'count', bucket - len(buckets) // 2)
+    df['optimal'] = pd.Categorical.from_codes(
+        optimal_actions(q_table, rules)[codes], categories=ACTIONS)
+    return df
+
+
+def write_strategy(df, path):
+    """
+    Writes a strategy DataFrame to path in the format given by its extension:
+    .csv, .npy, .parquet, or .arrow/.feather.
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension == '.csv':
+        df.to_csv(path, index=False)
+    elif extension == '.npy':
+        dtype = COUNT_STRATEGY_DTYPE if 'count' in df else STRATEGY_DTYPE
+        records = np.empty(len(df), dtype=dtype)
+        for name in dtype.names:
+            records[name] = df[name].astype(str) if name in ('player', 'optimal') \
+                else df[name]
+        np.save(path, records)
+    elif extension == '.parquet':
+        df.to_parquet(path, index=False)
+    elif extension in ('.arrow', '.feather'):
+        df.to_feather(path)
+    else:
+        raise ValueError(f"unknown strategy format: {path}")
+
+
+def read_strategy(path):
+    """
+    Returns: A strategy written by write_strategy as a DataFrame, with the
+    player column ordered again.
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension == '.csv':
+        df = pd.read_csv(path)
+    elif extension == '.npy':
+        df = pd.DataFrame(np.load(path))
+    elif extension == '.parquet':
+        df = pd.read_parquet(path)
+    elif extension in ('.arrow', '.feather'):
+        df = pd.read_feather(path)
+    else:
+        raise ValueError(f"unknown strategy format: {path}")
+    df['player'] = df['player'].astype(str).astype(PLAYER_TYPE)
+    return df
@@ -0,0 +1,144 @@
+from policy_export import PLAYER_TYPE, read_strategy
+from q_learner import QLearner
+from state_encoding import (ACTIONS, ACTION_INDEX, DEALER_COLUMNS, LEGAL_MASKS,
+                            N_STATES, PAIR_ROW, SPLIT, new_q_table)
+import numpy as np
+import pandas as pd
+"""
+A frozen policy for play without learning. PolicyTable compiles a Q-table, or
+a strategy such as optimal_policy.csv or basic_strat.csv, into one flat array
+of action indices with an entry for every state code and legality code
+(2 * can_split + can_double), so looking up an action is a single index
+whatever the state, and a whole batch of decisions is a single gather.
+
+Legality falls back the way a strategy chart reads: where the best action is
+not allowed, the best allowed one is played instead (split only in pair
+states). Strategies that only give the optimal action, like basic_strat.csv,
+fall back to hit, and states missing from a strategy, or never learned in a
+Q-table, are hit.
+
+PolicyPlayer plays a PolicyTable in place of the QLearner of a Game, in
+either mode. It never learns.
+
+Attributes:
+    table (ndarray): The (N_STATES + 1, 4) array of action indices by
+        [state code, legality code]. It is read-only.
+    policy (PolicyTable): The policy a PolicyPlayer plays, shared by the
+        hands it splits into.
+"""
+
+
+def legality(can_split, can_double):
+    """
+    Returns: The legality code of a hand, for one hand or arrays of them.
+    """
+    return 2 * np.asarray(can_split, dtype=np.int64) + \
+        np.asarray(can_double, dtype=np.int64)
+
+
+class PolicyTable:
+    def __init__(self, table):
+        """
+        Initializes a policy from a (N_STATES + 1, 4) array of action indices
+        by [state code, legality code].
+        """
+        table = np.array(table, dtype=np.int8)
+        if table.shape != (N_STATES + 1, len(LEGAL_MASKS)):
+            raise ValueError(f"policy table has shape {table.shape}, "
+                             f"expected {(N_STATES + 1, len(LEGAL_MASKS))}")
+        table.flags.writeable = False
+        self.table = table
+        self._flat = table.ravel()
+        self._width = table.shape[1]
+
+    @classmethod
+    def from_q_table(cls, q_table):
+        """
+        Returns: The greedy policy of q_table, taking the best allowed action
+        under every legality code.
+        """
+        pair_state = np.arange(len(q_table)) // len(DEALER_COLUMNS) >= PAIR_ROW
+        table = np.empty((len(q_table), len(LEGAL_MASKS)), dtype=np.int8)
+        for code, mask in enumerate(LEGAL_MASKS):
+            allowed = mask & ~(~pair_state[:, None] &
+                               (np.arange(len(ACTIONS)) == SPLIT))
+            table[:, code] = np.where(allowed, q_table, -np.inf).argmax(axis=1)
+        return cls(table)
+
+    @classmethod
+    def from_strategy(cls, strategy):
+        """
+        Returns: The policy of a strategy DataFrame, or of a strategy file
+        read with policy_export.read_strategy. The action values are used for
+        the fallbacks if the strategy has them, otherwise only the optimal
+        action column is needed.
+        """
+        df = strategy if isinstance(strategy, pd.DataFrame) \
+            else read_strategy(strategy)
+        players = df['player'].astype(str)
+        unknown = ~players.isin(PLAYER_TYPE.categories)
+        if unknown.any():
+            raise ValueError("unknown player rows in strategy: "
+                             f"{list(players[unknown].unique())}")
+        rows = players.astype(PLAYER_TYPE).cat.codes.to_numpy().astype(np.int64)
+        # an Ace showing may be written as 1 or 11
+        dealer = df['dealer'].to_numpy().astype(np.int64)
+        columns = np.where(dealer == 1, 11, dealer) - DEALER_COLUMNS[0]
+        codes = rows * len(DEALER_COLUMNS) + columns
+
+        q_table = new_q_table()
+        if all(action in df.columns for action in ACTIONS):
+            q_table[codes] = df[ACTIONS].to_numpy()
+        # the optimal action always wins, whatever ties the values have
+        optimal = df['optimal'].astype(str).map(ACTION_INDEX).to_numpy()
+        q_table[codes, optimal] = np.inf
+        return cls.from_q_table(q_table)
+
+    def lookup(self, state, can_split=False, can_double=False):
+        """
+        Returns: The index of the action to take in state.
+        """
+        return int(self._flat[state * self._width + 2 * can_split + can_double])
+
+    def action(self, state, can_split=False, can_double=False):
+        """
+        Returns: The action to take in state, by name.
+        """
+        return ACTIONS[self.lookup(state, can_split, can_double)]
+
+    def lookup_batch(self, states, legality_codes=0):
+        """
+        Vectorized lookup of many decisions at once.
+        Returns: The action indices for an array of state codes, each with
+        its legality code (a single code applies to all of them).
+        """
+        return self._flat[np.asarray(states) * self._width + legality_codes]
+
+
+class PolicyPlayer(QLearner):
+    def __init__(self, policy, rng=None):
+        """
+        Initializes a player that takes every action from policy (a
+        PolicyTable) and never learns.
+        """
+        super().__init__(epsilon=1.0, rng=rng)
+        self.policy = policy
+        self._learning = False
+
+    def _new_split_hand(self):
+        """
+        Returns: A new hand for split_hand, playing the same policy and
+        sharing this player's hand pool.
+        """
+        hand = PolicyPlayer(self.policy, rng=self._rng)
+        hand._split_hands = self._split_hands
+        hand._free_hands = self._free_hands
+        return hand
+
+    def get_action(self, state):
+        """Choose the policy's action for state"""
+        action = self.policy.action(state, self._split, self._can_double)
+        self._last_state = state
+        self._last_action = action
+        self._split = False
+        return action
@@ -0,0 +1,115 @@
+import cProfile
+import pstats
+import time
+import pandas as pd
+"""
+Opt-in instrumentation of Game. A Game only looks at its profiler through a
+single truth test at each phase boundary, so without one the round loop runs
+as before.
+
+While a Profiler is attached, the wall time of every round is split into
+phases (dealing, the player's decisions, splits, the dealer's play,
+settlement and Q-updates, or playing, updating and recording for batch
+mode), and counters of notable events are kept: splits, doubles, busts,
+decisions taken in states the Q-table has no values for yet (Q-table misses)
+and states that got their first values (new states). Optionally the whole
+run is also recorded with cProfile for a function-level pstats dump.
+
+Attributes:
+    PHASES (list): The phases of a round, in the order they are reported.
+"""
+
+PHASES = ["deal", "decisions", "split", "dealer", "settle", "play", "update",
+          "record"]
+
+
+class Profiler:
+    def __init__(self, cprofile=False):
+        """
+        Initializes a profiler with every timer and counter at 0, recording
+        with cProfile as well if cprofile is True.
+        """
+        self.times = {}
+        self.calls = {}
+        self.counters = {}
+        self.rounds = 0
+        self._cprofile = cProfile.Profile() if cprofile else None
+
+    def lap(self, phase, start):
+        """
+        Adds the time since start (a time.perf_counter reading) to phase.
+        Returns: The current time.perf_counter reading, the start of the next
+        phase.
+        """
+        now = time.perf_counter()
+        self.times[phase] = self.times.get(phase, 0.0) + now - start
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        return now
+
+    def count(self, name, n=1):
+        """Adds n to the counter name"""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def enable(self):
+        """Starts recording with cProfile, if it was asked for"""
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def disable(self):
+        """Stops recording with cProfile, if it was asked for"""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+    def merge(self, other):
+        """Adds the timers, counters and rounds of other to this profiler"""
+        for phase, seconds in other.times.items():
+            self.times[phase] = self.times.get(phase, 0.0) + seconds
+            self.calls[phase] = self.calls.get(phase, 0) + other.calls[phase]
+        for name, n in other.counters.items():
+            self.count(name, n)
+        self.rounds += other.rounds
+
+    def summary(self):
+        """
+        Returns: A DataFrame with the calls, total seconds, share of the time
+        and microseconds per round of every phase that was timed.
+        """
+        phases = [p for p in PHASES if p in self.times] + \
+            [p for p in self.times if p not in PHASES]
+        total = sum(self.times.values()) or 1.0
+        rounds = self.rounds or 1
+        return pd.DataFrame({
+            "phase": phases,
+            "calls": [self.calls[p] for p in phases],
+            "seconds": [self.times[p] for p in phases],
+            "share": [self.times[p] / total for p in phases],
+            "us_per_round": [self.times[p] / rounds * 1e6 for p in phases],
+        })
+
+    def report(self):
+        """
+        Returns: The summary table and the counters as printable text.
+        """
+        lines = [f"{self.rounds} rounds",
+                 self.summary().to_string(index=False, float_format="{:.4f}".format)]
+        lines += [f"{name}: {n}" for name, n in sorted(self.counters.items())]
+        return "\n".join(lines)
+
+    def dump_stats(self, path):
+        """Writes what cProfile recorded to path in pstats format"""
+        if self._cprofile is None:
+            raise ValueError("profiler was created without cprofile=True")
+        self._cprofile.dump_stats(path)
+
+    def __getstate__(self):
+        # cProfile objects cannot be pickled, dump them before sending
+        state = self.__dict__.copy()
+        state["_cprofile"] = None
+        return state
+
+
+def merge_stats(paths, path):
+    """Combines the pstats dumps at paths into a single dump at path"""
+    stats = pstats.Stats(*paths)
+    stats.dump_stats(path)
+    return stats
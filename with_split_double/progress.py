@@ -0,0 +1,101 @@
+import time
+"""
+Progress reporting kept out of the way of the game loop. The loop calls tick
+once per round (or once per batch with the number of rounds played), which
+only bumps a counter. Every check_every rounds the clock is read, and tick
+returns True at most once per interval seconds, at which point the caller
+hands its current figures to report. A report includes the rounds per second
+and, when the total number of rounds is known, the estimated time left. It is
+printed unless the reporter is quiet and passed to every callback.
+
+Attributes:
+    total (int): The number of rounds expected, None if unknown.
+    interval (float): The minimum number of seconds between reports.
+    quiet (bool): Whether reports are kept from being printed.
+    unit (str): What is being counted, used in printed reports.
+    check_every (int): The number of rounds between reads of the clock.
+    count (int): The number of rounds ticked so far.
+    callbacks (list): Functions called with every report.
+    last_report (dict): The most recent report, None before the first one.
+"""
+
+
+class ProgressReporter:
+    def __init__(self, total=None, interval=1.0, quiet=False, unit="rounds",
+                 check_every=1000):
+        """
+        Initializes a reporter that has not counted anything yet.
+        """
+        self.total = total
+        self.interval = interval
+        self.quiet = quiet
+        self.unit = unit
+        self.check_every = check_every
+        self.count = 0
+        self.callbacks = []
+        self.last_report = None
+        self._next_check = check_every
+        self._start = None
+        self._last = None
+
+    def add_callback(self, callback):
+        """Calls callback with every report from now on"""
+        self.callbacks.append(callback)
+
+    def start(self):
+        """Starts the clock, unless it is already running"""
+        if self._start is None:
+            self._start = self._last = time.perf_counter()
+
+    def tick(self, n=1):
+        """
+        Counts n more rounds.
+        Returns: True when a report is due.
+        """
+        self.count += n
+        if self.count < self._next_check:
+            return False
+        self._next_check = self.count + self.check_every
+        self.start()
+        return time.perf_counter() - self._last >= self.interval
+
+    def report(self, **stats):
+        """
+        Reports the progress so far along with the given figures, such as the
+        current win rate.
+        Returns: The report, a dict of count, total, elapsed, rate and eta
+        (None when total is unknown) followed by stats.
+        """
+        self.start()
+        now = time.perf_counter()
+        self._last = now
+        elapsed = now - self._start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = max(self.total - self.count, 0) / rate
+        report = {"count": self.count, "total": self.total, "elapsed": elapsed,
+                  "rate": rate, "eta": eta, **stats}
+        self.last_report = report
+        for callback in self.callbacks:
+            callback(report)
+        if not self.quiet:
+            print(self.format(report))
+        return report
+
+    def format(self, report):
+        """
+        Returns: A report as a single line of text.
+        """
+        line = f"{report['count']} {self.unit}"
+        if report["total"] is not None:
+            line += f"/{report['total']}"
+        figures = [f"{key} = {value:.4f}" if isinstance(value, float)
+                   else f"{key} = {value}" for key, value in report.items()
+                   if key not in ("count", "total", "elapsed", "rate", "eta")]
+        if figures:
+            line += ": " + ", ".join(figures)
+        line += f" | {report['rate']:,.0f} {self.unit}/s"
+        if report["eta"] is not None:
+            line += f", ETA {report['eta']:.0f}s"
+        return line
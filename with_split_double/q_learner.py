@@ -1,16 +1,22 @@
 from constants import Constants
 from player import Player
 from card import Card
+from policy_export import strategy_frame, write_strategy
+from q_store import EXTENSION, QTableStore
+from replay_buffer import ReplayBuffer
+from rng import RandomStream
+from state_encoding import (ACTIONS, ACTION_INDEX, HIT, STAY, SPLIT, DOUBLE,
+                            TERMINAL_STATE, new_q_table)
 import numpy as np
-import pandas as pd
 """
 A reinforcement learning agent based on Q-learning. It extends the Player class 
 and learns how to play the game of Blackjack optimally by updating its Q-values 
 after a set number of rounds. Uses the epsilon-greedy strategy.
 
 Attributes:
-    _Q (dict): Q-value table that maps states (dealer hand value, player hand value) to action (hit/stay).
-    _last_state (tuple): Stores state of game from last action taken by learner.
+    _Q (ndarray): Dense Q-value table indexed by [state code, action index] as
+        defined in state_encoding. Hands created by splitting share it.
+    _last_state (int): Stores state code of game from last action taken by learner.
     _last_action (str): Stores last action take by learner (hit/stay).
     _learning_rate (float): Learning rate of Q-Learning algorithm. Defaults to 0.7.
     _discount (float): The discount factor of algorithm to control significance of rewards. Defaults to 0.9.
@@ -20,17 +26,39 @@ Attributes:
     _can_double (bool): Indicates if the learner can double
     _has_doubled (bool): Indicates if the learner chose to double
     _action_list (list): Represents list of valid actions
+    _rng (RandomStream): Source of the uniform numbers behind every
+        exploration decision. Hands created by splitting share it.
+    _buffer (ReplayBuffer): If set, updates are recorded in it and applied in
+        batches by flush_updates (whenever it fills up, and at the end of
+        every Game.run) instead of one at a time. Hands created by splitting
+        share it.
+    _split_hands (list): The hands split off since release_split_hands was
+        last called. Shared with those hands.
+    _free_hands (list): Released split hands, reset and handed out again by
+        split_hand so that splitting allocates nothing once the pool is warm.
+        Shared with those hands.
+    _count_limit (int): If set, the learner counts cards: its Q-table has a
+        block of states for every Hi-Lo true count bucket from -_count_limit
+        to _count_limit (see state_encoding.count_bucket), and Game adds the
+        block of the round's true count to every state code.
 """
 
 
-class QLearner(Player):
-    _Q = {}  # Q-value table, state -> action-value pairs
+_INITIAL_ACTIONS = (Constants.hit, Constants.stay, Constants.double)
+
 
-    def __init__(self, last_state=None, last_action=None, learning_rate=0.001, discount_factor=0.8, epsilon=0.995):
+class QLearner(Player):
+    def __init__(self, last_state=None, last_action=None, learning_rate=0.001, discount_factor=0.8, epsilon=0.995, q_table=None, rng=None, buffer=None, count_limit=0):
         """
-        Initializes Q-Learner with given parameters.
+        Initializes Q-Learner with given parameters. A new zeroed Q-table is
+        created unless one is given to share, and rng (a RandomStream, or a
+        seed or Generator to build one from) is seeded from fresh entropy
+        unless given. buffer (a ReplayBuffer, or its capacity) switches on
+        batched updates. count_limit makes the learner count cards, with a
+        Q-table 2 * count_limit + 1 times the size.
         """
         super().__init__()
+        self._Q = q_table if q_table is not None else new_q_table(count_limit)
         self._last_state = last_state
         self._last_action = last_action
         self._learning_rate = learning_rate
@@ -40,7 +68,12 @@ class QLearner(Player):
         self._split = False
         self._can_double = True
         self._has_doubled = False
-        self._action_list = [Constants.hit, Constants.stay, Constants.double]
+        self._action_list = list(_INITIAL_ACTIONS)
+        self._rng = rng if isinstance(rng, RandomStream) else RandomStream(rng)
+        self._buffer = ReplayBuffer(buffer) if isinstance(buffer, int) else buffer
+        self._split_hands = []
+        self._free_hands = []
+        self._count_limit = count_limit
 
     def can_split(self):
         """
@@ -58,12 +91,50 @@ class QLearner(Player):
         """Disables the split option"""
         self._split = False
 
+    def split_hand(self):
+        """
+        Returns: An empty hand for one half of a split, taken from the pool of
+        released hands if there is one, sharing this learner's Q-table, random
+        stream, update buffer, parameters, count limit, learning phase and
+        last state and action.
+        """
+        hand = self._free_hands.pop() if self._free_hands \
+            else self._new_split_hand()
+        hand._Q = self._Q
+        hand._rng = self._rng
+        hand._buffer = self._buffer
+        hand._last_state = self._last_state
+        hand._last_action = self._last_action
+        hand._learning_rate = self._learning_rate
+        hand._discount = self._discount
+        hand._epsilon = self._epsilon
+        hand._learning = self._learning
+        hand._count_limit = self._count_limit
+        hand._split = False
+        hand._action_list[:] = _INITIAL_ACTIONS
+        hand.reset_hand()
+        self._split_hands.append(hand)
+        return hand
+
+    def _new_split_hand(self):
+        """
+        Returns: A new hand for split_hand, sharing this learner's hand pool.
+        """
+        hand = QLearner(q_table=self._Q, rng=self._rng, buffer=self._buffer)
+        hand._split_hands = self._split_hands
+        hand._free_hands = self._free_hands
+        return hand
+
+    def release_split_hands(self):
+        """Returns every hand split off since the last call to the pool"""
+        self._free_hands.extend(self._split_hands)
+        self._split_hands.clear()
+
     def set_initial_split_hand(self, card: Card):
         """Initializes a new hand after splitting with one card"""
-        self._hand = [card]
         # split aces are always 11
-        self._total_hand_val = 11 if card.rank == "Ace" else card.value
-        self._ace_count = 1 if card.rank == "Ace" else 0
+        self.reset_hand()
+        self.add_card(card)
 
     def get_action(self, state):
         """Choose an action using epsilon-greedy strategy"""
@@ -77,31 +148,22 @@ class QLearner(Player):
         if self._can_double == False and Constants.double in self._action_list:
             self._action_list.remove(Constants.double)
 
-        if state in QLearner._Q and np.random.uniform(0, 1) < self._epsilon:
-            # all actions have same reward value
-            if len(set(QLearner._Q[state].values())) == 1:
-                action = np.random.choice(self._action_list)
-            else:
-                pos_actions = QLearner._Q[state].copy()
-
-                # remove split if not possible action
-                if not self._split and Constants.split in pos_actions:
-                    del pos_actions[Constants.split]
-
-                # remove double if not possible action
-                if self._can_double == False and Constants.double in pos_actions:
-                    del pos_actions[Constants.double]
-
-                # Choose the action with the highest Q-value
-                action = max(pos_actions, key=pos_actions.get)
+        values = self._Q[state].tolist()
+        if self._rng.random() < self._epsilon and \
+                values.count(values[0]) != len(values):
+            pos_actions = [HIT, STAY]
+            # split and double only if possible actions
+            if self._split:
+                pos_actions.append(SPLIT)
+            if self._can_double:
+                pos_actions.append(DOUBLE)
 
+            # Choose the action with the highest Q-value
+            action = ACTIONS[max(pos_actions, key=values.__getitem__)]
         else:
-            # Choose a random action (exploration)
-            action = np.random.choice(self._action_list)
-            # Initialize state-action pair if not already present
-            if state not in QLearner._Q:
-                QLearner._Q[state] = {
-                    Constants.hit: 0, Constants.stay: 0, Constants.split: 0, Constants.double: 0}
+            # Choose a random action (exploration), unseen states have all
+            # actions at the same value and always explore
+            action = self._rng.choice(self._action_list)
 
         # Store last action and state for Q-value update
         self._last_state = state
@@ -116,74 +178,92 @@ class QLearner(Player):
 
     def get_reward(self, state):
         """Return the reward of the state"""
-        # Check if new_state exists in the Q-table
-        if state in QLearner._Q:
-            # Calculate the reward (discounted max Q-value for the next state)
-            reward = max(QLearner._Q[state].values())
-        else:
-            reward = 0
-        return reward
+        # Calculate the reward (discounted max Q-value for the next state)
+        return self._Q[state].max()
 
     def update(self, new_state, reward):
         """Update the Q-value based on the received reward"""
-        try:
-            if self._learning:
-                old_value = QLearner._Q[self._last_state][self._last_action]
-                future_reward = self._discount * self.get_reward(new_state)
+        if self._learning and self._last_state is not None:
+            action = ACTION_INDEX[self._last_action]
+            if self._buffer is not None:
+                self._record(self._last_state, action, reward, new_state)
+                return
+            old_value = self._Q[self._last_state, action]
+            future_reward = self._discount * self.get_reward(new_state)
 
-                # Q-learning formula to update the Q-value
-                QLearner._Q[self._last_state][self._last_action] = (1 - self._learning_rate) * old_value + \
-                    self._learning_rate * (reward + future_reward)
-        except KeyError as e:
-            print(self._last_state, self._last_action)
+            # Q-learning formula to update the Q-value
+            self._Q[self._last_state, action] = (1 - self._learning_rate) * old_value + \
+                self._learning_rate * (reward + future_reward)
 
     def split_update(self, state, reward):
         "Update the Q-value based on the received reward if the action was split"
         if self._learning:
-            # print(QLearner._Q[state])
-            old_value = QLearner._Q[state][Constants.split]
+            if self._buffer is not None:
+                self._record(state, SPLIT, self._discount * reward)
+                return
+            old_value = self._Q[state, SPLIT]
             future_reward = self._discount * reward
 
             # Q-learning formula to update the Q-value
-            QLearner._Q[state][Constants.split] = (1 - self._learning_rate) * old_value + \
+            self._Q[state, SPLIT] = (1 - self._learning_rate) * old_value + \
                 self._learning_rate * future_reward
 
     def double_update(self, state, reward):
         "Update the Q-value based on the received reward if the action was double"
         if self._learning:
-            old_value = QLearner._Q[state][Constants.double]
+            if self._buffer is not None:
+                self._record(state, DOUBLE, self._discount * (reward*2))
+                return
+            old_value = self._Q[state, DOUBLE]
             future_reward = self._discount * (reward*2)
 
             # Q-learning formula to update the Q-value
-            QLearner._Q[state][Constants.double] = (1 - self._learning_rate) * old_value + \
+            self._Q[state, DOUBLE] = (1 - self._learning_rate) * old_value + \
                 self._learning_rate * future_reward
 
-    def get_optimal_strategy(self):
-        """Returns a DataFrame of optimal strategies based on Q-values"""
-        df = pd.DataFrame(QLearner._Q).transpose()
-        df.reset_index(inplace=True)
-
-        card_order = {
-            'Twos': 22, 'Threes': 23, 'Fours': 24, 'Fives': 25, 'Sixes': 26,
-            'Sevens': 27, 'Eights': 28, 'Nines': 29, 'Tens': 30, 'Aces': 31
-        }
-        df.columns = ['player', 'dealer', 'hit', 'stay', 'split', 'double']
-
-        def sort_key(value):
-            if str(value).isdigit():
-                return int(value)
-            return card_order.get(value, 0)
-        # Sort by 'player' and 'dealer' for organized output
-        df['player_sort'] = df['player'].apply(sort_key)
-        df = df.sort_values(by=['player_sort', 'dealer']).drop(
-            columns='player_sort').reset_index(drop=True)
-
-        def is_soft(value):
-            return "," in value and value.split(",")[0] == "A" and value.split(",")[1].isdigit()
-        for row, col in df.iterrows():
-            if str(col['player']).isdigit() or is_soft(str(col['player'])):
-                df.at[row, 'optimal'] = col[['hit', 'stay', 'double']].idxmax()
-            else:
-                df.at[row, 'optimal'] = col[[
-                    'hit', 'stay', 'split', 'double']].idxmax()
-        return df
+    def _record(self, state, action, reward, next_state=TERMINAL_STATE):
+        """Adds a transition to the buffer, applying the buffer first if full"""
+        if self._buffer.full():
+            self.flush_updates()
+        self._buffer.add(state, action, reward, next_state)
+
+    def flush_updates(self):
+        """Applies every update recorded in the buffer and not applied yet"""
+        if self._buffer is not None:
+            self._buffer.flush(self._Q, self._learning_rate, self._discount)
+
+    def save_q_table(self, path, rules=None):
+        """
+        Saves the Q-table to a .npy file, or to a QTableStore recording rules
+        if path has the store extension.
+        """
+        if str(path).endswith(EXTENSION):
+            QTableStore.create(path, self._Q, rules).close()
+        else:
+            np.save(path, self._Q)
+
+    def load_q_table(self, path):
+        """Loads Q-values saved by save_q_table into the shared Q-table"""
+        if str(path).endswith(EXTENSION):
+            q_table = QTableStore(path).q
+        else:
+            q_table = np.load(path)
+        if q_table.shape != self._Q.shape:
+            raise ValueError(
+                f"Q-table {path} has shape {q_table.shape}, expected {self._Q.shape}")
+        self._Q[...] = q_table
+
+    def get_optimal_strategy(self, rules=None):
+        """
+        Returns a DataFrame of optimal strategies based on Q-values, one row
+        per learned state in state order, choosing only among the actions
+        rules allow, see policy_export.strategy_frame.
+        """
+        return strategy_frame(self._Q, rules=rules)
+
+    def save_optimal_strategy(self, path, rules=None):
+        """
+        Writes the optimal strategy to path as .csv, .npy, .parquet or
+        .arrow/.feather, going by its extension.
+        """
+        write_strategy(self.get_optimal_strategy(rules), path)
@@ -0,0 +1,135 @@
+import json
+import os
+import numpy as np
+from rules import Rules
+from state_encoding import (ACTIONS, DEALER_COLUMNS, N_CODES, PLAYER_ROWS,
+                            new_q_table)
+"""
+A persistent, memory-mapped Q-table. A store is a single file: a fixed size
+header followed by the raw Q-values. The header is a magic string and a JSON
+document describing the table: the format version, its shape and dtype, the
+state encoding (player rows and dealer columns, in code order), the number of
+true count buckets of a card counting table, the action columns, and the
+rules the table was learned under. Opening a store checks the header against
+the state encoding and actions of this code, so a table is never read with
+the wrong layout.
+
+The values are mapped with numpy.memmap instead of being read, so opening a
+store is instantaneous whatever its size, and stores opened read-only by any
+number of processes share the same pages of the OS cache instead of each
+holding a copy. A store opened for writing can be trained into directly,
+e.g. as the q_table of a QLearner, and flush writes back only the pages that
+changed since the last flush.
+
+Attributes:
+    MAGIC (bytes): The bytes every store starts with.
+    VERSION (int): The store format version, checked on open.
+    HEADER_SIZE (int): The bytes before the values, a multiple of the page
+        size so the values are page aligned.
+    EXTENSION (str): The file extension of stores.
+    path (str): The file of a store.
+    header (dict): The decoded header of a store.
+    rules (Rules): The rules the table was learned under, None if unknown.
+    q (ndarray): The Q-values, an array backed by the mapped file, read-only
+        unless the store was opened for writing.
+"""
+
+MAGIC = b"BJQTABLE"
+VERSION = 1
+HEADER_SIZE = 4096
+EXTENSION = ".qtable"
+
+
+def table_layout(q_table, rules=None):
+    """
+    Returns: The header describing q_table under this state encoding and
+    action set, learned under rules.
+    """
+    return {"version": VERSION, "shape": list(q_table.shape),
+            "dtype": q_table.dtype.str,
+            "player_rows": [str(player) for player in PLAYER_ROWS],
+            "dealer_columns": DEALER_COLUMNS,
+            "count_buckets": q_table.shape[0] // N_CODES, "actions": ACTIONS,
+            "rules": None if rules is None else rules.settings()}
+
+
+def read_header(path):
+    """
+    Returns: The header of the store at path, after checking that it is a
+    store of this version laid out like this code's Q-tables.
+    """
+    with open(path, "rb") as f:
+        block = f.read(HEADER_SIZE)
+    if not block.startswith(MAGIC):
+        raise ValueError(f"{path} is not a Q-table store")
+    header = json.loads(block[len(MAGIC):].decode().rstrip("\0 "))
+    if header["version"] != VERSION:
+        raise ValueError(f"Q-table store {path} has version "
+                         f"{header['version']}, expected {VERSION}")
+    expected = table_layout(new_q_table())
+    for key in ("player_rows", "dealer_columns", "actions"):
+        if header[key] != expected[key]:
+            raise ValueError(f"Q-table store {path} has {key} "
+                             f"{header[key]}, expected {expected[key]}")
+    return header
+
+
+class QTableStore:
+    def __init__(self, path, writable=False):
+        """
+        Opens the store at path, read-only unless writable.
+        """
+        self.path = str(path)
+        self.header = read_header(self.path)
+        rules = self.header["rules"]
+        self.rules = None if rules is None else Rules(**rules)
+        self._map = np.memmap(self.path, dtype=np.dtype(self.header["dtype"]),
+                              mode="r+" if writable else "r",
+                              offset=HEADER_SIZE,
+                              shape=tuple(self.header["shape"]))
+        # a plain view indexes without memmap's per-slice overhead
+        self.q = self._map.view(np.ndarray)
+
+    @classmethod
+    def create(cls, path, q_table=None, rules=None):
+        """
+        Writes a new store to path holding q_table (a new zeroed table by
+        default) learned under rules, replacing any file there.
+        Returns: The store, opened for writing.
+        """
+        q_table = new_q_table() if q_table is None else np.asarray(q_table)
+        header = MAGIC + json.dumps(table_layout(q_table, rules)).encode()
+        if len(header) > HEADER_SIZE:
+            raise ValueError(f"Q-table store header of {len(header)} bytes "
+                             f"does not fit in {HEADER_SIZE}")
+        temp = f"{path}.tmp"
+        with open(temp, "wb") as f:
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.write(np.ascontiguousarray(q_table).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+        return cls(path, writable=True)
+
+    def flush(self):
+        """Writes the values changed since the last flush to the file"""
+        if self._map is not None and self._map.flags.writeable:
+            self._map.flush()
+
+    def close(self):
+        """
+        Flushes a writable store and drops its mapping, which is unmapped once
+        no array uses it any more.
+        """
+        self.flush()
+        self._map = self.q = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __reduce__(self):
+        # a store sent to another process is opened again there, read-only
+        return QTableStore, (self.path,)
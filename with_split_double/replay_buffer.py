@@ -0,0 +1,118 @@
+import numpy as np
+from batch_game import apply_q_updates
+from state_encoding import TERMINAL_STATE
+"""
+A ring buffer of Q-learning transitions, so that QLearner can record its
+updates during play and apply them later in vectorized batches.
+
+Each transition is a state code, an action index, a reward and the next
+state code, kept in preallocated NumPy arrays. The target of a transition
+is reward + discount * max(Q[next state]); updates that do not bootstrap,
+like those of split and double, are recorded with TERMINAL_STATE as the
+next state and their discounted reward. flush applies the transitions
+recorded since the last flush, in order, with apply_q_updates: targets come
+from the table as it was before the batch, which is what makes the batch
+vectorizable, and repeated state-action pairs are folded in closed form.
+
+Transitions stay in the buffer after they have been applied, until they are
+overwritten, and replay applies a random sample of them again, either
+uniformly or prioritized by the size of their current TD error.
+
+Attributes:
+    capacity (int): The number of transitions the buffer holds.
+    size (int): The number of transitions stored, at most capacity.
+    pending (int): The number of transitions recorded since the last flush.
+"""
+
+
+class ReplayBuffer:
+    def __init__(self, capacity=65536):
+        """
+        Initializes an empty buffer with room for capacity transitions.
+        """
+        self.capacity = capacity
+        self.size = 0
+        self.pending = 0
+        self._states = np.zeros(capacity, dtype=np.int64)
+        self._actions = np.zeros(capacity, dtype=np.int64)
+        self._rewards = np.zeros(capacity, dtype=np.float64)
+        self._next_states = np.full(capacity, TERMINAL_STATE, dtype=np.int64)
+        self._pos = 0
+
+    def __len__(self):
+        return self.size
+
+    def full(self):
+        """
+        Returns: True when the next transition would overwrite one that has
+        not been applied yet.
+        """
+        return self.pending == self.capacity
+
+    def add(self, state, action, reward, next_state=TERMINAL_STATE):
+        """Records one transition, which must not overwrite a pending one"""
+        assert self.pending < self.capacity, "flush the buffer first"
+        pos = self._pos
+        self._states[pos] = state
+        self._actions[pos] = action
+        self._rewards[pos] = reward
+        self._next_states[pos] = next_state
+        self._pos = (pos + 1) % self.capacity
+        self.pending += 1
+        self.size = min(self.size + 1, self.capacity)
+
+    def _recent(self, n):
+        """Returns: The positions of the last n transitions, oldest first"""
+        return (self._pos - n + np.arange(n)) % self.capacity
+
+    def transitions(self, index=None):
+        """
+        Returns: The (states, actions, rewards, next_states) arrays of the
+        transitions at positions index, or of all stored ones, oldest first.
+        """
+        if index is None:
+            index = self._recent(self.size)
+        return (self._states[index], self._actions[index],
+                self._rewards[index], self._next_states[index])
+
+    def flush(self, q, learning_rate, discount):
+        """
+        Applies the transitions recorded since the last flush to the Q-table
+        q in place.
+        Returns: The number of transitions applied.
+        """
+        n = self.pending
+        if n:
+            apply_q_updates(q, *self.transitions(self._recent(n)),
+                            learning_rate, discount)
+            self.pending = 0
+        return n
+
+    def td_errors(self, q, discount, index=None):
+        """
+        Returns: The TD error of the transitions at positions index, or of all
+        stored ones, under the Q-table q.
+        """
+        states, actions, rewards, next_states = self.transitions(index)
+        return rewards + discount * q[next_states].max(axis=1) - \
+            q[states, actions]
+
+    def replay(self, q, n, learning_rate, discount, rng, priority=0.0):
+        """
+        Applies n transitions sampled with replacement from the stored ones
+        to q in place. With priority > 0 transitions are sampled in
+        proportion to |TD error| ** priority instead of uniformly.
+        Returns: The positions of the transitions that were replayed.
+        """
+        if self.size == 0:
+            return np.empty(0, dtype=np.int64)
+        stored = self._recent(self.size)
+        if priority > 0:
+            weights = np.abs(self.td_errors(q, discount, stored)) ** priority
+            total = weights.sum()
+            p = weights / total if total > 0 else None
+            index = stored[rng.choice(len(stored), size=n, p=p)]
+        else:
+            index = stored[rng.integers(len(stored), size=n)]
+        apply_q_updates(q, *self.transitions(index), learning_rate, discount)
+        return index
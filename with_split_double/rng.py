@@ -0,0 +1,71 @@
+import numpy as np
+"""
+Random number streams for the simulation, built on numpy.random.Generator.
+
+Every component that needs randomness (Deck, QLearner, BatchGame) takes its
+own generator instead of sharing a global one, so a seeded Game plays the same
+rounds every time. Independent streams for the components of a Game, or for
+the trials and workers of a sweep, are spawned from one seed with
+SeedSequence.spawn, which keeps them statistically independent however many
+are created.
+
+QLearner draws one uniform number per decision. RandomStream serves those from
+blocks generated in bulk, which costs far less per number than a call to the
+generator.
+"""
+
+
+def make_rng(seed=None):
+    """
+    Returns: A Generator for seed, which may be None (fresh entropy), an int,
+    a SeedSequence or already a Generator, which is returned as is.
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def spawn_seeds(seed, n):
+    """
+    Returns: n independent SeedSequences derived from seed, which can be
+    handed to other processes.
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(n)
+
+
+def spawn(seed, n):
+    """
+    Returns: n independent Generators derived from seed.
+    """
+    return [np.random.default_rng(child) for child in spawn_seeds(seed, n)]
+
+
+class RandomStream:
+    def __init__(self, rng=None, block_size=4096):
+        """
+        Initializes a stream of uniform numbers drawn from rng (a Generator or
+        anything make_rng accepts) block_size at a time.
+        """
+        self.generator = make_rng(rng)
+        self.block_size = block_size
+        self._block = []
+        self._pos = 0
+
+    def random(self):
+        """
+        Returns: A uniform float in [0, 1).
+        """
+        if self._pos == len(self._block):
+            self._block = self.generator.random(self.block_size).tolist()
+            self._pos = 0
+        value = self._block[self._pos]
+        self._pos += 1
+        return value
+
+    def choice(self, options):
+        """
+        Returns: A uniformly chosen element of the sequence options.
+        """
+        return options[int(self.random() * len(options))]
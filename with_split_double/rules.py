@@ -0,0 +1,139 @@
+from deck import Deck, InfiniteShoe
+import numpy as np
+"""
+The table rules a game is played by. Every engine (Game, BatchGame, the
+parallel actors, evaluation and the dealer outcome cache) takes a Rules
+object instead of hard coding them, so a variant of the game is a set of
+rules rather than a copy of the code.
+
+The defaults are the rules Game has always played by: a single deck, split
+(up to four hands) and double allowed, doubling after a split allowed, split
+Aces getting one card each, a natural paying 3:2, and a dealer that hits
+every total up to and including 17. HIT_STAY_RULES are those of the hit/stay
+game of basic_strat: no split or double, an infinite shoe, and a dealer
+standing on every 17.
+
+The rules are compiled once, when the Rules object is made, into the lookup
+tables the engines index instead of branching on the rules: whether the
+dealer hits, which actions are legal, and what every result pays. A Rules
+object is therefore not meant to be changed after it is made.
+
+Attributes:
+    split (bool): Whether a pair can be split.
+    double (bool): Whether two cards can be doubled.
+    num_decks (int): The number of decks in the shoe, None for an infinite
+        shoe that deals every card with replacement.
+    dealer_stand (int): The lowest total the dealer stands on, 17 to 22,
+        the dealer's final totals being 17-21 or bust (see
+        dealer_cache.OUTCOMES).
+    hit_soft_17 (bool): Whether the dealer hits a soft 17, which only matters
+        when dealer_stand is 17.
+    blackjack_payout (float): What a natural pays per unit staked.
+    double_after_split (bool): Whether the hands of a split can be doubled.
+    max_hands (int): The number of hands a round can be split into, at most
+        batch_game.MAX_HANDS.
+    hit_split_aces (bool): Whether split Aces are played on like any other
+        hand, instead of getting one card each and standing.
+    dealer_hit (ndarray): Whether the dealer hits, by [soft, total] for
+        totals 0-31.
+    legality (ndarray): The legality code (2 * can_split + can_double, see
+        state_encoding.LEGAL_MASKS) of a hand, by [splittable pair with room
+        for another hand, two cards, after a split].
+    payout (ndarray): The reward of a hand, by [result, doubled], with the
+        results LOSS, PUSH, WIN and NATURAL.
+    FIELDS (list): The settings a Rules object is made from.
+    LOSS, PUSH, WIN, NATURAL (int): The results indexing payout.
+    DEFAULT_RULES (Rules): The rules of with_split_double.
+    HIT_STAY_RULES (Rules): The rules of basic_strat.
+"""
+
+FIELDS = ["split", "double", "num_decks", "dealer_stand", "hit_soft_17",
+          "blackjack_payout", "double_after_split", "max_hands",
+          "hit_split_aces"]
+LOSS, PUSH, WIN, NATURAL = range(4)
+
+
+class Rules:
+    def __init__(self, split=True, double=True, num_decks=1, dealer_stand=18,
+                 hit_soft_17=True, blackjack_payout=1.5,
+                 double_after_split=True, max_hands=4, hit_split_aces=False):
+        """
+        Initializes a set of rules, by default the ones Game has always used,
+        and compiles them into its lookup tables.
+        Raises: ValueError if dealer_stand is outside 17-22.
+        """
+        if not 17 <= dealer_stand <= 22:
+            raise ValueError(f"dealer_stand must be 17 to 22, not {dealer_stand}")
+        self.split = split
+        self.double = double
+        self.num_decks = num_decks
+        self.dealer_stand = dealer_stand
+        self.hit_soft_17 = hit_soft_17
+        self.blackjack_payout = blackjack_payout
+        self.double_after_split = double_after_split
+        self.max_hands = max_hands
+        self.hit_split_aces = hit_split_aces
+
+        totals = np.arange(32)
+        self.dealer_hit = np.array([totals < dealer_stand,
+                                    (totals < dealer_stand) |
+                                    (hit_soft_17 & (totals == 17))])
+        self.legality = np.zeros((2, 2, 2), dtype=np.int8)
+        for after_split in (0, 1):
+            can_double = double and (double_after_split or not after_split)
+            self.legality[:, 1, after_split] = [can_double, 2 * split + can_double]
+        self.payout = np.array([[-1.0, -2.0], [0.0, 0.0], [1.0, 2.0],
+                                [blackjack_payout, blackjack_payout]])
+
+    def settings(self):
+        """Returns: A dict of the FIELDS the rules were made from"""
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __repr__(self):
+        return "Rules(" + ", ".join(f"{key}={value!r}" for key, value in
+                                    self.settings().items()) + ")"
+
+    def __eq__(self, other):
+        return isinstance(other, Rules) and self.settings() == other.settings()
+
+    def dealer_hits(self, total, soft):
+        """
+        Returns: True if the dealer must hit on total, soft if an Ace in the
+        hand is counted as 11.
+        """
+        return bool(self.dealer_hit[int(soft), min(total, 31)])
+
+    def may_split(self, n_hands):
+        """
+        Returns: True if a pair can be split when the round is already played
+        as n_hands hands.
+        """
+        return self.split and n_hands < self.max_hands
+
+    def may_double(self, after_split):
+        """
+        Returns: True if two cards can be doubled, after_split if the hand
+        comes from a split.
+        """
+        return bool(self.legality[0, 1, int(after_split)] & 1)
+
+    def action_mask(self):
+        """
+        Returns: A boolean array over the actions in Q-table column order,
+        False for the ones these rules never allow.
+        """
+        return np.array([True, True, self.split, self.double])
+
+    def new_deck(self, rng=None):
+        """
+        Returns: A shoe of num_decks decks, or an InfiniteShoe, shuffled with
+        rng (a Generator or a seed for one).
+        """
+        if self.num_decks is None:
+            return InfiniteShoe(rng=rng)
+        return Deck(num_decks=self.num_decks, rng=rng)
+
+
+DEFAULT_RULES = Rules()
+HIT_STAY_RULES = Rules(split=False, double=False, num_decks=None,
+                       dealer_stand=17, hit_soft_17=False)
@@ -0,0 +1,122 @@
+from constants import Constants
+import math
+import numpy as np
+"""
+Integer encoding of the game states and actions used to index the dense
+Q-table of QLearner.
+
+A state is a player row crossed with the dealer's showing card. Player rows
+are the hard totals 4-21, the soft totals A,2-A,9 and the pairs 2,2-A,A, in
+that order, and the dealer's showing card is 2-11 with the Ace counted as 11.
+The state code is player_row * len(DEALER_COLUMNS) + dealer_column. Every
+final state maps onto the single TERMINAL_STATE row, which is never updated
+and therefore always worth 0.
+
+A counting Q-table adds a dense true-count axis in front: the Hi-Lo true
+count, floored and clipped to -count_limit..count_limit, picks one of
+2 * count_limit + 1 buckets, each a full block of N_CODES rows, and the
+state code of a count bucket is bucket * N_CODES + state code. Every table
+must fit in Q_TABLE_BUDGET bytes.
+
+Attributes:
+    ACTIONS (list): The actions in Q-table column order.
+    PLAYER_ROWS (list): The player part of each state, as hand totals or the
+        "A,x" / "x,x" labels used by the strategy tables.
+    DEALER_COLUMNS (list): The dealer's showing value of each column.
+    N_STATES (int): The number of non-terminal states.
+    TERMINAL_STATE (int): The code shared by all final states.
+    N_CODES (int): The number of state codes, and of rows per count bucket.
+    Q_TABLE_BUDGET (int): The most bytes a Q-table may take.
+    LEGAL_MASKS (ndarray): The actions allowed under each legality code
+        2 * can_split + can_double, one row per code. Hit and stay are always
+        allowed.
+"""
+
+ACTIONS = [Constants.hit, Constants.stay, Constants.split, Constants.double]
+HIT, STAY, SPLIT, DOUBLE = range(len(ACTIONS))
+ACTION_INDEX = {action: index for index, action in enumerate(ACTIONS)}
+
+HARD_ROWS = list(range(4, 22))
+SOFT_ROWS = [f"A,{i}" for i in range(2, 10)]
+PAIR_ROWS = [f"{i},{i}" for i in range(2, 11)] + ["A,A"]
+PLAYER_ROWS = HARD_ROWS + SOFT_ROWS + PAIR_ROWS
+DEALER_COLUMNS = list(range(2, 12))
+N_STATES = len(PLAYER_ROWS) * len(DEALER_COLUMNS)
+TERMINAL_STATE = N_STATES
+N_CODES = N_STATES + 1
+Q_TABLE_BUDGET = 1 << 20
+
+LEGAL_MASKS = np.array([[True, True, split, double]
+                        for split in (False, True) for double in (False, True)])
+
+_PLAYER_ROW = {player: row for row, player in enumerate(PLAYER_ROWS)}
+# dealer showing value -> column, an Ace may be reported as 1 or 11
+_DEALER_COLUMN = {dealer: column for column, dealer in enumerate(DEALER_COLUMNS)}
+_DEALER_COLUMN[1] = _DEALER_COLUMN[11]
+
+SOFT_ROW = len(HARD_ROWS)
+PAIR_ROW = len(HARD_ROWS) + len(SOFT_ROWS)
+# pair card value (Ace = 1) -> player row of that pair
+PAIR_ROW_OF = np.array([0, PAIR_ROW + 9] +
+                       [PAIR_ROW + v - 2 for v in range(2, 11)])
+
+
+def encode_state(player, dealer):
+    """
+    Returns: The state code of a player total or label against the dealer's
+    showing value. Totals outside 4-21 are final and map to TERMINAL_STATE.
+    """
+    row = _PLAYER_ROW.get(player)
+    if row is None:
+        return TERMINAL_STATE
+    return row * len(DEALER_COLUMNS) + _DEALER_COLUMN[dealer]
+
+
+def decode_state(code):
+    """
+    Returns: The (player, dealer) pair of a non-terminal state code.
+    """
+    row, column = divmod(code, len(DEALER_COLUMNS))
+    return PLAYER_ROWS[row], DEALER_COLUMNS[column]
+
+
+def encode_hands(total, soft, pair, pair_value, dealer_column):
+    """
+    Vectorized encoding of many hands at once.
+    Returns: The state codes of hands with the given best totals, soft flags,
+    pair flags and pair card values (Ace = 1) against dealer columns.
+    """
+    row = np.where(soft & (total >= 13) & (total <= 20),
+                   SOFT_ROW + total - 13, total - 4)
+    row = np.where(pair, PAIR_ROW_OF[pair_value], row)
+    return row * len(DEALER_COLUMNS) + dealer_column
+
+
+def count_bucket(true_count, count_limit):
+    """
+    Returns: The count bucket of a true count, 0 to 2 * count_limit.
+    """
+    return min(max(math.floor(true_count), -count_limit), count_limit) + \
+        count_limit
+
+
+def count_view(q_table):
+    """
+    Returns: q_table as a (count buckets, N_CODES, actions) array sharing its
+    memory.
+    """
+    return q_table.reshape(-1, N_CODES, q_table.shape[1])
+
+
+def new_q_table(count_limit=0):
+    """
+    Returns: A zeroed Q-table with one row per state, plus the terminal row,
+    and one column per action, for each of the 2 * count_limit + 1 count
+    buckets.
+    """
+    shape = ((2 * count_limit + 1) * N_CODES, len(ACTIONS))
+    size = shape[0] * shape[1] * np.dtype(np.float64).itemsize
+    if size > Q_TABLE_BUDGET:
+        raise ValueError(f"a Q-table with count_limit {count_limit} takes "
+                         f"{size} bytes, more than {Q_TABLE_BUDGET}")
+    return np.zeros(shape)
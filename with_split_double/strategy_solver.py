@@ -0,0 +1,232 @@
+from dealer_cache import DealerOutcomeCache, remove_card
+from rules import DEFAULT_RULES
+from state_encoding import (ACTIONS, DEALER_COLUMNS, PLAYER_ROWS, SOFT_ROWS,
+                            PAIR_ROWS, N_STATES, new_q_table)
+import numpy as np
+import pandas as pd
+"""
+Dynamic-programming expected values of hit, stay, split and double for every
+(player state, dealer showing card) under a Rules object, DEFAULT_RULES by
+default, the same one Game and BatchGame play by. The rules give the shoe,
+when the dealer hits, which actions exist (split, double, doubling after a
+split) and whether split aces are played on. Naturals are settled before
+anyone acts, so what they pay never enters a decision. Without splitting,
+pairs are played as their totals, as Game encodes them.
+
+Values are composition dependent. The player's two cards and the dealer's
+showing card are removed from the shoe, and every card the player and the
+dealer draw afterwards is removed as well. Dealer outcome distributions and
+player hit values are memoized on the remaining card counts, the former in a
+DealerOutcomeCache. By default the dealer's distribution is taken from the
+shoe as it was when the player made the decision (cards the player hits are
+not removed from the dealer's draws), which solves the whole table in
+seconds; exact=True tracks them too and takes about half a minute for a
+single deck. The split value is that of two independent hands, each started
+from the pair card plus one draw (no resplitting, whatever max_hands allows). Since natural blackjacks
+are settled first, every value is conditioned on the dealer not having one.
+
+The table can be used as the reference policy and, through solve_q_table,
+to warm start a QLearner.
+"""
+
+
+def _total(hard, ace):
+    return hard + 10 if ace and hard <= 11 else hard
+
+
+class StrategySolver:
+    def __init__(self, rules=None, exact=False):
+        """
+        Initializes a solver for the game played by rules, DEFAULT_RULES by
+        default.
+        """
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.exact = exact
+        # every composition the solver reaches is revisited, so keep them all
+        self.dealer_outcomes = DealerOutcomeCache(self.rules, maxsize=None)
+        # card values 1 (Ace) to 10, counting Jacks, Queens and Kings as 10
+        self.shoe = self.dealer_outcomes.shoe
+        self._infinite = self.rules.num_decks is None
+        self._split_doubles = self.rules.may_double(True)
+        self._hit_memo = {}
+
+    def _draw(self, counts, value):
+        """Returns: counts after drawing a card of value from the shoe"""
+        return counts if self._infinite else remove_card(counts, value)
+
+    def dealer_distribution(self, counts, upcard):
+        """
+        Returns: The probabilities of the dealer finishing on 17, 18, 19, 20,
+        21 and bust, given the showing card value (Ace = 1) and the counts of
+        cards left in the shoe, conditioned on the dealer not having a natural.
+        """
+        return self.dealer_outcomes.distribution(upcard, counts)
+
+    def stand_ev(self, counts, total, upcard):
+        """
+        Returns: The expected value of standing on total against a dealer
+        drawing from counts.
+        """
+        return self.dealer_outcomes.stand_ev(total, upcard, counts)
+
+    def hit_ev(self, counts, hard, ace, upcard, dealer_counts):
+        """
+        Returns: The expected value of hitting once from counts and then
+        playing on optimally by hitting or standing, against a dealer drawing
+        from dealer_counts (or from what is left of counts if exact).
+        """
+        key = (counts, hard, ace, upcard, dealer_counts)
+        memo = self._hit_memo.get(key)
+        if memo is not None:
+            return memo
+        remaining = sum(counts)
+        ev = 0.0
+        for value in range(1, 11):
+            count = counts[value - 1]
+            if count == 0:
+                continue
+            rest = self._draw(counts, value)
+            new_hard = hard + value
+            if new_hard > 21:
+                ev -= count / remaining
+                continue
+            new_ace = ace or value == 1
+            dealer = rest if self.exact else dealer_counts
+            best = max(self.stand_ev(dealer, _total(new_hard, new_ace), upcard),
+                       self.hit_ev(rest, new_hard, new_ace, upcard, dealer_counts))
+            ev += count / remaining * best
+        self._hit_memo[key] = ev
+        return ev
+
+    def double_ev(self, counts, hard, ace, upcard):
+        """
+        Returns: The expected value of doubling, taking exactly one card.
+        """
+        remaining = sum(counts)
+        ev = 0.0
+        for value in range(1, 11):
+            count = counts[value - 1]
+            if count:
+                dealer = self._draw(counts, value) if self.exact else counts
+                ev += count / remaining * self.stand_ev(
+                    dealer, _total(hard + value, ace or value == 1), upcard)
+        return 2 * ev
+
+    def split_ev(self, counts, pair, upcard):
+        """
+        Returns: The expected value of splitting a pair of value pair, playing
+        each hand on from one card plus a draw without resplitting, doubling
+        only if the rules allow it after a split.
+        """
+        remaining = sum(counts)
+        ev = 0.0
+        for value in range(1, 11):
+            count = counts[value - 1]
+            if count == 0:
+                continue
+            rest = self._draw(counts, value)
+            hard = pair + value
+            ace = pair == 1 or value == 1
+            stand = self.stand_ev(rest if self.exact else counts,
+                                  _total(hard, ace), upcard)
+            if pair == 1 and not self.rules.hit_split_aces:
+                best = stand  # split aces receive one card each
+            else:
+                best = max(stand, self.hit_ev(rest, hard, ace, upcard, counts))
+                if self._split_doubles:
+                    best = max(best, self.double_ev(rest, hard, ace, upcard))
+            ev += count / remaining * best
+        return 2 * ev
+
+    def _hands(self, player):
+        """
+        Returns: The two card hands (value pairs with their weights) that the
+        given player row stands for. Pairs are hands of the hard totals (and
+        A,A of 12) only when splitting is off. Hard totals without such a
+        hand (4, 20 and 21 when pairs are excluded) are returned as an empty
+        list.
+        """
+        shoe = self.shoe
+        if player in PAIR_ROWS:
+            value = 1 if player == "A,A" else int(player.split(",")[0])
+            return [((value, value), 1.0)]
+        if player in SOFT_ROWS:
+            return [((1, int(player.split(",")[1])), 1.0)]
+        hands = [((a, player - a), shoe[a - 1] * shoe[player - a - 1])
+                 for a in range(2, 10) if a < player - a <= 10]
+        if not self.rules.split:
+            values = [player // 2] if player % 2 == 0 and player <= 20 else []
+            for value in values + [1] * (player == 12):
+                # unordered pairs of one value, weighed like the unordered
+                # hands of two values above
+                count = shoe[value - 1]
+                pairs = count * (count if self._infinite else count - 1) / 2
+                hands.append(((value, value), pairs))
+        return hands
+
+    def _evs(self, player, upcard):
+        """
+        Returns: The expected values of hit, stay, split and double (nan when
+        the action does not apply) for a player row against a showing card.
+        """
+        up = 1 if upcard == 11 else upcard
+        base = self._draw(self.shoe, up)
+        hands = self._hands(player)
+        splits = player in PAIR_ROWS and self.rules.may_split(1)
+        if not hands:
+            # hard totals with no two card hand, played from the shoe as is
+            evs = np.array([self.hit_ev(base, player, False, up, base),
+                            self.stand_ev(base, player, up), np.nan,
+                            self.double_ev(base, player, False, up)])
+        else:
+            evs = np.zeros(len(ACTIONS))
+            weights = 0.0
+            for (a, b), weight in hands:
+                counts = self._draw(self._draw(base, a), b)
+                hard, ace = a + b, a == 1 or b == 1
+                split = self.split_ev(counts, a, up) if splits else 0
+                evs += weight * np.array([
+                    self.hit_ev(counts, hard, ace, up, counts),
+                    self.stand_ev(counts, _total(hard, ace), up), split,
+                    self.double_ev(counts, hard, ace, up)])
+                weights += weight
+            evs /= weights
+        if not splits:
+            evs[ACTIONS.index("split")] = np.nan
+        if not self.rules.double:
+            evs[ACTIONS.index("double")] = np.nan
+        return evs.tolist()
+
+    def solve(self):
+        """
+        Returns: A DataFrame with the same columns as
+        QLearner.get_optimal_strategy (player, dealer, hit, stay, split,
+        double, optimal) holding the expected value of every action.
+        """
+        rows = []
+        for player in PLAYER_ROWS:
+            for dealer in DEALER_COLUMNS:
+                rows.append([player, dealer] + self._evs(player, dealer))
+        df = pd.DataFrame(rows, columns=['player', 'dealer'] + ACTIONS)
+        # split only counts where it applies, it is nan everywhere else
+        df['optimal'] = df[ACTIONS].idxmax(axis=1)
+        return df
+
+
+def solve_q_table(rules=None, exact=False):
+    """
+    Returns: A Q-table in state_encoding layout holding the expected values
+    solved under rules, with the actions that do not apply (split outside
+    pair states, and whatever the rules forbid) left at 0, ready to warm
+    start a QLearner.
+    """
+    df = StrategySolver(rules, exact).solve()
+    q_table = new_q_table()
+    q_table[:N_STATES] = np.nan_to_num(df[ACTIONS].to_numpy())
+    return q_table
+
+
+if __name__ == "__main__":
+    df = StrategySolver().solve()
+    print(df)
+    df.to_csv('solved_policy.csv', index=False)
@@ -0,0 +1,106 @@
+import numpy as np
+from batch_game import *
+from game import Game
+from progress import ProgressReporter
+from q_learner import QLearner
+from constants import Constants
+from deck import InfiniteShoe
+from state_encoding import *
+
+
+def test_play_results():
+    engine = BatchGame(1000, np.random.default_rng(0))
+    q = new_q_table()
+    n_splits, states, actions, rewards, next_states = engine.play(q, 0.9)
+
+    # every round settles at least one hand
+    hands = engine.wins + engine.losses + engine.ties
+    assert (hands >= 1).all()
+    assert hands.sum() == 1000 + n_splits
+    assert np.abs(engine.rewards).max() <= 2 * MAX_HANDS
+
+    assert len(states) == len(actions) == len(rewards) == len(next_states)
+    assert ((states >= 0) & (states < N_STATES)).all()
+    assert ((next_states >= 0) & (next_states <= TERMINAL_STATE)).all()
+
+
+def test_play_follows_greedy_policy():
+    engine = BatchGame(500, np.random.default_rng(1))
+    q = new_q_table()
+    q[:N_STATES, STAY] = 1.0
+    n_splits, states, actions, rewards, next_states = engine.play(q, 1.0)
+
+    # always staying means one terminal decision per round
+    assert n_splits == 0
+    assert (actions == STAY).all()
+    assert (next_states == TERMINAL_STATE).all()
+
+
+def test_apply_q_updates_matches_sequential():
+    q = np.zeros((3, len(ACTIONS)))
+    q[1] = [0.5, 0.2, 0.0, 0.0]
+    states = np.array([0, 0, 1, 0])
+    actions = np.array([HIT, HIT, STAY, STAY])
+    rewards = np.array([0.0, 1.0, -1.0, 2.0])
+    next_states = np.array([1, 2, 2, 1])
+
+    expected = q.copy()
+    targets = rewards + 0.9 * q[next_states].max(axis=1)
+    for s, a, t in zip(states, actions, targets):
+        expected[s, a] = 0.9 * expected[s, a] + 0.1 * t
+
+    apply_q_updates(q, states, actions, rewards, next_states, 0.1, 0.9)
+    assert np.allclose(q, expected)
+
+
+def test_game_batch_mode():
+    learner = QLearner()
+    game = Game(2000, learner, ProgressReporter(quiet=True),
+                mode=Constants.batch, batch_size=512)
+    game.run()
+
+    assert game.game_count > 2000
+    assert len(game.reward_history) == 2000
+    assert game.reward == game.reward_history[-1]
+    assert game.win + game.loss + game.tie >= 2000
+    assert not learner._learning
+    assert learner._Q[encode_state(15, 10)].any()
+    assert not learner._Q[TERMINAL_STATE].any()
+
+
+def test_cached_dealer_modes():
+    q = new_q_table()
+    q[:N_STATES, STAY] = 1.0
+    averages = []
+    for mode in (Constants.rollout, Constants.sample, Constants.expected):
+        engine = BatchGame(20000, np.random.default_rng(2), dealer_mode=mode)
+        engine.play(q, 1.0)
+        hands = engine.wins + engine.losses + engine.ties
+        assert hands.sum() == 20000
+        averages.append(engine.rewards.mean())
+
+    # the same policy is worth the same whichever way the dealer is played
+    assert np.allclose(averages, averages[0], atol=0.03)
+
+
+def test_infinite_deck():
+    q = new_q_table()
+    q[:N_STATES, HIT] = 1.0
+    averages = []
+    for infinite_deck in (False, True):
+        engine = BatchGame(50000, np.random.default_rng(4),
+                           infinite_deck=infinite_deck)
+        engine.play(q, 0.0)
+        assert (engine.wins + engine.losses + engine.ties == engine.hands).all()
+        averages.append(engine.rewards.mean())
+    # one deck per round and infinitely many play almost the same game
+    assert abs(averages[0] - averages[1]) < 0.05
+
+    learner = QLearner()
+    game = Game(2000, learner, ProgressReporter(quiet=True),
+                mode=Constants.batch, batch_size=512, deck=InfiniteShoe(),
+                seed=3)
+    assert game.infinite_deck
+    game.run()
+    assert game._engine.infinite_deck
+    assert len(game.reward_history) == 2000
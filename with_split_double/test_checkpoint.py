@@ -0,0 +1,76 @@
+import os
+import sys
+import numpy as np
+import pytest
+import main
+from checkpoint import *
+from constants import Constants
+from game import Game
+from metrics import Metrics, load_history
+from progress import ProgressReporter
+
+
+def _game(rounds, mode, seed, **kwargs):
+    return Game(rounds, progress=ProgressReporter(quiet=True), mode=mode,
+                batch_size=1024, seed=seed, **kwargs)
+
+
+@pytest.mark.parametrize("mode, rounds", [(Constants.sequential, 2000),
+                                          (Constants.batch, 5000)])
+def test_resume_plays_the_same_rounds(tmp_path, mode, rounds):
+    path = tmp_path / "checkpoint.npz"
+    straight = _game(rounds, mode, seed=1)
+    straight.run()
+    straight.run()
+
+    first = _game(rounds, mode, seed=1)
+    first.run()
+    save_checkpoint(path, first, runs=1)
+    assert os.listdir(tmp_path) == ["checkpoint.npz"]
+
+    resumed = _game(rounds, mode, seed=2)
+    assert load_checkpoint(path, resumed) == {"runs": 1}
+    resumed.run()
+    assert np.array_equal(resumed.learner._Q, straight.learner._Q)
+    assert (resumed.win, resumed.loss, resumed.tie, resumed.reward,
+            resumed.game_count) == (straight.win, straight.loss, straight.tie,
+                                    straight.reward, straight.game_count)
+    assert np.array_equal(resumed.reward_history, straight.reward_history)
+    assert resumed.metrics.rounds == straight.metrics.rounds
+
+
+def test_resume_truncates_spill_file(tmp_path):
+    path = tmp_path / "checkpoint.npz"
+    spill = tmp_path / "history.bin"
+    game = _game(500, Constants.sequential, seed=3,
+                 metrics=Metrics(spill_path=spill, spill_every=100))
+    game.run()
+    save_checkpoint(path, game, runs=1)
+    game.run()  # lost in a crash
+    assert len(load_history(spill)) == 1000
+
+    resumed = _game(500, Constants.sequential, seed=3,
+                    metrics=Metrics(spill_path=spill, spill_every=100))
+    load_checkpoint(path, resumed)
+    assert len(load_history(spill)) == 500
+
+
+def test_load_checks_shape(tmp_path):
+    path = tmp_path / "checkpoint.npz"
+    save_checkpoint(path, _game(10, Constants.sequential, seed=4))
+    with pytest.raises(ValueError):
+        load_checkpoint(path, _game(10, Constants.sequential, seed=4,
+                                    metrics=Metrics(window=10)))
+
+
+def test_resume_needs_a_checkpoint(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "missing.npz"
+    store = tmp_path / "q.qtable"
+    monkeypatch.setattr(sys, "argv", ["main.py", "--resume", "--checkpoint",
+                                      str(path), "--q-store", str(store)])
+    with pytest.raises(SystemExit) as exc:
+        main.main()
+    assert exc.value.code == 2
+    assert str(path) in capsys.readouterr().err
+    # nothing was started
+    assert not store.exists()
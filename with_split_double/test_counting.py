@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from constants import Constants
+from deck import Deck, InfiniteShoe
+from game import Game
+from policy_export import strategy_frame
+from progress import ProgressReporter
+from q_learner import QLearner
+from state_encoding import (N_CODES, N_STATES, Q_TABLE_BUDGET, count_bucket,
+                            count_view, new_q_table)
+
+
+def _hi_lo(codes):
+    return sum(Deck.hi_lo[code] for code in codes)
+
+
+def test_running_count():
+    deck = Deck(num_decks=2, rng=0)
+    assert sum(Deck.hi_lo) == 0
+    assert deck.running_count() == 0
+    for _ in range(10):
+        deck.draw_code()
+    assert deck.running_count() == _hi_lo(deck._codes[:10])
+    # the count catches up on the cards dealt since it was last taken
+    for _ in range(30):
+        deck.draw_code()
+    assert deck.running_count() == _hi_lo(deck._codes[:40])
+    deck.shuffle()
+    assert deck.running_count() == 0
+
+
+def test_true_count():
+    deck = Deck(num_decks=2, rng=1)
+    cards = [deck.draw() for _ in range(52)]
+    running = deck.running_count()
+    # one deck is left
+    assert deck.true_count() == running
+    hole = cards[-1]
+    assert deck.true_count((hole,)) == \
+        (running - Deck.hi_lo[Deck.code(hole)]) * 52 / 53
+
+    shoe = InfiniteShoe(rng=2)
+    for _ in range(100):
+        shoe.draw()
+    assert shoe.running_count() == 0 and shoe.true_count() == 0.0
+
+
+def test_count_buckets():
+    assert count_bucket(0.5, 2) == 2
+    assert count_bucket(-0.5, 2) == 1
+    assert count_bucket(7.2, 2) == 4
+    assert count_bucket(-9.0, 2) == 0
+    assert count_bucket(3.0, 0) == 0
+
+    q = new_q_table(3)
+    assert q.shape == (7 * N_CODES, 4)
+    assert count_view(q).shape == (7, N_CODES, 4)
+    assert new_q_table().shape == (N_CODES, 4)
+    limit = Q_TABLE_BUDGET // (N_CODES * 4 * 8)
+    with pytest.raises(ValueError, match="count_limit"):
+        new_q_table(limit)
+
+
+def test_counting_game():
+    learner = QLearner(count_limit=2)
+    game = Game(3000, learner, ProgressReporter(quiet=True), seed=6,
+                deck=Deck(num_decks=6, penetration=0.75))
+    game.run()
+    learned = count_view(learner._Q)[:, :N_STATES].any(axis=2).sum(axis=1)
+    # rounds were played at several counts, each into its own bucket
+    assert (learned > 0).sum() >= 3
+    assert not count_view(learner._Q)[:, N_STATES].any()
+
+    frame = strategy_frame(learner._Q)
+    assert set(frame["count"]) <= set(range(-2, 3))
+    assert len(frame) == learned.sum()
+    assert frame["count"].is_monotonic_increasing
+
+
+def test_counting_needs_sequential_mode():
+    game = Game(100, QLearner(count_limit=1), ProgressReporter(quiet=True),
+                mode=Constants.batch, batch_size=100)
+    with pytest.raises(ValueError, match="sequential"):
+        game.run()
+
+    # a shoe reshuffled every round, the default one included, has no count
+    for deck in (None, Deck(num_decks=6), InfiniteShoe()):
+        game = Game(100, QLearner(count_limit=1), ProgressReporter(quiet=True),
+                    deck=deck)
+        assert game.deck.reshuffles_every_round()
+        with pytest.raises(ValueError, match="penetration"):
+            game.run()
+    assert not Deck(num_decks=6, penetration=0.75).reshuffles_every_round()
@@ -0,0 +1,50 @@
+import numpy as np
+from dealer_cache import *
+
+
+def test_distribution():
+    cache = DealerOutcomeCache()
+    for upcard in range(2, 12):
+        dist = cache.distribution(upcard)
+        assert len(dist) == N_OUTCOMES
+        assert np.isclose(sum(dist), 1.0)
+        # the dealer hits 17, so never finishes on it
+        assert dist[0] == 0
+    assert cache.distribution(1) is cache.distribution(11)
+    assert cache.misses == 10
+
+    cumulative = cache.cumulative()
+    assert cumulative.shape == (10, N_OUTCOMES)
+    assert np.allclose(cumulative[:, -1], 1.0)
+
+    table = cache.stand_ev_table()
+    assert table.shape == (32, 10)
+    assert (table[22:] == -1).all()
+    assert (table[21] > table[20]).all()
+
+
+def test_lru_eviction():
+    cache = DealerOutcomeCache(maxsize=2)
+    shoe = cache.shoe
+    first = remove_card(shoe, 5)
+    second = remove_card(shoe, 6)
+    third = remove_card(shoe, 7)
+
+    cache.distribution(10, first)
+    cache.distribution(10, second)
+    cache.distribution(10, first)
+    assert cache.hits == 1
+    # second is now the least recently used entry and makes way for third
+    cache.distribution(10, third)
+    cache.distribution(10, first)
+    assert cache.hits == 2
+    cache.distribution(10, second)
+    assert cache.misses == 4
+
+
+def test_composition_changes_distribution():
+    cache = DealerOutcomeCache()
+    tens_gone = tuple([4] * 9 + [0])
+    rich = cache.distribution(6)
+    poor = cache.distribution(6, remove_card(tens_gone, 6))
+    assert poor[BUST] < rich[BUST]
@@ -1,4 +1,5 @@
-from deck import Deck
+import pytest
+from deck import Deck, InfiniteShoe
 from card import Card
 
 # test deck
@@ -21,5 +22,54 @@ def test_card():
     assert QH.get_rank() == "Queen"
     assert QH.get_value() == 10
 
-    QH.set_value(5)
-    assert QH.get_value() == 5
+    # cards are interned and cannot be changed
+    assert Card(10, "Queen", "Hearts") is QH
+    with pytest.raises(AttributeError):
+        QH.value = 5
+    assert QH.get_value() == 10
+
+
+def test_multi_deck_shoe():
+    deck = Deck(num_decks=6)
+    assert deck.remaining() == 312
+    codes = [deck.draw_code() for _ in range(312)]
+    assert sorted(codes) == sorted(list(range(52)) * 6)
+    assert deck.remaining() == 0
+
+    # an empty shoe reshuffles instead of running out
+    deck.draw()
+    assert deck.remaining() == 311
+
+
+def test_penetration_reshuffle():
+    deck = Deck(num_decks=2, penetration=0.5)
+    for _ in range(51):
+        deck.draw_code()
+    deck.start_round()
+    assert deck.remaining() == 53
+
+    deck.draw_code()
+    deck.start_round()
+    assert deck.remaining() == 104
+
+
+def test_card_view():
+    card = Deck.card(Deck.code(Card(10, "Queen", "Hearts")))
+    assert str(card) == "Queen of Hearts"
+    assert card.get_value() == 10
+    assert card is Card(10, "Queen", "Hearts")
+    deck = Deck()
+    assert len(set(deck.draw() for _ in range(52))) == 52
+
+
+def test_infinite_shoe():
+    shoe = InfiniteShoe(block_size=64, rng=0)
+    codes = [shoe.draw_code() for _ in range(5200)]
+    assert set(codes) == set(range(52))
+    # draws are independent, so a card repeats long before 52 are dealt
+    assert len(set(codes[:52])) < 52
+    shoe.start_round()
+    assert isinstance(shoe.draw(), Card)
+
+    again = InfiniteShoe(block_size=64, rng=0)
+    assert [again.draw_code() for _ in range(5200)] == codes
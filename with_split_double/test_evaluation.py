@@ -0,0 +1,37 @@
+import numpy as np
+from evaluation import *
+from policy_table import PolicyTable
+from state_encoding import N_STATES, STAY, new_q_table
+
+
+def _always_stay():
+    return PolicyTable(np.full((N_STATES + 1, 4), STAY))
+
+
+def test_evaluate_totals():
+    result = evaluate(_always_stay(), n_rounds=5000, seed=1, batch_size=1000)
+    assert list(result) == FIELDS
+    assert result["rounds"] == result["hands"] == 5000
+    assert result["win"] + result["loss"] + result["push"] == 5000
+    # a hand that never hits cannot bust
+    assert result["bust"] == 0
+    assert result["ci_low"] < result["ev"] < result["ci_high"]
+    assert np.isclose(result["ci_high"] - result["ev"],
+                      Z_95 * np.sqrt(result["variance"] / 5000))
+    assert not result["stopped_early"]
+
+
+def test_evaluate_is_reproducible_across_workers():
+    q = np.random.default_rng(0).random(new_q_table().shape)
+    one = evaluate(q, n_rounds=3000, seed=7, batch_size=1000)
+    two = evaluate(q, n_rounds=3000, n_workers=2, seed=7, batch_size=1000)
+    assert one == two
+    assert one["rounds"] < one["hands"]  # pairs get split
+
+
+def test_evaluate_stops_early():
+    result = evaluate(_always_stay(), n_rounds=100000, seed=2, batch_size=1000,
+                      tol=0.2)
+    assert result["stopped_early"]
+    assert result["rounds"] < 100000
+    assert result["ci_high"] - result["ci_low"] < 0.2
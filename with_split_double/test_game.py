@@ -3,6 +3,8 @@ from q_learner import QLearner
 from deck import Deck
 from card import Card
 from player import Player
+from state_encoding import encode_state
+from progress import ProgressReporter
 from unittest.mock import Mock, patch
 import pytest
 
@@ -110,22 +112,33 @@ def test_perform_double():
 
 def test_get_state():
     hand = QLearner()
-    hand._hand.append(Card(2, "2", "Spades")) 
-    hand._hand.append(Card(2, "2", "Spades"))
+    hand.add_card(Card(2, "2", "Spades"))
+    hand.add_card(Card(2, "2", "Spades"))
 
     dealer = Dealer()
-    dealer._hand.append(Card()) 
+    dealer.add_card(Card())
     game = Game(1)
 
     # check for pairs
     state = game.get_state(hand, dealer)
-    assert state == ('2,2', 1)
-    
+    assert state == encode_state('2,2', 1)
+
     # check for non-pair
-    hand._hand = [Card(2, "2", "Spades"), Card(3, "3", "Spades")]
-    hand._total_hand_val = 5
+    hand.reset_hand()
+    hand.add_card(Card(2, "2", "Spades"))
+    hand.add_card(Card(3, "3", "Spades"))
     state = game.get_state(hand, dealer)
-    assert state == (5, 1)
+    assert state == encode_state(5, 1)
+
+    # a pair is no longer a pair once it has been hit, soft hands stay soft
+    hand.reset_hand()
+    hand.add_card(Card(1, "Ace", "Spades"))
+    hand.add_card(Card(1, "Ace", "Hearts"))
+    assert game.get_state(hand, dealer) == encode_state('A,A', 1)
+    hand.add_card(Card(5, "5", "Spades"))
+    assert game.get_state(hand, dealer) == encode_state('A,6', 1)
+    hand.add_card(Card(10, "10", "Spades"))
+    assert game.get_state(hand, dealer) == encode_state(17, 1)
 
 def test_determine_winner():
     game = Game(1)
@@ -149,4 +162,18 @@ def test_is_bust():
     assert game.is_bust(player) 
     
     player._total_hand_val = 21
-    assert not game.is_bust(player)
\ No newline at end of file
+    assert not game.is_bust(player)
+
+
+def test_progress_reporting():
+    reports = []
+    progress = ProgressReporter(total=300, interval=0, quiet=True, check_every=100)
+    progress.add_callback(reports.append)
+    game = Game(300, QLearner(), progress)
+    game.run()
+
+    # a report is handed over every check_every rounds, before the next round
+    assert [report["count"] for report in reports] == [100, 200, 300]
+    assert reports[-1]["eta"] == 0
+    assert 0 <= reports[-1]["win_rate"] <= 1
+    assert progress.format(reports[-1]).startswith("300 rounds/300: win_rate = ")
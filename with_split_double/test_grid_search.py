@@ -0,0 +1,49 @@
+import pytest
+import grid_search
+
+
+def test_run_trial_is_deterministic(monkeypatch):
+    monkeypatch.setattr(grid_search, "num_learning_rounds", 100)
+    monkeypatch.setattr(grid_search, "number_of_test_rounds", 2)
+
+    first = grid_search.run_trial((0.1, 0.9, 0.9, 7))
+    second = grid_search.run_trial((0.1, 0.9, 0.9, 7))
+    assert first == second
+    assert list(first) == grid_search.FIELDS
+    child = grid_search.spawn_seeds(7, 3)[2]
+    assert grid_search.run_trial((0.1, 0.9, 0.9, child))["seed"] == 7
+
+
+def test_load_completed(monkeypatch, tmp_path):
+    monkeypatch.setattr(grid_search, "num_learning_rounds", 100)
+    monkeypatch.setattr(grid_search, "number_of_test_rounds", 2)
+    path = tmp_path / "grid_search.csv"
+    assert grid_search.load_completed(path, 0) == set()
+
+    path.write_text(",".join(grid_search.FIELDS) + "\n"
+                    "0.001,0.8,0.9,0,100,2,0.43,-24476.5\n"
+                    "0.5,0.99,0.995,0,100,2,0.45,100.0\n"
+                    "0.1,0.9,0.9,1,100,2,0.45,100.0\n"
+                    "0.2,0.9,0.9,0,20000,50,0.45,100.0\n")
+    # only trials played with the same settings are done
+    assert grid_search.load_completed(path, 0) == {
+        (0.001, 0.8, 0.9), (0.5, 0.99, 0.995)}
+    assert grid_search.load_completed(path, 1) == {(0.1, 0.9, 0.9)}
+
+    # results without settings are never resumed from
+    path.write_text("learning_rate,discount_factor,epsilon,win_rate,profit\n"
+                    "0.001,0.8,0.9,0.43,-24476.5\n")
+    with pytest.raises(ValueError, match="--fresh"):
+        grid_search.load_completed(path, 0)
+
+
+def test_run_trial_profiled(monkeypatch, tmp_path):
+    monkeypatch.setattr(grid_search, "num_learning_rounds", 100)
+    monkeypatch.setattr(grid_search, "number_of_test_rounds", 2)
+
+    path = tmp_path / "trial.pstats"
+    row = grid_search.run_trial((0.1, 0.9, 0.9, 7, str(path)))
+    profiler = row.pop("profiler")
+    assert row == grid_search.run_trial((0.1, 0.9, 0.9, 7))
+    assert profiler.rounds == 200
+    assert path.exists()
@@ -0,0 +1,50 @@
+import numpy as np
+from metrics import *
+
+
+def test_stride_series_append_matches_extend():
+    values = np.arange(1000, dtype=float)
+    one = StrideSeries(64)
+    for value in values:
+        one.append(value)
+    many = StrideSeries(64)
+    for chunk in np.array_split(values, 7):
+        many.extend(chunk)
+
+    assert one.count == many.count == 1000
+    assert len(one.values()) <= 64
+    assert np.array_equal(one.values(), many.values())
+    # every sample is the point at its position
+    assert np.array_equal(one.values(), one.positions())
+    assert one.stride == 16
+
+
+def test_rolling_window():
+    window = RollingWindow(3)
+    assert window.mean() == 0
+    for value in [1, 2, 3, 4]:
+        window.append(value)
+    assert window.mean() == 3
+    window.extend([10, 20, 30, 40])
+    assert window.count == 8
+    assert window.sum() == 90
+
+
+def test_metrics_record_and_spill(tmp_path):
+    path = tmp_path / "rounds.bin"
+    metrics = Metrics(resolution=8, window=2, spill_path=path, spill_every=3)
+    metrics.record(1.0, 1, 0, 0)
+    metrics.record(-2.0, 0, 1, 0)
+    metrics.record_batch(np.array([1.5, 0.0]), np.array([1, 0]),
+                         np.array([0, 0]), np.array([0, 1]))
+
+    assert metrics.rounds == 4
+    assert metrics.reward == 0.5
+    assert metrics.win_rate() == 0.5
+    assert metrics.rolling_reward() == 0.75
+    assert metrics.rolling_win_rate() == 0.5
+    assert np.array_equal(metrics.reward_series.values(), [1, -1, 0.5, 0.5])
+
+    history = load_history(path)
+    assert np.array_equal(history['reward'], [1.0, -2.0, 1.5, 0.0])
+    assert np.array_equal(history['ties'], [0, 0, 0, 1])
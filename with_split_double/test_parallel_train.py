@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from constants import Constants
+from game import Game
+from parallel_train import ParallelTrainer
+from progress import ProgressReporter
+from rules import Rules
+from state_encoding import new_q_table
+
+
+def test_merge_is_visit_weighted():
+    q = new_q_table()
+    q[0] = 1.0
+    with ParallelTrainer(q, 2, 0.1, 0.9, batch_size=16) as trainer:
+        trainer._local[0, 0] = [2.0, 4.0, 0.0, 0.0]
+        trainer._local[1, 0] = [5.0, 0.0, 0.0, 0.0]
+        trainer._visits[:] = 0
+        trainer._visits[0, 0] = [1, 3, 0, 0]
+        trainer._visits[1, 0] = [2, 0, 0, 0]
+        trainer.merge()
+        assert trainer.q[0].tolist() == [4.0, 4.0, 1.0, 1.0]
+
+
+def test_sync_is_reproducible():
+    tables = []
+    for _ in range(2):
+        with ParallelTrainer(new_q_table(), 2, 0.1, 0.9, batch_size=500,
+                             seed=5) as trainer:
+            trainer.sync(500, 0.5)
+            trainer.sync([500, 200], 0.5)
+            tables.append(trainer.q.copy())
+            assert trainer.rewards.shape == (2, 500)
+    assert tables[0].any()
+    assert np.array_equal(tables[0], tables[1])
+
+
+def test_parallel_mode_plays_every_round():
+    game = Game(5000, progress=ProgressReporter(quiet=True),
+                mode=Constants.parallel, n_workers=2, batch_size=1024, seed=1)
+    game.run()
+    assert game.metrics.rounds == 5000
+    assert game.win + game.loss + game.tie >= 5000
+    assert game.learner._Q.any()
+    assert not game.learner._learning
+
+
+def test_failing_actors_raise():
+    # BatchGame cannot hold more than four hands a round
+    with ParallelTrainer(new_q_table(), 2, 0.1, 0.9, batch_size=16,
+                         rules=Rules(max_hands=8)) as trainer:
+        with pytest.raises(RuntimeError, match="failed"):
+            trainer.sync(16, 0.5)
+
+    with ParallelTrainer(new_q_table(), 2, 0.1, 0.9, batch_size=16) as trainer:
+        trainer._workers[1].kill()
+        trainer._workers[1].join()
+        with pytest.raises(RuntimeError, match="exited"):
+            trainer.sync(16, 0.5)
@@ -4,6 +4,7 @@ from dealer import Dealer
 from deck import Deck
 from card import Card
 from constants import *
+from rules import HIT_STAY_RULES
 
 def test_hit_with_actual_deck():
     deck = Deck()
@@ -81,6 +82,10 @@ def test_dealer_get_action_stay():
     dealer.hit(deck)
     dealer._total_hand_val = 17  
 
+    # the default dealer hits every 17, the hit/stay one stands on it
+    assert dealer.get_action() == Constants.hit
+    assert dealer.get_action(HIT_STAY_RULES) == Constants.stay
+    dealer._total_hand_val = 18
     assert dealer.get_action() == Constants.stay
 
 def test_dealer_integration_with_deck():
@@ -92,4 +97,22 @@ def test_dealer_integration_with_deck():
     assert len(dealer.get_hand()) == 2
     assert len(deck._cards) == 50
     assert dealer.get_hand_value() > 0
-    
\ No newline at end of file
+    
+def test_add_card_tracks_hand():
+    player = Player()
+    ace = Card(1, "Ace", "Spades")
+
+    player.add_card(ace)
+    assert player.get_hand_value() == 11
+    assert player.is_soft()
+    player.add_card(Card(1, "Ace", "Hearts"))
+    assert player.get_hand_value() == 12
+    assert player.get_pair_value() == 1
+    player.add_card(Card(10, "King", "Hearts"))
+    assert player.get_hand_value() == 12
+    assert not player.is_soft()
+    assert player.get_pair_value() is None
+
+    # reads do not change the hand and cards are left untouched
+    assert player.get_hand_value() == 12
+    assert ace.get_value() == 1
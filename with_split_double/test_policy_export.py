@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from policy_export import *
+from q_learner import QLearner
+from state_encoding import *
+
+
+def _q_table():
+    q = new_q_table()
+    q[encode_state("8,8", 10)] = [0.1, -0.5, 0.3, 0.2]
+    q[encode_state(16, 10)] = [0.1, -0.5, 0.3, 0.2]
+    q[encode_state(11, 6)] = [0.2, 0.0, 0.0, 0.4]
+    q[encode_state("A,7", 2)] = [-0.1, 0.1, 0.0, 0.0]
+    return q
+
+
+def _learner():
+    return QLearner(q_table=_q_table())
+
+
+def test_optimal_strategy_masks_split():
+    df = _learner().get_optimal_strategy()
+    assert list(df.columns) == ['player', 'dealer'] + ACTIONS + ['optimal']
+    # ordered by hard totals, soft totals then pairs
+    assert list(df['player'].astype(str)) == ["11", "16", "A,7", "8,8"]
+    assert df['player'].is_monotonic_increasing
+    assert list(df['optimal']) == ['double', 'double', 'stay', 'split']
+
+
+@pytest.mark.parametrize("extension", [".csv", ".npy", ".parquet", ".feather"])
+def test_write_and_read_strategy(tmp_path, extension):
+    if extension in (".parquet", ".feather"):
+        pytest.importorskip("pyarrow")
+    learner = _learner()
+    path = tmp_path / f"policy{extension}"
+    learner.save_optimal_strategy(path)
+
+    df = read_strategy(path)
+    expected = learner.get_optimal_strategy()
+    assert list(df['player']) == list(expected['player'])
+    assert list(df['dealer']) == list(expected['dealer'])
+    assert list(df['optimal'].astype(str)) == list(expected['optimal'].astype(str))
+    assert np.allclose(df[ACTIONS], expected[ACTIONS])
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_strategy(_learner().get_optimal_strategy(), tmp_path / "policy.txt")
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from constants import Constants
+from game import Game
+from policy_export import strategy_frame
+from policy_table import *
+from progress import ProgressReporter
+from state_encoding import *
+from test_policy_export import _q_table
+
+
+def test_from_q_table_falls_back_to_legal_actions():
+    policy = PolicyTable.from_q_table(_q_table())
+    pair = encode_state("8,8", 10)
+    assert policy.action(pair, can_split=True, can_double=True) == Constants.split
+    assert policy.action(pair, can_double=True) == Constants.double
+    assert policy.action(pair) == Constants.hit
+    # split is never taken outside pair states
+    assert policy.action(encode_state(16, 10), True, True) == Constants.double
+    assert policy.action(encode_state(11, 6), can_double=True) == Constants.double
+    assert policy.action(encode_state(11, 6)) == Constants.hit
+    assert policy.action(encode_state("A,7", 2), True, True) == Constants.stay
+    # unseen states are hit
+    assert policy.action(encode_state(20, 5), True, True) == Constants.hit
+    assert not policy.table.flags.writeable
+
+
+def test_lookup_batch_matches_lookup():
+    policy = PolicyTable.from_q_table(np.random.default_rng(0).random(
+        (N_STATES + 1, len(ACTIONS))))
+    rng = np.random.default_rng(1)
+    states = rng.integers(0, N_STATES, 1000)
+    can_split = rng.random(1000) < 0.5
+    can_double = rng.random(1000) < 0.5
+    actions = policy.lookup_batch(states, legality(can_split, can_double))
+    assert actions.tolist() == [policy.lookup(s, p, d) for s, p, d in
+                                zip(states, can_split, can_double)]
+    assert (policy.lookup_batch(states) == policy.table[states, 0]).all()
+
+
+def test_from_strategy(tmp_path):
+    q = _q_table()
+    path = tmp_path / "policy.csv"
+    strategy_frame(q).to_csv(path, index=False)
+    assert (PolicyTable.from_strategy(path).table ==
+            PolicyTable.from_q_table(q).table).all()
+
+    # a chart with only the optimal action falls back to hit
+    df = strategy_frame(q)[['player', 'dealer', 'optimal']]
+    policy = PolicyTable.from_strategy(df)
+    assert policy.action(encode_state("8,8", 10), True) == Constants.split
+    assert policy.action(encode_state("8,8", 10)) == Constants.hit
+
+    df['player'] = df['player'].astype(str)
+    df.loc[0, 'player'] = "A,10"
+    with pytest.raises(ValueError):
+        PolicyTable.from_strategy(df)
+
+
+@pytest.mark.parametrize("mode", [Constants.sequential, Constants.batch])
+def test_policy_player_plays_without_learning(mode):
+    policy = PolicyTable.from_q_table(_q_table())
+    player = PolicyPlayer(policy)
+    game = Game(2000, player, ProgressReporter(quiet=True), mode=mode, seed=3)
+    game.run()
+    assert game.win + game.loss + game.tie >= 2000
+    assert not player._Q.any()
+    assert player.split_hand().policy is policy
@@ -0,0 +1,43 @@
+import pickle
+import pytest
+from constants import Constants
+from game import Game
+from profiling import *
+from progress import ProgressReporter
+from q_learner import QLearner
+
+
+def test_profiled_game():
+    profiler = Profiler()
+    game = Game(500, QLearner(), ProgressReporter(quiet=True), seed=3,
+                profiler=profiler)
+    game.run()
+
+    assert profiler.rounds == 500
+    assert profiler.calls["deal"] == 500
+    assert {"decisions", "dealer", "settle", "update"} <= set(profiler.times)
+    assert profiler.counters["new_states"] > 0
+    assert profiler.counters["q_misses"] > 0
+    summary = profiler.summary()
+    assert list(summary["phase"][:2]) == ["deal", "decisions"]
+    assert summary["share"].sum() == pytest.approx(1.0)
+
+    # the profiler does not change what is played
+    plain = Game(500, QLearner(), ProgressReporter(quiet=True), seed=3)
+    plain.run()
+    assert plain.reward == game.reward
+
+
+def test_profiled_batch_game_and_merge(tmp_path):
+    first = Profiler(cprofile=True)
+    Game(1000, QLearner(), ProgressReporter(quiet=True), mode=Constants.batch,
+         batch_size=256, profiler=first).run()
+    assert first.calls["play"] == 4
+    first.dump_stats(tmp_path / "first.pstats")
+
+    second = pickle.loads(pickle.dumps(first))
+    second.merge(first)
+    assert second.rounds == 2000
+    assert second.counters["splits"] == 2 * first.counters["splits"]
+    merge_stats([str(tmp_path / "first.pstats")] * 2, str(tmp_path / "all.pstats"))
+    assert (tmp_path / "all.pstats").exists()
@@ -3,6 +3,8 @@ from q_learner import QLearner
 from card import Card
 from deck import Deck
 from constants import Constants
+from state_encoding import encode_state, new_q_table, HIT, STAY, SPLIT, DOUBLE
+import numpy as np
 
 def test_initial_state():
     qlearner = QLearner()
@@ -38,42 +40,74 @@ def test_set_initial_split_hand_with_ace():
 
 def test_get_action_epsilon_greedy():
     qlearner = QLearner()
-    state = (15, 10)  # Mock state
-    qlearner._Q = {
-        state: {Constants.hit: 0.5, Constants.stay: 0.8, Constants.split: 0.2, Constants.double: 0.1}
-    }
+    state = encode_state(15, 10)  # Mock state
+    qlearner._Q[state] = [0.5, 0.8, 0.2, 0.1]
     qlearner._epsilon = 1.0  # Force greedy selection
     action = qlearner.get_action(state)
     assert action == Constants.stay
 
 def test_get_action_exploration():
     qlearner = QLearner()
-    state = (15, 10)  # Mock state
-    qlearner._Q = {}
+    state = encode_state(15, 10)  # Mock state
     qlearner._epsilon = 0.0  # Force exploration
     action = qlearner.get_action(state)
     assert action in qlearner._action_list
 
 def test_update_q_value():
     qlearner = QLearner()
-    state = (15, 10)
-    qlearner._Q[state] = {Constants.hit: 0.5, Constants.stay: 0.8}
+    state = encode_state(15, 10)
+    qlearner._Q[state] = [0.5, 0.8, 0, 0]
     qlearner._last_state = state
     qlearner._last_action = Constants.hit
 
-    qlearner.update(new_state=(16, 10), reward=1.0)
-    assert qlearner._Q[state][Constants.hit] != 0.5
+    qlearner.update(new_state=encode_state(16, 10), reward=1.0)
+    assert qlearner._Q[state][HIT] != 0.5
 
 def test_split_update():
     qlearner = QLearner()
-    state = (15, 10)
-    qlearner._Q[state] = {Constants.split: 0.5}
+    state = encode_state(15, 10)
+    qlearner._Q[state, SPLIT] = 0.5
     qlearner.split_update(state, reward=1.0)
-    assert qlearner._Q[state][Constants.split] > 0.5
+    assert qlearner._Q[state][SPLIT] > 0.5
 
 def test_double_update():
     qlearner = QLearner()
-    state = (15, 10)
-    qlearner._Q[state] = {Constants.double: 0.5}
+    state = encode_state(15, 10)
+    qlearner._Q[state, DOUBLE] = 0.5
     qlearner.double_update(state, reward=1.0)
-    assert qlearner._Q[state][Constants.double] > 0.5
+    assert qlearner._Q[state][DOUBLE] > 0.5
+
+
+def test_q_table_isolated_and_shared_by_splits():
+    qlearner = QLearner()
+    qlearner._Q[encode_state(15, 10), STAY] = 1.0
+    assert not QLearner()._Q.any()
+    assert qlearner.split_hand()._Q is qlearner._Q
+
+
+def test_split_hands_are_pooled():
+    qlearner = QLearner()
+    first = qlearner.split_hand()
+    first.add_card(Card(10, "10", "Spades"))
+    first._action_list.remove(Constants.double)
+    second = first.split_hand()  # a resplit
+    assert qlearner._split_hands == [first, second]
+
+    qlearner.release_split_hands()
+    qlearner._last_state = 7
+    reused = {id(qlearner.split_hand()), id(qlearner.split_hand())}
+    assert reused == {id(first), id(second)}
+    assert first.get_hand() == () and first._last_state == 7
+    assert first._action_list == [Constants.hit, Constants.stay, Constants.double]
+    assert not qlearner._free_hands
+
+
+def test_save_load_q_table(tmp_path):
+    qlearner = QLearner()
+    qlearner._Q[encode_state("A,A", 11)] = [0.1, 0.2, 0.9, 0.3]
+    qlearner.save_q_table(tmp_path / "q_table.npy")
+
+    loaded = QLearner()
+    loaded.load_q_table(tmp_path / "q_table.npy")
+    assert np.array_equal(loaded._Q, qlearner._Q)
+    assert np.load(tmp_path / "q_table.npy").shape == new_q_table().shape
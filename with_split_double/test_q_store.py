@@ -0,0 +1,80 @@
+import json
+import pickle
+import numpy as np
+import pytest
+from evaluation import as_policy, evaluate
+from policy_table import PolicyTable
+from q_learner import QLearner
+from q_store import *
+from rules import HIT_STAY_RULES
+from state_encoding import new_q_table
+
+
+def _table():
+    return np.random.default_rng(0).random(new_q_table().shape)
+
+
+def test_create_and_open(tmp_path):
+    path = tmp_path / f"q{EXTENSION}"
+    q = _table()
+    with QTableStore.create(path, q, HIT_STAY_RULES) as store:
+        assert np.array_equal(store.q, q)
+
+    store = QTableStore(path)
+    assert np.array_equal(store.q, q)
+    assert store.rules == HIT_STAY_RULES
+    assert store.header["shape"] == list(q.shape)
+    assert store.header["actions"] == ["hit", "stay", "split", "double"]
+    assert not store.q.flags.writeable
+    with pytest.raises(ValueError):
+        store.q[0, 0] = 1.0
+    # values start page aligned after the header
+    assert path.stat().st_size == HEADER_SIZE + q.nbytes
+
+
+def test_incremental_flush(tmp_path):
+    path = tmp_path / f"q{EXTENSION}"
+    writer = QTableStore.create(path)
+    reader = QTableStore(path)
+    learner = QLearner(q_table=writer.q)
+    learner._Q[40, 1] = 0.5
+    writer.flush()
+    # the reader maps the same pages, nothing is copied or reloaded
+    assert reader.q[40, 1] == 0.5
+    writer.close()
+    assert QTableStore(path).q[40, 1] == 0.5
+    assert pickle.loads(pickle.dumps(reader)).q[40, 1] == 0.5
+
+
+def test_layout_is_checked(tmp_path):
+    path = tmp_path / f"q{EXTENSION}"
+    QTableStore.create(path).close()
+    data = bytearray(path.read_bytes())
+    header = json.loads(data[len(MAGIC):HEADER_SIZE].decode().rstrip("\0"))
+    header["actions"] = ["hit", "stay"]
+    data[:HEADER_SIZE] = (MAGIC + json.dumps(header).encode()).ljust(
+        HEADER_SIZE, b"\0")
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="actions"):
+        QTableStore(path)
+
+    other = tmp_path / "other.qtable"
+    other.write_bytes(b"\0" * (HEADER_SIZE + 8))
+    with pytest.raises(ValueError, match="not a Q-table store"):
+        QTableStore(other)
+
+
+def test_learner_and_evaluation(tmp_path):
+    path = str(tmp_path / f"q{EXTENSION}")
+    learner = QLearner(q_table=_table())
+    learner.save_q_table(path, HIT_STAY_RULES)
+    loaded = QLearner()
+    loaded.load_q_table(path)
+    assert np.array_equal(loaded._Q, learner._Q)
+
+    policy = as_policy(path)
+    assert np.array_equal(policy.table,
+                          PolicyTable.from_q_table(learner._Q).table)
+    result = evaluate(path, n_rounds=5000, seed=0)
+    # the store's hit/stay rules are played, so no hand is ever split
+    assert result["hands"] == 5000
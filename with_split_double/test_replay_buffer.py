@@ -0,0 +1,48 @@
+import numpy as np
+from q_learner import QLearner
+from replay_buffer import ReplayBuffer
+from state_encoding import *
+
+
+def test_flush_matches_one_at_a_time_updates():
+    buffered = QLearner(learning_rate=0.5, discount_factor=0.9, buffer=8)
+    direct = QLearner(learning_rate=0.5, discount_factor=0.9)
+    for learner in (buffered, direct):
+        learner._last_state, learner._last_action = 5, Constants.hit
+        learner.update(TERMINAL_STATE, 1.0)
+        learner.update(TERMINAL_STATE, -1.0)
+        learner.split_update(300, 0.5)
+        learner.double_update(40, 1.0)
+    assert not buffered._Q.any()
+    assert buffered._buffer.pending == 4
+    buffered.flush_updates()
+    assert np.allclose(buffered._Q, direct._Q)
+    assert buffered._buffer.pending == 0
+    assert len(buffered._buffer) == 4
+
+
+def test_learner_flushes_when_full():
+    learner = QLearner(learning_rate=0.5, buffer=2)
+    assert learner.split_hand()._buffer is learner._buffer
+    for state in range(3):
+        learner.split_update(state, 1.0)
+    # the first two were applied to make room for the third
+    assert learner._Q[[0, 1], SPLIT].all() and not learner._Q[2].any()
+    assert learner._buffer.pending == 1
+
+
+def test_ring_buffer_and_replay():
+    buffer = ReplayBuffer(3)
+    for state in range(5):
+        buffer.add(state, HIT, 1.0 if state == 4 else 0.0)
+        buffer.flush(new_q_table(), 0.1, 0.9)
+    assert len(buffer) == 3
+    assert buffer.transitions()[0].tolist() == [2, 3, 4]
+
+    q = new_q_table()
+    rng = np.random.default_rng(0)
+    # only the transition with a TD error is worth replaying
+    index = buffer.replay(q, 10, 0.1, 0.9, rng, priority=1.0)
+    assert buffer.transitions(index)[0].tolist() == [4] * 10
+    assert q[4, HIT] > 0 and not q[[2, 3]].any()
+    assert len(buffer.replay(q, 10, 0.1, 0.9, rng)) == 10
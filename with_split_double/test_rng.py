@@ -0,0 +1,48 @@
+import numpy as np
+from rng import *
+from deck import Deck
+from game import Game
+from progress import ProgressReporter
+from q_learner import QLearner
+from constants import Constants
+
+
+def test_random_stream_matches_generator():
+    stream = RandomStream(3, block_size=5)
+    values = [stream.random() for _ in range(12)]
+    generator = np.random.default_rng(3)
+    expected = np.concatenate([generator.random(5) for _ in range(3)])[:12]
+    assert values == expected.tolist()
+    assert stream.choice("abc") in "abc"
+
+
+def test_spawned_streams_are_independent():
+    first, second = spawn(0, 2)
+    assert first.random() != second.random()
+    again = spawn(0, 2)[1]
+    assert spawn(0, 2)[0].random() == np.random.default_rng(
+        spawn_seeds(0, 2)[0]).random()
+    assert make_rng(again) is again
+
+
+def test_seeded_deck():
+    deck = Deck(rng=5)
+    first = [deck.draw_code() for _ in range(3)]
+    deck = Deck(rng=5)
+    assert first == [deck.draw_code() for _ in range(3)]
+    deck = Deck()
+    deck.draw_code()
+    deck.reseed(5)
+    assert [deck.draw_code() for _ in range(3)] == first
+
+
+def test_seeded_game_is_reproducible():
+    for mode in (Constants.sequential, Constants.batch):
+        results = []
+        for _ in range(2):
+            game = Game(500, QLearner(), ProgressReporter(quiet=True),
+                        mode=mode, batch_size=128, seed=11)
+            game.run()
+            results.append((game.reward, game.win, game.loss, game.tie,
+                            game.learner._Q.sum()))
+        assert results[0] == results[1]
@@ -0,0 +1,170 @@
+import numpy as np
+import pytest
+from batch_game import BatchGame
+from constants import Constants
+from dealer_cache import DealerOutcomeCache
+from deck import Deck, InfiniteShoe
+from evaluation import sweep_rules
+import game as game_module
+from game import Game
+from progress import ProgressReporter
+from q_learner import QLearner
+from rules import *
+from state_encoding import (HIT, STAY, SPLIT, DOUBLE, N_STATES, PAIR_ROWS,
+                            encode_state, new_q_table)
+
+
+def test_dealer_hits():
+    # the default dealer hits every 17
+    assert DEFAULT_RULES.dealer_hits(17, False)
+    assert DEFAULT_RULES.dealer_hits(17, True)
+    assert not DEFAULT_RULES.dealer_hits(18, True)
+
+    h17 = Rules(dealer_stand=17, hit_soft_17=True)
+    assert h17.dealer_hits(17, True)
+    assert not h17.dealer_hits(17, False)
+    assert h17.dealer_hits(16, False)
+
+    s17 = Rules(dealer_stand=17, hit_soft_17=False)
+    assert not s17.dealer_hits(17, True)
+    assert not s17.dealer_hits(17, False)
+
+
+@pytest.mark.parametrize("dealer_stand", [0, 16, 23])
+def test_dealer_stand_is_checked(dealer_stand):
+    # the dealer outcomes only cover final totals 17-21 and bust
+    with pytest.raises(ValueError, match="dealer_stand"):
+        Rules(dealer_stand=dealer_stand)
+
+
+def test_new_deck():
+    assert isinstance(HIT_STAY_RULES.new_deck(), InfiniteShoe)
+    deck = Rules(num_decks=6).new_deck(rng=0)
+    assert type(deck) is Deck and deck.remaining() == 312
+    assert Rules(num_decks=6) == Rules(num_decks=6) != DEFAULT_RULES
+    assert list(HIT_STAY_RULES.action_mask()) == [True, True, False, False]
+
+
+@pytest.mark.parametrize("mode", [Constants.sequential, Constants.batch])
+def test_hit_stay_rules(mode):
+    learner = QLearner()
+    game = Game(3000, learner, ProgressReporter(quiet=True), mode=mode,
+                batch_size=1000, seed=5, rules=HIT_STAY_RULES)
+    assert game.infinite_deck
+    game.run()
+    assert learner._Q[:N_STATES, :2].any()
+    assert not learner._Q[:, SPLIT].any()
+    assert not learner._Q[:, DOUBLE].any()
+    strategy = learner.get_optimal_strategy(game.rules)
+    assert set(strategy["optimal"]) <= {Constants.hit, Constants.stay}
+    # without splitting a pair is played as its total
+    assert not set(strategy["player"]) & {str(row) for row in PAIR_ROWS}
+
+
+def test_batch_rules():
+    q = new_q_table()
+    q[:N_STATES, SPLIT] = q[:N_STATES, DOUBLE] = 1.0
+    engine = BatchGame(20000, np.random.default_rng(1),
+                       rules=Rules(split=False, blackjack_payout=1.2))
+    n_splits, states, actions, rewards, next_states = engine.play(q, 1.0)
+    assert n_splits == 0 and not (actions == SPLIT).any()
+    assert (actions == DOUBLE).any()
+    assert (engine.rewards == 1.2).any()
+    assert not (engine.rewards == 1.5).any()
+
+    engine = BatchGame(1000, np.random.default_rng(2), rules=Rules(num_decks=6))
+    assert len(engine._decks) == 1000 * 312
+    engine.play(q, 0.5)
+    assert (engine.wins + engine.losses + engine.ties >= 1).all()
+
+
+def test_dealer_outcomes_follow_rules():
+    s17 = DealerOutcomeCache(Rules(dealer_stand=17, hit_soft_17=False))
+    h17 = DealerOutcomeCache(Rules(dealer_stand=17, hit_soft_17=True))
+    infinite = DealerOutcomeCache(HIT_STAY_RULES)
+    assert DealerOutcomeCache().rules is DEFAULT_RULES
+    for upcard in range(2, 12):
+        for cache in (s17, h17, infinite):
+            assert np.isclose(sum(cache.distribution(upcard)), 1.0)
+        # hitting a soft 17 finishes on 17 less often
+        assert h17.distribution(upcard)[0] <= s17.distribution(upcard)[0]
+    assert h17.distribution(11)[0] < s17.distribution(11)[0]
+    assert infinite.distribution(10) != s17.distribution(10)
+
+
+def test_compiled_tables():
+    assert DEFAULT_RULES.legality[1, 1, 1] == 3
+    assert DEFAULT_RULES.legality[0, 0, 0] == 0
+    no_das = Rules(double_after_split=False)
+    assert no_das.legality[1, 1, 0] == 3 and no_das.legality[1, 1, 1] == 2
+    assert no_das.may_double(False) and not no_das.may_double(True)
+    assert Rules(max_hands=2).may_split(1) and not Rules(max_hands=2).may_split(2)
+    assert list(Rules(blackjack_payout=1.2).payout[:, 1]) == [-2, 0, 2, 1.2]
+    assert list(HIT_STAY_RULES.legality.ravel()) == [0] * 8
+
+
+def _split_then_double(rules, monkeypatch, seed):
+    """
+    Returns: The number of split hands that doubled, and the most hands a
+    round was split into, over a sequential game by rules whose learner
+    always splits, and doubles when it cannot split.
+    """
+    q = new_q_table()
+    q[:N_STATES, SPLIT], q[:N_STATES, DOUBLE] = 2.0, 1.0
+    learner = QLearner(epsilon=1.0, q_table=q)
+    learner._learning = False
+    doubled, most_hands = [], [1]
+    double = game_module.perform_double
+
+    def perform_double(hand, deck):
+        doubled.append(hand is not learner)
+        double(hand, deck)
+
+    def reset_round():
+        most_hands.append(1 + len(learner._split_hands) // 2)
+        return Game.reset_round(game)
+
+    monkeypatch.setattr(game_module, "perform_double", perform_double)
+    game = Game(20000, learner, ProgressReporter(quiet=True), seed=seed,
+                rules=rules)
+    game.reset_round = reset_round
+    game.run()
+    return sum(doubled), max(most_hands)
+
+
+def test_split_rules(monkeypatch):
+    q = new_q_table()
+    q[:N_STATES, SPLIT] = q[:N_STATES, DOUBLE] = 1.0
+    engine = BatchGame(20000, np.random.default_rng(3),
+                       rules=Rules(max_hands=2, double_after_split=False,
+                                   hit_split_aces=True))
+    engine.play(q, 1.0)
+    assert engine.hands.max() == 2
+    # without doubling after a split, split hands cannot lose two units each
+    assert engine.rewards[engine.hands == 2].min() >= -2
+
+    learner = QLearner(epsilon=0.0)
+    game = Game(2000, learner, ProgressReporter(quiet=True), seed=4,
+                rules=Rules(max_hands=2))
+    game.run()
+    assert learner._Q[:, SPLIT].any()
+
+    # split hands decide with their own flags in the sequential game too
+    split_doubles, most_hands = _split_then_double(
+        Rules(double_after_split=False, max_hands=3), monkeypatch, 5)
+    assert split_doubles == 0 and most_hands == 3
+    split_doubles, most_hands = _split_then_double(Rules(), monkeypatch, 5)
+    assert split_doubles > 0 and most_hands == 4
+
+
+def test_sweep_rules():
+    q = new_q_table()
+    q[:N_STATES, HIT] = 1.0
+    q[encode_state(17, 10):N_STATES, STAY] = 2.0
+    frame = sweep_rules(q, {"3:2": DEFAULT_RULES,
+                            "6:5": Rules(blackjack_payout=1.2)},
+                        n_rounds=20000, seed=0)
+    assert list(frame.index) == ["3:2", "6:5"]
+    # the same seed deals the same rounds, and only naturals pay less
+    assert frame.loc["6:5", "ev"] < frame.loc["3:2", "ev"]
+    assert frame.loc["6:5", "win"] == frame.loc["3:2", "win"]
@@ -0,0 +1,60 @@
+import numpy as np
+from dealer_cache import remove_card
+from rules import HIT_STAY_RULES, Rules
+from strategy_solver import StrategySolver, solve_q_table
+from state_encoding import (encode_state, new_q_table, DOUBLE, SPLIT, STAY,
+                            N_STATES)
+
+
+def test_dealer_distribution():
+    solver = StrategySolver()
+    for upcard in range(1, 11):
+        dist = solver.dealer_distribution(remove_card(solver.shoe, upcard), upcard)
+        assert np.isclose(sum(dist), 1.0)
+        # the dealer hits 17, so never finishes on it
+        assert dist[0] == 0
+
+
+def test_known_decisions():
+    solver = StrategySolver()
+    hit, stay, split, double = solver._evs(11, 6)
+    assert double > max(hit, stay)
+
+    hit, stay, split, double = solver._evs("8,8", 6)
+    assert split > max(hit, stay, double)
+
+    hit, stay, split, double = solver._evs(20, 10)
+    assert stay > max(hit, double)
+    assert np.isnan(split)
+
+    hit, stay, split, double = solver._evs(21, 7)
+    assert hit == -1 and stay > 0
+
+
+def test_solve_q_table_layout():
+    q_table = solve_q_table()
+    assert q_table.shape == new_q_table().shape
+    assert not q_table[-1].any()
+    assert q_table[encode_state(20, 10), STAY] > 0.5
+    assert q_table[encode_state(16, 10), SPLIT] == 0
+    assert q_table[encode_state("A,A", 6), SPLIT] > 0
+
+
+def test_solver_follows_rules():
+    df = StrategySolver(HIT_STAY_RULES).solve()
+    # no split or double, and pairs are played as their totals
+    assert df[["split", "double"]].isna().all().all()
+    assert set(df["optimal"]) == {"hit", "stay"}
+    assert [hand for hand, _ in StrategySolver(HIT_STAY_RULES)._hands(12)][-2:] \
+        == [(6, 6), (1, 1)]
+    q_table = solve_q_table(HIT_STAY_RULES)
+    assert not q_table[:N_STATES, [SPLIT, DOUBLE]].any()
+
+    # splitting is worth less without doubling after it
+    das = StrategySolver()._evs("8,8", 6)[SPLIT]
+    assert StrategySolver(Rules(double_after_split=False))._evs("8,8", 6)[SPLIT] < das
+
+    # a dealer hitting soft 17 is worse for the player
+    s17 = StrategySolver(Rules(dealer_stand=17, hit_soft_17=False))
+    h17 = StrategySolver(Rules(dealer_stand=17, hit_soft_17=True))
+    assert h17._evs(17, 11)[STAY] < s17._evs(17, 11)[STAY]